@@ -1,3 +1,4 @@
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from capsules.audit.schema import AuditLog
@@ -12,7 +13,7 @@ class AuditRepository:
 
     async def save_audit(self, db: Session, audit_info: dict) -> AuditLog:
         """
-        保存审计信息
+        保存审计信息，由调用方的事务提交
 
         Args:
             audit_info: 审计信息
@@ -20,10 +21,19 @@ class AuditRepository:
         # 保存审计信息到数据库或其他存储位置
         audit_info = AuditLog(**audit_info)
         db.add(audit_info)
-        db.commit()
-        db.refresh(audit_info)
+        db.flush()
         return audit_info
 
+    async def save_audits(self, db: Session, audit_infos: list[dict]):
+        """
+        批量保存审计信息，使用一条多行INSERT写入，由调用方的事务提交
+
+        Args:
+            audit_infos: 审计信息列表
+        """
+        if audit_infos:
+            db.execute(insert(AuditLog), audit_infos)
+
     async def get_audit(self, db: Session, audit_id: str) -> dict:
         """
         获取审计信息
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, String, DateTime, Integer
+from sqlalchemy import Column, String, DateTime, Integer, Text
 from sqlalchemy.orm import Mapped
 
 from common.db_base import DBBase
@@ -14,6 +14,7 @@ class AuditLog(DBBase):
     uuid: Mapped[str] = Column(String(36), unique=True, default=lambda: str(uuid.uuid4()), nullable=False, comment="唯一标识")
     capsule_uuid: Mapped[str] = Column(String(36), comment="数据胶囊唯一标识")
     claim_uuid: Mapped[str] = Column(String(36), comment="授权记录唯一标识")
+    detail: Mapped[str] = Column(Text, comment="审计详情，如胶囊封装各阶段耗时(JSON)")
     create_time: Mapped[datetime] = Column(DateTime, default=datetime.now, comment="创建时间")
 
     def __repr__(self):
@@ -25,5 +26,6 @@ class AuditLog(DBBase):
             "uuid": self.uuid,
             "capsule_uuid": self.capsule_uuid,
             "claim_uuid": self.claim_uuid,
+            "detail": self.detail,
             "create_time": self.create_time
         }
\ No newline at end of file
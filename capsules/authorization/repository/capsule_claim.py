@@ -13,14 +13,13 @@ class CapsuleClaimRepository:
 
     async def create_capsule_claim(self, db: SessionDep, capsule_claim_in: CapsuleClaimModel, signature: str) -> CapsuleClaim:
         """
-        存储1阶胶囊授权指令到数据库
+        存储1阶胶囊授权指令到数据库，由调用方的事务提交
         """
         logger.info(f"Create capsule claim: {capsule_claim_in}")
         db_capsule_claim = CapsuleClaim(**capsule_claim_in.model_dump(exclude_unset= True))
         db_capsule_claim.authorizer_signature = signature
         db.add(db_capsule_claim)
-        db.commit()
-        db.refresh(db_capsule_claim)
+        db.flush()
         logger.info(f"Create capsule claim successfully: {db_capsule_claim}")
         return db_capsule_claim
 
@@ -29,15 +28,14 @@ class CapsuleClaimRepository:
 
     async def deprecate_capsule_claim(self, db: SessionDep, capsule_claim_uuid: str):
         """
-        删除1阶胶囊授权指令
+        删除1阶胶囊授权指令，由调用方的事务提交
         """
         logger.info(f"Deprecate capsule claim: {capsule_claim_uuid}")
         db_capsule_claim = db.query(CapsuleClaim).filter(CapsuleClaim.uuid == capsule_claim_uuid).first()
         if db_capsule_claim:
             # 更新deprecated字段为1
             db_capsule_claim.deprecated = 1
-            db.commit()
-            db.refresh(db_capsule_claim)
+            db.flush()
             logger.info(f"Deprecate capsule claim successfully: {db_capsule_claim}")
             return True
         else:
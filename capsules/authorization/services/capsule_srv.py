@@ -1,10 +1,13 @@
+import asyncio
 import base64
+import contextlib
 import json
 import logging
 import mimetypes
 import os.path
+import uuid
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable
 
 from sqlmodel import Session
 
@@ -12,21 +15,31 @@ from capsules.audit.repository.audits import audit_repository
 from capsules.authorization.models.claim import CapsuleClaimModel
 from capsules.authorization.models.collector import CollectorPropModel
 from capsules.authorization.repository.capsule_claim import capsule_claim_repo
+from capsules.authorization.schema import CapsuleClaim
+from capsules.authorization.services.collect_job import collect_job_registry, CollectJob
+from capsules.authorization.services.extraction_cache import extraction_cache_srv
 from capsules.authorization.services.capsule_privacy import capsule_privacy_srv
 from capsules.core.models.additional_props import CapsuleAdditionalPropsModel
 from capsules.core.models.capsule import DataCapsuleModel
 from capsules.core.repository.additional_props import additional_props_repository
 from capsules.core.repository.data_capsule import data_capsule_repo
-from capsules.utils import minio_client
+from capsules.utils import object_store
+from capsules.utils.image_processor import ImageProcessor
 from capsules.utils.pdf_processor import PdfProcessor
+from capsules.utils.stage_timer import StageTimer
 from common.bus_exception import BusException
-from common.db_deps import SessionDep
+from common.db_deps import SessionDep, unit_of_work
+from common.keyset_cursor import build_page, decode_cursor, page_size
+from config.database import engine
 from llm.medical.capsule_loader import CapsuleLoader
+from llm.medical.prompt_minimizer import minimize_with_stats
+from llm.medical.template_extractor import extract_by_template, has_template
 from pki.kms import SecretKey, DigitalSignature
 from pki.kms.core.aes import AESCipher
 from pki.kms.core.rsa import RSACipher
 from pki.kms.key_model import KeyModel
 from pki.kms.key_repository import key_repository
+from settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -34,13 +47,15 @@ class CapsuleService:
     def __init__(self):
         self.pdf_processor = PdfProcessor()
 
-    async def wrap_data_capsule(self, db: SessionDep, file: str, props: CollectorPropModel) -> str | None:
+    async def wrap_data_capsule(self, db: SessionDep, file: str, props: CollectorPropModel,
+                                on_stage: Callable[[str, dict], None] = None) -> str | None:
         """
         根据传入的报告内容和附属信息，进行1阶胶囊的数据封装
 
         参数:
         - file： 医疗数据报告地址
         - props: 报告附属信息
+        - on_stage: 可选的进度回调，依次以parsed, extracted, encrypted, stored阶段调用
 
         处理流程：
         - 预处理：
@@ -66,6 +81,11 @@ class CapsuleService:
         - 生成数据采集者到数据拥有者的授权记录
         - 生成1阶胶囊封装审计日志
         """
+        # 胶囊UUID预先生成，原始报告上传不必等待落库即可开始
+        capsule_uuid = str(uuid.uuid4())
+        timer = StageTimer()
+        upload_task = None
+        stored = False
         try:
             # 1. 预处理阶段
             # 1.1 检测输入文件是否存在
@@ -74,92 +94,334 @@ class CapsuleService:
                 logger.error(f"File not found: {file}")
                 raise BusException(code=10001, message="上传的医疗检测报告文件不存在。")
 
-            # 1.2 获取文档的MIME类型,如果是图片类型，则通过调用视觉理解LLM进行处理，并返回处理结果
-            mime_type = mimetypes.guess_type(file)[0]
-            if mime_type and mime_type.startswith("image/"):
-                logger.info("Processing image")
-                source_data = await self._extract_raw_data_from_vision(file)
-            else:
-                logger.info("Processing PDF")
-                source_data = PdfProcessor.extract_content_for_markdown(file, False, False)
+            # 4. 原始医疗影像数据的存储到MinIO对象存储，只依赖文件本身，与解析和LLM提取并行执行
+            upload_task = asyncio.create_task(timer.run("upload", self._store_medical_images(file, capsule_uuid)))
 
-            if not source_data:
-                raise BusException(code=10002, message="解析用户医疗检测报告内容失败")
-            
-            # 1.2 将解析出来的内容交给LLM提取原始数据内容JSON
-            raw_data = await self._extract_raw_data_from_llm(source_data)
-            
-            # 1.3 采用ZKP算法计算数据概要数据
-            summary_data = await self._generate_summary_data(source_data)
-            
-            # 1.4 生成基因数据
-            gene_data = await self._generate_gene_data(props)
-            
-            # 2. 加密阶段
-            # 如果已经存在可用的AES密钥，则直接使用
-            existed_aes_key = await self._get_aes_key(db)
-            if not existed_aes_key:
-                # 2.1 从KMS服务获取对称加密密钥
-                logger.info("Generating AES key")
-                aes_key = AESCipher.generate_key()
-                aes_iv = AESCipher.generate_iv()
-            else:
-                # 2.2 从数据库中获取密钥,并将base64编码后的密钥和初始向量进行base64解码转为bytes类型
-                logger.info("Use the exist AES key.")
-                aes_key = base64.b64decode(existed_aes_key.aes_key)
-                aes_iv = base64.b64decode(existed_aes_key.aes_iv)
+            raw_data, summary_data, gene_data = await self._extract_capsule_data(file, props, timer, on_stage)
 
+            # 2. 加密阶段
+            aes_key, aes_iv, existed_aes_key = await self._resolve_aes_key(db)
             aes_cipher = AESCipher(aes_key, aes_iv)
-            
+
             # 2.2 采用AES-CBC加密算法对raw_data, zkp_data和gene_data进行加密
-            logger.info("Encrypting data")
-            raw_encrypted = self._encrypt_data(raw_data, aes_cipher)
-            summary_encrypted = self._encrypt_data(summary_data, aes_cipher)
-            gene_encrypted = self._encrypt_data(gene_data, aes_cipher)
-            
             # 2.3 采用数据银行的私钥对数据内容进行签名得到signature
-            signature = self._sign_data(raw_data, summary_data, gene_data)
+            # 加密和签名为CPU密集型操作，在线程池中执行，避免阻塞事件循环
+            with timer.stage("crypto"):
+                raw_encrypted, summary_encrypted, gene_encrypted, signature = await asyncio.to_thread(
+                    self._seal_data, raw_data, summary_data, gene_data, aes_cipher)
             logger.info(f"Signing data: {signature}")
-            # 3. 存储阶段
-
-            # 3.1 创建胶囊附属信息
-            additional_props_model = CapsuleAdditionalPropsModel(
-                age=props.age,
-                area=props.area,
-                producer=props.collector,
-                producer_time=props.collector_time,
-                owner=props.owner,
-                sexy=props.sexy,
-                type=props.type,
-                level=1
-            )
-            additional_props = await additional_props_repository.create_additional_props(db, additional_props_model)
-            
-            # 3.2 存储数据加密密钥到secret_keys (这里简化处理，实际应安全存储)
-
-            secret_key = await self._store_encryption_key(db, aes_key, aes_iv) if not existed_aes_key else existed_aes_key
-            # 3.3 创建数据胶囊
-            data_capsule_model = DataCapsuleModel(
-                summary_ciphertext=summary_encrypted,
-                gene_ciphertext=gene_encrypted,
-                raw_ciphertext=raw_encrypted,
-                signature=signature,
-                aes_key_id=secret_key.id,
-                additional_props_id=additional_props.id
-            )
-            # 3.4 存储到数据库
-            data_capsule = await data_capsule_repo.create_data_capsule(db, data_capsule_model)
-            # 4. (可选)原始医疗影像数据的存储到MinIO对象存储
-            await self._store_medical_images(file, data_capsule.uuid)
-            logger.info(f"Data capsule created successfully with UUID: {data_capsule.uuid}")
-            await self._generate_claim(db, data_capsule.uuid, props.owner, props.collector)
-            await self._generate_audit_log(db, data_capsule.uuid)
-
-            return data_capsule.uuid
-            
+            self._report_stage(on_stage, "encrypted")
+
+            # 原始报告上传完成后再落库，保证胶囊记录和原始文件一致
+            await upload_task
+
+            # 3. 存储阶段，附属信息、密钥、胶囊和审计日志在同一事务中写入，只提交一次，失败时整体回滚
+            with unit_of_work(db):
+                with timer.stage("store"):
+                    # 3.1 创建胶囊附属信息
+                    additional_props_model = self._build_additional_props(props)
+                    additional_props = await additional_props_repository.create_additional_props(db, additional_props_model)
+
+                    # 3.2 存储数据加密密钥到secret_keys (这里简化处理，实际应安全存储)
+
+                    secret_key = await self._store_encryption_key(db, aes_key, aes_iv) if not existed_aes_key else existed_aes_key
+                    # 3.3 创建数据胶囊
+                    data_capsule_model = DataCapsuleModel(
+                        uuid=capsule_uuid,
+                        summary_ciphertext=summary_encrypted,
+                        gene_ciphertext=gene_encrypted,
+                        raw_ciphertext=raw_encrypted,
+                        signature=signature,
+                        aes_key_id=secret_key.id,
+                        additional_props_id=additional_props.id
+                    )
+                    # 3.4 存储到数据库
+                    data_capsule = await data_capsule_repo.create_data_capsule(db, data_capsule_model)
+                await self._generate_claim(db, data_capsule.uuid, props.owner, props.collector)
+                # 5. 生成1阶胶囊封装审计日志，记录各阶段耗时
+                await self._generate_audit_log(db, data_capsule.uuid, timer.to_dict())
+            stored = True
+            logger.info(f"Data capsule created successfully with UUID: {capsule_uuid}")
+            self._report_stage(on_stage, "stored", {"capsule_uuid": capsule_uuid})
+
+            return capsule_uuid
+
         except Exception as e:
             logger.error(f"Failed to wrap data capsule: {str(e)}")
+            if upload_task is not None and not stored:
+                await self._discard_medical_images(upload_task, capsule_uuid)
             raise BusException(code=10007, message="数据胶囊封装失败")
+        finally:
+            if upload_task is not None and not upload_task.done():
+                # 被取消(如客户端断开)时不会进入except，先取消并等待上传结束，再删除上传中的临时文件和已上传的对象
+                upload_task.cancel()
+                with contextlib.suppress(asyncio.CancelledError, Exception):
+                    await upload_task
+                if not stored:
+                    with contextlib.suppress(Exception):
+                        await object_store.delete_file(capsule_uuid)
+            # 解析和上传都结束后再删除临时文件
+            if os.path.exists(file):
+                os.remove(file)
+
+    def submit_wrap_job(self, file: str, props: CollectorPropModel, key: str = None,
+                        owner: str = None) -> tuple[CollectJob, bool]:
+        """
+        提交后台胶囊封装任务并立即返回，封装进度通过任务的事件上报
+
+        Args:
+            file: 已保存的医疗数据报告地址
+            props: 报告附属信息
+            key: 去重键，同一租户相同键的未失败任务直接复用
+            owner: 提交任务的租户，只有该租户可以查询任务
+
+        Returns:
+            tuple: (采集任务, 是否为新建任务)
+        """
+        async def runner(job: CollectJob) -> str:
+            # 请求结束后其数据库会话即被关闭，后台任务使用独立的会话
+            with Session(engine) as db:
+                return await self.wrap_data_capsule(db, file, props, on_stage=job.emit)
+
+        job, created = collect_job_registry.submit(key, runner, owner)
+        if not created and os.path.exists(file):
+            # 重复提交的文件不再处理
+            os.remove(file)
+        return job, created
+
+    def submit_batch_wrap_job(self, items: List[tuple[str, str, CollectorPropModel]], rejected: List[dict | None],
+                              owner: str = None) -> CollectJob:
+        """
+        提交后台批量封装任务并立即返回，任务结束后各报告的处理结果通过任务查询
+
+        Args:
+            items: (原始文件名, 已保存的医疗数据报告地址, 报告附属信息)列表
+            rejected: 与上传文件顺序一致的列表，附属信息无效的文件为其失败结果，其余为None，按顺序由items的结果填充
+            owner: 提交任务的租户，只有该租户可以查询任务
+
+        Returns:
+            CollectJob: 采集任务
+        """
+        async def runner(job: CollectJob) -> List[dict]:
+            try:
+                with Session(engine) as db:
+                    wrapped = iter(await self.wrap_data_capsules(db, items) if items else [])
+            except Exception:
+                # 整批失败时(如获取密钥失败)删除尚未处理的临时文件
+                for _, file, _ in items:
+                    if os.path.exists(file):
+                        os.remove(file)
+                raise
+            results = [result if result is not None else next(wrapped) for result in rejected]
+            logger.info(f"Batch collect job {job.job_id} processed {len(results)} files")
+            return results
+
+        job, _ = collect_job_registry.submit(None, runner, owner)
+        return job
+
+    async def wrap_data_capsules(self, db: SessionDep, items: List[tuple[str, str, CollectorPropModel]]) -> List[dict]:
+        """
+        批量封装1阶胶囊，用于医院批量上传检测报告
+
+        各报告以settings.batch_collect_concurrency为上限并发执行上传、解析、LLM提取和加密签名，
+        整批共享一次AES密钥查询和一份签名私钥，LLM调用复用进程内的客户端连接池；全部报告处理完成后，
+        胶囊附属信息、胶囊和审计日志分别批量写入数据库。单个报告失败不影响同批其他报告。
+
+        Args:
+            db: 数据库会话
+            items: (原始文件名, 已保存的医疗数据报告地址, 报告附属信息)列表
+
+        Returns:
+            List[dict]: 与items顺序一致的处理结果，包含file, status(succeeded | failed), capsule_uuid和error
+        """
+        semaphore = asyncio.Semaphore(settings.batch_collect_concurrency)
+        aes_key, aes_iv, existed_aes_key = await self._resolve_aes_key(db)
+        aes_cipher = AESCipher(aes_key, aes_iv)
+        private_key = self._load_signing_key()
+
+        async def wrap_one(name: str, file: str, props: CollectorPropModel) -> tuple[dict, dict | None]:
+            result = {"file": name, "status": "failed", "capsule_uuid": None, "error": None}
+            async with semaphore:
+                capsule_uuid = str(uuid.uuid4())
+                timer = StageTimer()
+                upload_task = None
+                try:
+                    if not os.path.exists(file):
+                        raise BusException(code=10001, message="上传的医疗检测报告文件不存在。")
+                    upload_task = asyncio.create_task(timer.run("upload", self._store_medical_images(file, capsule_uuid)))
+                    raw_data, summary_data, gene_data = await self._extract_capsule_data(file, props, timer)
+                    with timer.stage("crypto"):
+                        raw_encrypted, summary_encrypted, gene_encrypted, signature = await asyncio.to_thread(
+                            self._seal_data, raw_data, summary_data, gene_data, aes_cipher, private_key)
+                    await upload_task
+                except Exception as e:
+                    logger.error(f"Failed to wrap data capsule of {name}: {str(e)}")
+                    if upload_task is not None:
+                        await self._discard_medical_images(upload_task, capsule_uuid)
+                    result["error"] = getattr(e, "message", None) or str(e)
+                    return result, None
+                finally:
+                    if os.path.exists(file):
+                        os.remove(file)
+
+            result["capsule_uuid"] = capsule_uuid
+            sealed = {
+                "props": self._build_additional_props(props),
+                "capsule": DataCapsuleModel(
+                    uuid=capsule_uuid,
+                    summary_ciphertext=summary_encrypted,
+                    gene_ciphertext=gene_encrypted,
+                    raw_ciphertext=raw_encrypted,
+                    signature=signature
+                ),
+                "timer": timer
+            }
+            return result, sealed
+
+        wrapped = await asyncio.gather(*(wrap_one(name, file, props) for name, file, props in items))
+
+        sealed_items = [(result, sealed) for result, sealed in wrapped if sealed is not None]
+        if sealed_items:
+            try:
+                # 整批的密钥、附属信息、胶囊和审计日志在同一事务中批量写入，只提交一次
+                with unit_of_work(db):
+                    secret_key = existed_aes_key or await self._store_encryption_key(db, aes_key, aes_iv)
+                    rows = []
+                    for _, sealed in sealed_items:
+                        sealed["capsule"].aes_key_id = secret_key.id
+                        rows.append((sealed["props"], sealed["capsule"]))
+                    await data_capsule_repo.create_data_capsules(db, rows)
+                    await audit_repository.save_audits(db, [
+                        {"capsule_uuid": result["capsule_uuid"],
+                         "detail": json.dumps({"timings": sealed["timer"].to_dict()}, ensure_ascii=False)}
+                        for result, sealed in sealed_items
+                    ])
+                for result, _ in sealed_items:
+                    result["status"] = "succeeded"
+            except Exception as e:
+                logger.error(f"Failed to store data capsules: {str(e)}")
+                # 落库失败时整批已上传的原始报告一并删除，保证胶囊记录和原始文件一致
+                await asyncio.gather(*(object_store.delete_file(result["capsule_uuid"]) for result, _ in sealed_items),
+                                     return_exceptions=True)
+                for result, _ in sealed_items:
+                    result["capsule_uuid"] = None
+                    result["error"] = "数据胶囊存储失败"
+
+        results = [result for result, _ in wrapped]
+        logger.info(f"Batch wrapped {len(sealed_items)} of {len(results)} data capsules")
+        return results
+
+    async def _extract_capsule_data(self, file: str, props: CollectorPropModel, timer: StageTimer,
+                                    on_stage: Callable[[str, dict], None] = None) -> tuple[Dict[str, Any], str, Dict[str, Any]]:
+        """
+        解析医疗数据报告，并通过表格模板或LLM提取原始数据和数据概要，生成基因数据
+
+        Args:
+            file: 医疗数据报告地址
+            props: 报告附属信息
+            timer: 阶段耗时记录
+            on_stage: 可选的进度回调
+
+        Returns:
+            tuple: (raw_data, summary_data, gene_data)
+        """
+        # 1.2 获取文档的MIME类型,如果是图片类型，则通过调用视觉理解LLM进行处理，并返回处理结果
+        mime_type = mimetypes.guess_type(file)[0]
+        is_image = bool(mime_type and mime_type.startswith("image/"))
+        # 固定版式的常规化验报告直接按表格模板提取，不调用LLM
+        if not is_image:
+            with timer.stage("template"):
+                extracted = await self._extract_data_by_template(file, props)
+            if extracted is not None:
+                self._report_stage(on_stage, "parsed")
+                self._report_stage(on_stage, "extracted")
+                raw_data, summary_data = extracted
+                return raw_data, summary_data, await self._generate_gene_data(props)
+
+        with timer.stage("parse"):
+            if is_image:
+                logger.info("Processing image")
+                source_data = await self._extract_raw_data_from_vision(file)
+            else:
+                logger.info("Processing PDF")
+                source_data = await PdfProcessor.convert_to_markdown(file)
+
+        if not source_data:
+            raise BusException(code=10002, message="解析用户医疗检测报告内容失败")
+        self._report_stage(on_stage, "parsed")
+
+        # 去除页眉页脚、表格填充和通用声明等无信息量的内容，减少LLM的输入token
+        if settings.prompt_minimize_enabled:
+            with timer.stage("minimize"):
+                source_data, token_stats = minimize_with_stats(source_data)
+            timer.record("prompt_tokens", token_stats)
+
+        # 1.2 将解析出来的内容交给LLM提取原始数据内容JSON
+        # 1.3 采用ZKP算法计算数据概要数据
+        # 两次LLM调用相互独立，并发执行，耗时取决于较慢的一次
+        raw_data, summary_data = await asyncio.gather(
+            timer.run("llm_raw", self._extract_raw_data_from_llm(source_data)),
+            timer.run("llm_summary", self._generate_summary_data(source_data))
+        )
+
+        self._report_stage(on_stage, "extracted")
+
+        # 1.4 生成基因数据
+        gene_data = await self._generate_gene_data(props)
+        return raw_data, summary_data, gene_data
+
+    async def _extract_data_by_template(self, file: str, props: CollectorPropModel) -> tuple[Dict[str, Any], str] | None:
+        """
+        按胶囊类型和采集机构匹配表格模板提取器，直接从报告表格提取raw_data并生成数据概要
+
+        Returns:
+            tuple | None: (raw_data, summary_data)，未启用、没有匹配的模板或置信度不足时返回None，由LLM提取
+        """
+        if not settings.fast_path_enabled or not has_template(props.type, props.collector):
+            return None
+        try:
+            tables = await PdfProcessor.find_tables(file)
+            report_time = props.collector_time.strftime("%Y-%m-%d %H:%M:%S") if props.collector_time else None
+            extracted = extract_by_template(props.type, props.collector, tables, report_time,
+                                            settings.fast_path_min_confidence)
+        except Exception as e:
+            logger.warning(f"Failed to extract data by template: {str(e)}")
+            return None
+        if extracted is None:
+            logger.info(f"Template extraction of capsule type {props.type} is not confident, fall back to LLM")
+        return extracted
+
+    async def _resolve_aes_key(self, db: Session) -> tuple[bytes, bytes, SecretKey | None]:
+        """
+        获取数据加密密钥，如果已经存在可用的AES密钥则直接使用，否则生成新的密钥(由调用方在落库时存储)
+
+        Returns:
+            tuple: (aes_key, aes_iv, 已存在的密钥记录或None)
+        """
+        existed_aes_key = await self._get_aes_key(db)
+        if not existed_aes_key:
+            # 2.1 从KMS服务获取对称加密密钥
+            logger.info("Generating AES key")
+            return AESCipher.generate_key(), AESCipher.generate_iv(), None
+        # 2.2 从数据库中获取密钥,并将base64编码后的密钥和初始向量进行base64解码转为bytes类型
+        logger.info("Use the exist AES key.")
+        return base64.b64decode(existed_aes_key.aes_key), base64.b64decode(existed_aes_key.aes_iv), existed_aes_key
+
+    @staticmethod
+    def _build_additional_props(props: CollectorPropModel) -> CapsuleAdditionalPropsModel:
+        """
+        根据报告附属信息创建1阶胶囊附属信息
+        """
+        return CapsuleAdditionalPropsModel(
+            age=props.age,
+            area=props.area,
+            producer=props.collector,
+            producer_time=props.collector_time,
+            owner=props.owner,
+            sexy=props.sexy,
+            type=props.type,
+            level=1
+        )
 
     async def _extract_raw_data_from_llm(self, markdown_content: str) -> Dict[str, Any]:
         """
@@ -174,13 +436,19 @@ class CapsuleService:
         # 实现与LLM的交互，将markdown_content交给LLM处理
         # 后续代码需要写入到llm包的medical子包下对应的代码文件里面
         logger.info("Extracting raw data from LLM")
-        # 临时返回示例数据
+        # 相同报告内容重复提交时直接使用缓存的提取结果
+        content_hash = extraction_cache_srv.content_hash(markdown_content)
+        cached = await extraction_cache_srv.get("raw_data", content_hash)
+        if cached is not None:
+            return cached
         try:
             capsule_loader = CapsuleLoader()
-            return await capsule_loader.calc_raw_data_by_bnf(markdown_content)
+            raw_data = await capsule_loader.calc_raw_data_by_bnf(markdown_content)
         except Exception as e:
             logger.error(f"Failed to extract raw data: {str(e)}")
             raise BusException(code=10003, message="解析用户医疗检测报告提取BNF内容失败")
+        await extraction_cache_srv.put("raw_data", content_hash, raw_data)
+        return raw_data
 
     async def _generate_summary_data(self, raw_data: str) -> str:
         """
@@ -195,13 +463,18 @@ class CapsuleService:
         # 实现数据概要计算逻辑
         logger.info("Generating summary data - placeholder implementation")
         # raw_data = json.dumps(raw_data, ensure_ascii=False)
-        # 临时返回示例数据
+        content_hash = extraction_cache_srv.content_hash(raw_data)
+        cached = await extraction_cache_srv.get("summary_data", content_hash)
+        if cached is not None:
+            return cached
         try:
             capsule_loader = CapsuleLoader()
-            return await capsule_loader.calc_summary_data_by_bnf(raw_data)
+            summary_data = await capsule_loader.calc_summary_data_by_bnf(raw_data)
         except Exception as e:
             logger.error(f"Failed to generate ZKP data: {str(e)}")
             raise BusException(code=10004, message="解析用户医疗检测报告生成数据概要失败")
+        await extraction_cache_srv.put("summary_data", content_hash, summary_data)
+        return summary_data
 
     async def _generate_gene_data(self, props: CollectorPropModel) -> Dict[str, Any]:
         """
@@ -253,7 +526,8 @@ class CapsuleService:
             logger.error(f"Failed to encrypt data: {str(e)}")
             raise BusException(code=10005, message="加密解析后的医疗数据失败")
 
-    def _sign_data(self, raw_data: Dict[str, Any], summary_data: str | Dict[str, Any], gene_data: Dict[str, Any]) -> str:
+    def _sign_data(self, raw_data: Dict[str, Any], summary_data: str | Dict[str, Any], gene_data: Dict[str, Any],
+                   private_key: str = None) -> str:
         """
         采用数据银行的私钥对数据内容进行签名
         
@@ -261,6 +535,7 @@ class CapsuleService:
             raw_data: 原始数据
             summary_data: ZKP数据
             gene_data: 基因数据
+            private_key: 可选的已加载私钥，为空时从数字证书文件读取
             
         Returns:
             str: 签名结果
@@ -272,8 +547,8 @@ class CapsuleService:
                 "summary_data": summary_data,
                 "gene_data": gene_data
             }, sort_keys=True)
-            # TODO: 获取数据银行的数字证书
-            private_key = "数字证书.pem"
+            if private_key is None:
+                private_key = self._load_signing_key()
             # 使用RSA私钥签名
             digital_signature = DigitalSignature()
             bytes_sig =  digital_signature.sign(data_to_sign, private_key)
@@ -283,6 +558,43 @@ class CapsuleService:
             logger.error(f"Failed to sign data: {str(e)}")
             raise BusException(code=10006, message="数据签名失败")
 
+    @staticmethod
+    def _report_stage(on_stage: Callable[[str, dict], None] | None, stage: str, data: dict = None):
+        """
+        上报封装进度，回调异常不影响封装流程
+        """
+        if on_stage is None:
+            return
+        try:
+            on_stage(stage, data or {})
+        except Exception as e:
+            logger.warning(f"Failed to report stage {stage}: {str(e)}")
+
+    def _seal_data(self, raw_data: Dict[str, Any], summary_data: str | Dict[str, Any], gene_data: Dict[str, Any],
+                   aes_cipher: AESCipher, private_key: str = None) -> tuple[str, str, str, str]:
+        """
+        加密raw_data, summary_data和gene_data并签名，同步执行，由调用方放入线程池
+
+        Returns:
+            tuple: (raw密文, summary密文, gene密文, 签名)
+        """
+        return (self._encrypt_data(raw_data, aes_cipher),
+                self._encrypt_data(summary_data, aes_cipher),
+                self._encrypt_data(gene_data, aes_cipher),
+                self._sign_data(raw_data, summary_data, gene_data, private_key))
+
+    @staticmethod
+    def _load_signing_key() -> str:
+        """
+        加载数据银行的签名私钥，批量封装时只加载一次
+        """
+        # TODO: 获取数据银行的数字证书
+        private_key = "数字证书.pem"
+        if os.path.exists(private_key):
+            with open(private_key) as f:
+                return f.read()
+        return private_key
+
     async def _store_encryption_key(self, db: Session, key: bytes, iv: bytes) -> SecretKey:
         """
         存储数据加密密钥到secret_keys
@@ -328,15 +640,22 @@ class CapsuleService:
             # PDF文件的mine type为application/pdf
             if not mine_type:
                 mine_type = "application/pdf"
-            await minio_client.upload_file(file_path, capsule_uuid, mine_type)
+            await object_store.upload_file(file_path, capsule_uuid, mine_type)
             logger.info(f"Storing medical images to MinIO for capsule: {capsule_uuid}")
             return True
         except Exception as e:
             logger.error(f"Failed to store medical images: {str(e)}")
             raise BusException(code=10010, message="原始医疗影像数据存储失败")
-        finally:
-            if os.path.exists(file_path):
-                os.remove(file_path)
+
+    async def _discard_medical_images(self, upload_task: asyncio.Task, capsule_uuid: str):
+        """
+        封装失败时删除已上传的原始医疗数据，上传尚未结束则等待其结束后再删除
+        """
+        try:
+            await upload_task
+            await object_store.delete_file(capsule_uuid)
+        except Exception as e:
+            logger.warning(f"Failed to discard medical images of capsule {capsule_uuid}: {str(e)}")
 
     async def _get_aes_key(self, db):
         """
@@ -344,11 +663,14 @@ class CapsuleService:
         """
         return await key_repository.get_first_undeprecated_key(db)
 
-    async def _generate_audit_log(self, db, uuid):
+    async def _generate_audit_log(self, db, uuid, timings: dict = None):
         """
-        生成1阶胶囊封装日志记录
+        生成1阶胶囊封装日志记录，timings为各阶段耗时
         """
-        audit_log = await audit_repository.save_audit(db, {"capsule_uuid": uuid})
+        audit_info = {"capsule_uuid": uuid}
+        if timings:
+            audit_info["detail"] = json.dumps({"timings": timings}, ensure_ascii=False)
+        audit_log = await audit_repository.save_audit(db, audit_info)
         logger.info(f"Audit log generated for capsule: {uuid}")
         return audit_log
 
@@ -364,36 +686,45 @@ class CapsuleService:
             str: 原始数据
         """
         # 根据胶囊的uuid从MinIO对象存储获取原始数据的签名访问链接
-        return minio_client.get_file_url(uuid)
+        return await object_store.get_file_url(uuid)
 
-    async def list_capsules(self, db: SessionDep, offset: int = 0, limit: int = 10) -> List[DataCapsuleModel]:
+    async def list_capsules(self, db: SessionDep, cursor: str = None, limit: int = 10,
+                            include_ciphertext: bool = False) -> dict:
         """
-        列出1阶胶囊列表
+        按创建时间倒序列出1阶胶囊列表，使用(create_time, id)键集分页
 
         Args:
             db: 数据库会话
-            offset: 偏移量
+            cursor: 上一页返回的next_cursor，为空时返回第一页
             limit: 限制数量
+            include_ciphertext: 是否返回密文和签名，默认只返回元数据
 
         Returns:
-            List[DataCapsuleModel]: 1阶胶囊列表
+            dict: {"items": 胶囊列表, "next_cursor": 下一页游标，没有更多数据时为None}
         """
-        return await data_capsule_repo.list_data_capsule(db, offset, limit)
+        limit = page_size(limit)
+        items = await data_capsule_repo.list_data_capsule(db, decode_cursor(cursor), limit, include_ciphertext)
+        return build_page(items, limit)
 
-    async def list_capsules_by_owner(self, db: SessionDep, owner: str, offset: int = 0, limit: int = 10) -> List[DataCapsuleModel]:
+    async def list_capsules_by_owner(self, db: SessionDep, owner: str, cursor: str = None, limit: int = 10,
+                                     include_ciphertext: bool = False) -> dict:
         """
-        列出指定用户创建的1阶胶囊列表
+        按创建时间倒序列出指定用户的1阶胶囊列表，使用(create_time, id)键集分页
 
         Args:
             db: 数据库会话
             owner: 胶囊拥有者
-            offset: 偏移量
+            cursor: 上一页返回的next_cursor，为空时返回第一页
             limit: 限制数量
+            include_ciphertext: 是否返回密文和签名，默认只返回元数据
 
         Returns:
-            List[DataCapsuleModel]: 1阶胶囊列表
+            dict: {"items": 胶囊列表, "next_cursor": 下一页游标，没有更多数据时为None}
         """
-        return await data_capsule_repo.list_data_capsules_by_owner(db, owner, offset, limit)
+        limit = page_size(limit)
+        items = await data_capsule_repo.list_data_capsules_by_owner(db, owner, decode_cursor(cursor), limit,
+                                                                    include_ciphertext)
+        return build_page(items, limit)
 
     async def grant_capsules(self, db: SessionDep, claim: CapsuleClaimModel, signature: str) -> str:
         """
@@ -408,7 +739,8 @@ class CapsuleService:
         """
         # TODO: 验证授权者数字证书签名
 
-        capsule_claim = await capsule_claim_repo.create_capsule_claim(db, claim,  signature)
+        with unit_of_work(db):
+            capsule_claim = await capsule_claim_repo.create_capsule_claim(db, claim,  signature)
         if not capsule_claim:
             raise BusException(20001, "授权失败")
         return capsule_claim.uuid
@@ -435,29 +767,101 @@ class CapsuleService:
             logger.info("Public authorization instruction")
             capsules = await data_capsule_repo.list_capsules_by_uuids(db, claim.capsules)
             if claim.one_time_use:
-                await capsule_claim_repo.deprecate_capsule_claim(db, claim_uuid)
+                with unit_of_work(db):
+                    await capsule_claim_repo.deprecate_capsule_claim(db, claim_uuid)
             return capsules
         # 非公开授权指令，则调用权益管理模块返回计算后的数据信息
         return await capsule_privacy_srv.get_capsules_by_claim(claim)
 
+    async def authorize_raw_access(self, db, claim_uuid: str, owner: str, capsule_uuid: str,
+                                   range_header: str = None) -> tuple[CapsuleClaim, dict]:
+        """
+        校验授权指令是否允许申请者下载胶囊的原始数据，并记录访问审计日志
+
+        一次性授权指令在本次访问后即被废弃，因此不支持断点续传，调用方应返回完整对象。
+        先获取原始数据对象的元数据，对象不存在时请求失败且授权指令不被消耗，之后才记录审计并废弃一次性授权指令
+
+        Args:
+            db: 数据库会话
+            claim_uuid: 授权指令UUID
+            owner: 数据访问申请者
+            capsule_uuid: 胶囊UUID
+            range_header: 请求的字节范围，记录到审计日志
+
+        Returns:
+            tuple: (授权指令, 原始数据对象的元数据)
+        """
+        if not claim_uuid:
+            raise BusException(20002, "授权指令不能为空")
+        claim = await capsule_claim_repo.get_capsule_claim(db, claim_uuid)
+        if claim is None or claim.deprecated:
+            raise BusException(20005, "授权指令不存在或已废弃")
+        if owner != claim.receiver:
+            logger.error("Data access applicant and authorization instruction owner information do not match")
+            raise BusException(20003, "数据访问申请者和授权指令拥有者信息不匹配")
+        if claim.expires_at and claim.expires_at < datetime.now():
+            raise BusException(20004, "授权指令已过期")
+        if capsule_uuid not in self._claim_capsules(claim):
+            raise BusException(20006, "授权指令不包含该数据胶囊")
+        # 非公开授权指令只能访问权益管理模块计算后的数据
+        if claim.privacy_level != 0:
+            raise BusException(20007, "授权指令的隐私等级不允许访问原始数据")
+        stat = await object_store.stat_file(capsule_uuid)
+
+        # 访问审计和一次性授权指令的废弃在同一事务中提交
+        with unit_of_work(db):
+            await audit_repository.save_audit(db, {
+                "capsule_uuid": capsule_uuid,
+                "claim_uuid": claim_uuid,
+                "detail": json.dumps({"action": "raw_download", "receiver": owner,
+                                      "range": None if claim.one_time_use else range_header}, ensure_ascii=False)
+            })
+            if claim.one_time_use:
+                await capsule_claim_repo.deprecate_capsule_claim(db, claim_uuid)
+        return claim, stat
+
+    @staticmethod
+    def _claim_capsules(claim: CapsuleClaim) -> List[str]:
+        """
+        授权指令包含的胶囊UUID列表，存储为JSON数组或逗号分隔的文本
+        """
+        capsules = claim.capsules
+        if isinstance(capsules, str):
+            try:
+                capsules = json.loads(capsules)
+            except ValueError:
+                capsules = [item.strip() for item in capsules.split(",")]
+        return list(capsules or [])
+
     async def _generate_claim(self, db, uuid, owner, collector):
         pass
 
-    async def _extract_raw_data_from_vision(self, file):
+    async def _extract_raw_data_from_vision(self, file: str):
         """
         调用视觉理解模型解析图片内容
-        """
-        # 1. 将图片内容读取并转为Base64编码
-        with open(file, "rb") as f:
-            image_base64 = base64.b64encode(f.read()).decode('utf-8')
+
+        Args:
+            file: 图片文件路径
+        """
+        # 1. 图片预处理(旋转、裁剪、缩小、重新压缩)，预处理后内容相同的图片重复提交时直接使用缓存的解析结果。
+        # 缓存按内容的SHA-256匹配，不做感知哈希去重：同一报告重新拍摄的照片会重新解析，
+        # 以免感知哈希相近的不同报告(如同一版式、数值不同)误用彼此的解析结果
+        image = await ImageProcessor.prepare_for_vision(file)
+        content_hash = extraction_cache_srv.content_hash(image.data)
+        cached = await extraction_cache_srv.get("vision", content_hash)
+        if cached is not None:
+            return cached
+        image_base64 = base64.b64encode(image.data).decode('utf-8')
 
         # 2. 调用视觉理解模型解析图片内容
         try:
             capsule_loader = CapsuleLoader()
-            return await capsule_loader.extract_text_from_image(image_base64)
+            text = await capsule_loader.extract_text_from_image(image_base64, image.media_type)
         except Exception as e:
             logger.error(f"Failed to extract text from image: {str(e)}")
             raise BusException(10008, "图片内容解析失败")
+        await extraction_cache_srv.put("vision", content_hash, text)
+        return text
 
 
 
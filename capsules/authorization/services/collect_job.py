@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Callable, Awaitable
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# 胶囊封装进度阶段，按顺序上报
+COLLECT_STAGES = ["parsed", "extracted", "encrypted", "stored"]
+
+
+class CollectJob:
+    """
+    异步采集任务，记录胶囊封装的状态和已上报的进度事件，owner为提交任务的租户，只有该租户可以查询任务
+    """
+
+    def __init__(self, key: str = None, owner: str = None):
+        self.job_id = str(uuid.uuid4())
+        self.key = key
+        self.owner = owner
+        # pending | running | succeeded | failed
+        self.status = "pending"
+        self.stage = None
+        self.capsule_uuid = None
+        # 批量任务各报告的处理结果
+        self.results: list[dict] | None = None
+        self.error = None
+        self.events: list[dict] = []
+        self.create_time = datetime.now()
+        self.finished_at = None
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def emit(self, event: str, data: dict = None):
+        """
+        上报进度事件，并唤醒所有订阅者
+        """
+        if event in COLLECT_STAGES:
+            self.stage = event
+        payload = {"job_id": self.job_id, "status": self.status, **(data or {})}
+        self.events.append({"event": event, "data": payload})
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def to_dict(self) -> dict:
+        data = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "capsule_uuid": self.capsule_uuid,
+            "error": self.error,
+            "create_time": self.create_time
+        }
+        if self.results is not None:
+            data.update(self.summary())
+            data["results"] = self.results
+        return data
+
+    def summary(self) -> dict:
+        """
+        批量任务的成功和失败数量
+        """
+        succeeded = sum(1 for result in self.results or [] if result["status"] == "succeeded")
+        return {"total": len(self.results or []), "succeeded": succeeded, "failed": len(self.results or []) - succeeded}
+
+    async def subscribe(self) -> AsyncIterator[dict]:
+        """
+        按顺序返回已上报和后续上报的进度事件，任务结束后退出
+        """
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.finished:
+                return
+            await changed.wait()
+
+
+class CollectJobRegistry:
+    """
+    进程内的采集任务注册表，结束的任务保留settings.collect_job_ttl_minutes分钟供查询。
+
+    同一租户对同一文件内容和拥有者的重复提交(客户端超时重试)复用未失败的已有任务，不会重复封装。
+    任务只保存在提交任务的进程中，部署多个uvicorn worker时其他worker查询不到该任务(返回404)，
+    因此要求单worker部署，或由网关按job_id/租户做粘性路由，使任务的提交、查询和事件订阅落到同一进程。
+    """
+
+    def __init__(self):
+        self.jobs: dict[str, CollectJob] = {}
+        self.keys: dict[str, str] = {}
+
+    def submit(self, key: str, runner: Callable[[CollectJob], Awaitable[str | list[dict]]],
+               owner: str = None) -> tuple[CollectJob, bool]:
+        """
+        提交采集任务，runner在事件循环中后台执行，并通过job.emit上报进度
+
+        Args:
+            key: 去重键，同一租户相同键的未失败任务直接复用
+            runner: 任务执行函数，返回胶囊UUID，批量任务返回各报告的处理结果列表
+            owner: 提交任务的租户
+
+        Returns:
+            tuple: (任务, 是否为新建任务)
+        """
+        self._evict()
+        # 去重键按租户隔离，不会复用其他租户的任务
+        key = f"{owner}:{key}" if key else None
+        existed = self.jobs.get(self.keys.get(key)) if key else None
+        if existed is not None and existed.status != "failed":
+            logger.info(f"Collect job {existed.job_id} already submitted for key {key}")
+            return existed, False
+
+        job = CollectJob(key, owner)
+        self.jobs[job.job_id] = job
+        if key:
+            self.keys[key] = job.job_id
+        job.task = asyncio.create_task(self._run(job, runner))
+        return job, True
+
+    def get(self, job_id: str, owner: str = None) -> CollectJob | None:
+        """
+        获取任务，不属于owner的任务按不存在处理，不暴露其他租户的任务状态和胶囊UUID
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.owner != owner:
+            return None
+        return job
+
+    async def _run(self, job: CollectJob, runner: Callable[[CollectJob], Awaitable[str | list[dict]]]):
+        job.status = "running"
+        try:
+            result = await runner(job)
+            job.status = "succeeded"
+            if isinstance(result, list):
+                job.results = result
+                job.emit("completed", job.summary())
+            else:
+                job.capsule_uuid = result
+                job.emit("completed", {"capsule_uuid": job.capsule_uuid})
+        except Exception as e:
+            logger.error(f"Collect job {job.job_id} failed: {e}")
+            job.status = "failed"
+            # BusException只携带message
+            job.error = getattr(e, "message", None) or str(e)
+            job.emit("failed", {"error": job.error})
+        finally:
+            job.finished_at = time.monotonic()
+
+    def _evict(self):
+        expired = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None and
+                   time.monotonic() - job.finished_at > settings.collect_job_ttl_minutes * 60]
+        for job_id in expired:
+            job = self.jobs.pop(job_id)
+            if job.key and self.keys.get(job.key) == job_id:
+                del self.keys[job.key]
+
+
+collect_job_registry = CollectJobRegistry()
@@ -0,0 +1,135 @@
+import base64
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlmodel import Session
+
+from capsules.core.repository.extraction_cache import extraction_cache_repo
+from capsules.core.schema import ExtractionCache
+from common.db_deps import unit_of_work
+from config.database import engine
+from llm.model_provider.model_base import ModelBase
+from llm.prompts.bnf import get_capsule_section_version
+from pki.kms.core.aes import AESCipher
+from pki.kms.key_repository import key_repository
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCacheService:
+    """
+    LLM提取结果缓存，缓存键为(提取类型, 模型, 提示词模板版本, 报告内容SHA-256)。
+
+    同一份报告重复提交(客户端重试或分享给多个拥有者)时直接复用已校验的提取结果，不再调用LLM。
+    缓存内容使用KMS中未废弃的AES密钥加密存储，每条记录使用独立的IV，并在settings.extraction_cache_ttl_hours后过期。
+    缓存读写失败只记录日志，不影响胶囊封装。
+    """
+
+    @staticmethod
+    def content_hash(content: str | bytes) -> str:
+        """
+        计算报告内容的SHA-256
+        """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def _model_of(section: str, vendor: str = None) -> str:
+        model_settings = ModelBase.instance(vendor).model_settings
+        return model_settings["vision"] if section == "vision" else model_settings["default_model"]
+
+    async def get(self, section: str, content_hash: str, vendor: str = None) -> Any | None:
+        """
+        获取缓存的提取结果
+
+        Args:
+            section: 提取类型, raw_data | summary_data | vision
+            content_hash: 报告内容SHA-256
+            vendor: 模型供应商，默认为settings.sel_model_provider
+
+        Returns:
+            Any | None: 提取结果，未命中时返回None
+        """
+        if not settings.extraction_cache_enabled:
+            return None
+        try:
+            with Session(engine) as db:
+                entry = await extraction_cache_repo.get_entry(db, section, self._model_of(section, vendor),
+                                                              get_capsule_section_version(section), content_hash)
+                if entry is None:
+                    return None
+                secret_key = await key_repository.get_key(db, entry.key_uuid)
+                if secret_key is None:
+                    logger.warning(f"Key {entry.key_uuid} of extraction cache {entry.id} not found")
+                    return None
+                cipher = AESCipher(base64.b64decode(secret_key.aes_key), base64.b64decode(entry.aes_iv))
+                value = json.loads(cipher.decrypt(entry.ciphertext).decode("utf-8"))
+            logger.info(f"Extraction cache hit: {section} {content_hash}")
+            return value
+        except Exception as e:
+            logger.warning(f"Failed to read extraction cache of {section} {content_hash}: {str(e)}")
+            return None
+
+    async def put(self, section: str, content_hash: str, value: Any, vendor: str = None) -> bool:
+        """
+        缓存已校验的提取结果，raw_data须为JSON对象，summary_data和vision须为非空文本
+
+        Returns:
+            bool: 是否缓存成功
+        """
+        if not settings.extraction_cache_enabled:
+            return False
+        if section == "raw_data" and not isinstance(value, dict) or section != "raw_data" and not value:
+            logger.warning(f"Skip caching invalid {section} result of {content_hash}")
+            return False
+        try:
+            with Session(engine) as db:
+                secret_key = await key_repository.get_first_undeprecated_key(db)
+                if secret_key is None:
+                    logger.warning("No available AES key, skip extraction cache")
+                    return False
+                aes_iv = AESCipher.generate_iv()
+                cipher = AESCipher(base64.b64decode(secret_key.aes_key), aes_iv)
+                entry = ExtractionCache(
+                    section=section,
+                    model=self._model_of(section, vendor),
+                    prompt_version=get_capsule_section_version(section),
+                    content_hash=content_hash,
+                    ciphertext=cipher.encrypt(json.dumps(value, ensure_ascii=False).encode("utf-8")),
+                    aes_iv=base64.b64encode(aes_iv).decode("utf-8"),
+                    key_uuid=secret_key.uuid,
+                    expires_at=datetime.now() + timedelta(hours=settings.extraction_cache_ttl_hours)
+                )
+                with unit_of_work(db):
+                    await extraction_cache_repo.save_entry(db, entry)
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to write extraction cache of {section} {content_hash}: {str(e)}")
+            return False
+
+    async def invalidate(self, content_hash: str = None, model: str = None, section: str = None,
+                         expired_only: bool = False) -> int:
+        """
+        使缓存失效，条件均为空时清空全部缓存
+
+        Args:
+            content_hash: 报告内容SHA-256
+            model: 模型名称
+            section: 提取类型
+            expired_only: 只删除已过期的缓存
+
+        Returns:
+            int: 删除的缓存数量
+        """
+        with Session(engine) as db, unit_of_work(db):
+            count = await extraction_cache_repo.delete_entries(db, content_hash, model, section, expired_only)
+        logger.info(f"Invalidated {count} extraction cache entries")
+        return count
+
+
+extraction_cache_srv = ExtractionCacheService()
@@ -1,17 +1,28 @@
+import asyncio
 import datetime
+import io
 import json
 import logging
 import os.path
+import zipfile
 from http import HTTPStatus
+from typing import BinaryIO
 
-from fastapi import APIRouter, UploadFile, Form, Body, Header
+from fastapi import APIRouter, UploadFile, Form, Body, Header, File, Request
+from sse_starlette.sse import EventSourceResponse
 
 from capsules.authorization.models.claim import CapsuleClaimModel
 from capsules.authorization.models.collector import CollectorPropModel
 from capsules.authorization.services.capsule_srv import capsule_srv
+from capsules.authorization.services.collect_job import collect_job_registry
+from capsules.authorization.services.extraction_cache import extraction_cache_srv
+from capsules.utils import object_store
+from capsules.utils.ranged_response import build_object_response
+from capsules.utils.upload_spool import spool_upload
+from common.bus_exception import BusException
 from common.db_deps import SessionDep
 from common.response_util import response_base
-from security.token_deps import TokenDeps
+from security.token_deps import AdminTenantDeps, TokenDeps, TenantDeps
 from settings import settings
 
 logger = logging.getLogger(__name__)
@@ -19,9 +30,13 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.post("/collect", dependencies=[TokenDeps], summary="数据采集者将采集数据发送给数据拥有者")
-async def collect(db: SessionDep, file: UploadFile, props: str = Form("{}", description="数据胶囊附加属性"), signature: str = Header(..., description="签名")):
+async def collect(file: UploadFile, props: str = Form("{}", description="数据胶囊附加属性"), signature: str = Header(..., description="签名"),
+                  tenant_uuid: str = TenantDeps):
     """
-    Collect data capsule info, request data type: multipart/form-data, support upload file
+    Collect data capsule info, request data type: multipart/form-data, support upload file.
+    The file is persisted and wrapped in the background, the response carries the job id to poll
+    /collect/{job_id} or to stream /collect/{job_id}/events. Only the tenant that submitted the job can query it.
+    Jobs live in the process that accepted them, so run a single worker or route by job id / tenant sticky.
 
     params:
     - file: uploaded file
@@ -44,21 +59,196 @@ async def collect(db: SessionDep, file: UploadFile, props: str = Form("{}", desc
     if not os.path.exists(temp_dir):
         os.makedirs(temp_dir)
         
-    timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')
-    file_path = os.path.join(temp_dir, f"{file.filename}_{timestamp}")
-    with open(file_path, 'wb') as buffer:
-        contents = await file.read()
-        buffer.write(contents)
-
-    logger.info(f"File saved successfully: {file_path}, size: {len(contents)} bytes, and content_type: {file.content_type}")
+    # 按块写入临时文件并同时计算SHA-256，不把完整文件读入内存
+    spooled = await spool_upload(file, _temp_path(temp_dir, file.filename))
     try:
-        response = await capsule_srv.wrap_data_capsule(db, file_path, collector_props)
-        logger.info(f"Collect data capsule info successfully: {response}")
-        return await response_base.success_simple(code=HTTPStatus.OK, msg='Success', data=response)
+        # 相同拥有者重复提交相同内容(如客户端超时重试)时复用已有任务
+        key = f"{collector_props.owner}:{spooled.sha256}"
+        job, created = capsule_srv.submit_wrap_job(spooled.path, collector_props, key, tenant_uuid)
+        logger.info(f"Collect data capsule job {'submitted' if created else 'reused'}: {job.job_id}")
+        return await response_base.success_simple(code=HTTPStatus.ACCEPTED, msg='Accepted', data=job.to_dict())
     except Exception as e:
         logger.error(f"Collect data capsule info failed: {e}")
         return await response_base.fail(code=HTTPStatus.INTERNAL_SERVER_ERROR, msg=f"Collect data capsule info failed: {str(e)}")
 
+@router.post("/collect/batch", dependencies=[TokenDeps], summary="数据采集者批量发送采集数据")
+async def collect_batch(files: list[UploadFile] = File(None, description="医疗数据报告列表"),
+                        archive: UploadFile = File(None, description="医疗数据报告zip压缩包"),
+                        props: str = Form("{}", description="各报告的数据胶囊附加属性"),
+                        signature: str = Header(..., description="签名"),
+                        tenant_uuid: str = TenantDeps):
+    """
+    Collect data capsules in bulk, request data type: multipart/form-data. The reports are persisted and wrapped
+    in the background with bounded concurrency, the response carries the job id to poll /collect/{job_id} (or to
+    stream /collect/{job_id}/events), whose result reports the status of every file; a failed file does not fail
+    the batch. Like /collect, the job is only visible to the submitting tenant on the worker that accepted it.
+
+    params:
+    - files: uploaded report files
+    - archive: Optional zip archive of report files, may carry a props.json with the same format as props
+    - props: JSON object of metadata keyed by file name, or a JSON list of metadata in the order of files
+    """
+    # TODO: 验证发送者数字证书签名
+    temp_dir = settings.tmp_dir
+    if not os.path.exists(temp_dir):
+        os.makedirs(temp_dir)
+
+    saved: list[tuple[str, str]] = []
+    try:
+        props_data = json.loads(props) if isinstance(props, str) else props
+        for upload in files or []:
+            spooled = await spool_upload(upload, _temp_path(temp_dir, upload.filename))
+            saved.append((upload.filename, spooled.path))
+        if archive is not None:
+            # 解压为阻塞的CPU和磁盘操作，在线程中执行，不阻塞事件循环
+            archive_files, archive_props = await asyncio.to_thread(_extract_archive, archive.file, temp_dir)
+            saved.extend(archive_files)
+            if isinstance(props_data, dict) and isinstance(archive_props, dict):
+                props_data = {**archive_props, **props_data}
+            elif not props_data and archive_props:
+                props_data = archive_props
+    except Exception as e:
+        logger.error(f"Failed to receive batch reports: {e}")
+        _remove_files([path for _, path in saved])
+        return await response_base.fail(code=HTTPStatus.BAD_REQUEST, msg=f"Failed to receive batch reports: {str(e)}")
+
+    if not saved:
+        return await response_base.fail(code=HTTPStatus.BAD_REQUEST, msg="No report file uploaded")
+
+    items = []
+    rejected: list[dict | None] = []
+    for index, (name, path) in enumerate(saved):
+        try:
+            item_props = props_data[index] if isinstance(props_data, list) else props_data[name]
+            items.append((name, path, CollectorPropModel(**item_props)))
+            rejected.append(None)
+        except Exception as e:
+            logger.error(f"Failed to parse props of {name}: {e}")
+            _remove_files([path])
+            rejected.append({"file": name, "status": "failed", "capsule_uuid": None,
+                             "error": f"Invalid props: {str(e)}"})
+
+    try:
+        job = capsule_srv.submit_batch_wrap_job(items, rejected, tenant_uuid)
+        logger.info(f"Collect data capsules in bulk job submitted: {job.job_id}, {len(items)} of {len(saved)} files")
+        return await response_base.success_simple(code=HTTPStatus.ACCEPTED, msg='Accepted', data=job.to_dict())
+    except Exception as e:
+        logger.error(f"Collect data capsules in bulk failed: {e}")
+        _remove_files([path for _, path, _ in items])
+        return await response_base.fail(code=HTTPStatus.INTERNAL_SERVER_ERROR, msg=f"Collect data capsules in bulk failed: {str(e)}")
+
+def _temp_path(temp_dir: str, filename: str) -> str:
+    timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')
+    # 保留扩展名，后续按扩展名判断走图片还是PDF的解析流程
+    stem, ext = os.path.splitext(os.path.basename(filename))
+    return os.path.join(temp_dir, f"{stem}_{timestamp}{ext}")
+
+def _extract_archive(archive_file: BinaryIO, temp_dir: str,
+                     chunk_size: int = 1024 * 1024) -> tuple[list[tuple[str, str]], dict | list | None]:
+    """
+    解压zip压缩包中的报告到临时目录，忽略目录结构只保留文件名。
+
+    解压总大小按实际写出的字节数累计，不信任zip头中声明的file_size，超过settings.batch_collect_max_archive_mb时
+    停止解压并删除已解压的文件。
+
+    Returns:
+        tuple: ([(文件名, 保存路径)], 压缩包中props.json的内容)
+    """
+    remaining = settings.batch_collect_max_archive_mb * 1024 * 1024
+    saved, archive_props = [], None
+
+    def copy(source: BinaryIO, target: BinaryIO):
+        nonlocal remaining
+        while chunk := source.read(chunk_size):
+            remaining -= len(chunk)
+            if remaining < 0:
+                raise ValueError(f"Archive exceeds {settings.batch_collect_max_archive_mb} MB")
+            target.write(chunk)
+
+    try:
+        with zipfile.ZipFile(archive_file) as zf:
+            for info in zf.infolist():
+                name = os.path.basename(info.filename)
+                if info.is_dir() or not name or name.startswith("."):
+                    continue
+                if name == "props.json":
+                    buffer = io.BytesIO()
+                    with zf.open(info) as source:
+                        copy(source, buffer)
+                    archive_props = json.loads(buffer.getvalue())
+                    continue
+                file_path = _temp_path(temp_dir, name)
+                saved.append((name, file_path))
+                with zf.open(info) as source, open(file_path, 'wb') as target:
+                    copy(source, target)
+    except Exception:
+        _remove_files([path for _, path in saved])
+        raise
+    return saved, archive_props
+
+def _remove_files(paths: list[str]):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+@router.get("/collect/{job_id}", dependencies=[TokenDeps], summary="查询数据胶囊采集任务状态")
+async def get_collect_job(job_id: str, tenant_uuid: str = TenantDeps):
+    """
+    Get the status of a collect job submitted by the calling tenant. Jobs are kept in the memory of the worker that
+    accepted them, other workers answer 404, so a single worker or sticky routing is required.
+
+    params:
+    - job_id: collect job id returned by /collect
+    """
+    job = collect_job_registry.get(job_id, tenant_uuid)
+    if job is None:
+        return await response_base.fail(code=HTTPStatus.NOT_FOUND, msg=f"Collect job not found: {job_id}")
+    return await response_base.success_simple(code=HTTPStatus.OK, msg='Success', data=job.to_dict())
+
+@router.get("/collect/{job_id}/events", dependencies=[TokenDeps], summary="订阅数据胶囊采集任务进度")
+async def stream_collect_job(job_id: str, tenant_uuid: str = TenantDeps):
+    """
+    Stream the progress of a collect job submitted by the calling tenant as server-sent events: parsed, extracted,
+    encrypted, stored, then completed with the capsule uuid or failed. Events already reported are replayed first.
+    Like the status endpoint it needs a single worker or sticky routing.
+
+    params:
+    - job_id: collect job id returned by /collect
+    """
+    job = collect_job_registry.get(job_id, tenant_uuid)
+    if job is None:
+        return await response_base.fail(code=HTTPStatus.NOT_FOUND, msg=f"Collect job not found: {job_id}")
+
+    async def event_generator():
+        async for event in job.subscribe():
+            yield {"event": event["event"], "data": json.dumps(event["data"], ensure_ascii=False)}
+
+    return EventSourceResponse(event_generator())
+
+@router.delete("/extraction-cache", dependencies=[AdminTenantDeps], summary="清除LLM提取结果缓存")
+async def invalidate_extraction_cache(content_hash: str = None, model: str = None, section: str = None,
+                                      expired_only: bool = False, all: bool = False):
+    """
+    Invalidate the cached LLM extraction results. The cache is shared by all tenants, so only the admin tenants
+    (settings.admin_tenants) may invalidate it.
+
+    params:
+    - content_hash: SHA-256 of the extracted report markdown, or of the processed image for vision results
+    - model: LLM model name
+    - section: raw_data | summary_data | vision
+    - expired_only: only remove expired entries
+    - all: must be true to remove all entries when no other condition is given
+    """
+    if not (content_hash or model or section or expired_only or all):
+        return await response_base.fail(code=HTTPStatus.BAD_REQUEST,
+                                        msg="No condition given, set all=true to clear the whole extraction cache")
+    try:
+        count = await extraction_cache_srv.invalidate(content_hash, model, section, expired_only)
+        return await response_base.success_simple(code=HTTPStatus.OK, msg='Success', data={"deleted": count})
+    except Exception as e:
+        logger.error(f"Invalidate extraction cache failed: {e}")
+        return await response_base.fail(code=HTTPStatus.INTERNAL_SERVER_ERROR, msg=f"Invalidate extraction cache failed: {str(e)}")
+
 @router.get("/rawdata/{capsule_uuid}", dependencies=[TokenDeps], summary="获取数据胶囊原始数据")
 async def get_raw_data(db: SessionDep, capsule_uuid: str):
     """
@@ -75,39 +265,72 @@ async def get_raw_data(db: SessionDep, capsule_uuid: str):
         logger.error(f"Get raw data of data capsule failed: {e}")
         return await response_base.fail(code=HTTPStatus.INTERNAL_SERVER_ERROR, msg=f"Get raw data of data capsule failed: {str(e)}")
 
+@router.get("/rawdata/{capsule_uuid}/stream", dependencies=[TokenDeps], summary="根据授权指令流式下载数据胶囊原始数据")
+async def stream_raw_data(request: Request, db: SessionDep, capsule_uuid: str, claim_uuid: str,
+                          owner: str = Header(..., description="授权指令拥有者"),
+                          range_header: str = Header(None, alias="Range", description="字节范围，如bytes=0-1048575"),
+                          if_range: str = Header(None, alias="If-Range", description="ETag，与当前对象不一致时返回完整对象")):
+    """
+    Stream the raw data of a data capsule through the platform, for clients that cannot reach the object store.
+    Supports single byte range requests (206) for resumable downloads, every access is checked against the claim
+    and audited. One-time claims are deprecated after the access and always get the whole object.
+
+    params:
+    - capsule_uuid: data capsule uuid
+    - claim_uuid: claim uuid which grants the capsule to the owner
+    """
+    try:
+        claim, stat = await capsule_srv.authorize_raw_access(db, claim_uuid, owner, capsule_uuid, range_header)
+        if claim.one_time_use:
+            range_header = None
+        return await build_object_response(request.scope, object_store, capsule_uuid, range_header, if_range,
+                                           stat=stat)
+    except Exception as e:
+        logger.error(f"Stream raw data of data capsule failed: {e}")
+        if isinstance(e, BusException):
+            return await response_base.fail(code=HTTPStatus.FORBIDDEN, msg=f"Stream raw data of data capsule failed: {e.message}")
+        return await response_base.fail(code=HTTPStatus.INTERNAL_SERVER_ERROR, msg=f"Stream raw data of data capsule failed: {str(e)}")
+
 @router.get("/list", dependencies=[TokenDeps], summary="获取数据胶囊列表")
-async def list_capsules(db: SessionDep, offset: int = 0, limit: int = 10):
+async def list_capsules(db: SessionDep, cursor: str = None, limit: int = 10, include_ciphertext: bool = False):
     """
-    List data capsules
+    List data capsules, newest first. Only metadata is returned unless include_ciphertext is set.
 
     params:
-    - offset: page number
+    - cursor: next_cursor returned by the previous page, empty for the first page
     - limit: page size
+    - include_ciphertext: also return the summary, gene and raw ciphertext and the signature
     """
     try:
-        response = await capsule_srv.list_capsules(db, offset, limit)
-        logger.info(f"List data capsules successfully: {response}")
+        response = await capsule_srv.list_capsules(db, cursor, limit, include_ciphertext)
+        logger.info(f"List {len(response['items'])} data capsules successfully")
         return await response_base.success_simple(code=HTTPStatus.OK, msg='Success', data=response)
     except Exception as e:
         logger.error(f"List data capsules failed: {e}")
+        if isinstance(e, BusException):
+            return await response_base.fail(code=HTTPStatus.BAD_REQUEST, msg=f"List data capsules failed: {e.message}")
         return await response_base.fail(code=HTTPStatus.INTERNAL_SERVER_ERROR, msg=f"List data capsules failed: {str(e)}")
 
 @router.get("/{owner}/list", dependencies=[TokenDeps], summary="获取指定Owner的数据胶囊列表")
-async def list_capsules_by_owner(db: SessionDep, owner: str, offset: int = 0, limit: int = 10):
+async def list_capsules_by_owner(db: SessionDep, owner: str, cursor: str = None, limit: int = 10,
+                                 include_ciphertext: bool = False):
     """
-    List data capsules by owner
+    List data capsules by owner, newest first. Only metadata is returned unless include_ciphertext is set.
 
     params:
     - owner: owner of data capsule
-    - offset: page number
+    - cursor: next_cursor returned by the previous page, empty for the first page
     - limit: page size
+    - include_ciphertext: also return the summary, gene and raw ciphertext and the signature
     """
     try:
-        response = await capsule_srv.list_capsules_by_owner(db, owner, offset, limit)
-        logger.info(f"List data capsules by owner successfully: {response}")
+        response = await capsule_srv.list_capsules_by_owner(db, owner, cursor, limit, include_ciphertext)
+        logger.info(f"List {len(response['items'])} data capsules by owner successfully")
         return await response_base.success_simple(code=HTTPStatus.OK, msg='Success', data=response)
     except Exception as e:
         logger.error(f"List data capsules by owner failed: {e}")
+        if isinstance(e, BusException):
+            return await response_base.fail(code=HTTPStatus.BAD_REQUEST, msg=f"List data capsules by owner failed: {e.message}")
         return await response_base.fail(code=HTTPStatus.INTERNAL_SERVER_ERROR, msg=f"List data capsules by owner failed: {str(e)}")
 
 @router.post("/grant", dependencies=[TokenDeps], summary="授权数据胶囊给其他用户")
@@ -7,6 +7,7 @@ class DataCapsuleModel(BaseModel):
     """
     数据胶囊模型
     """
+    uuid: Optional[str] = Field(default= None, description="数据唯一标识，为空时由数据库生成")
     summary_ciphertext: Optional[str] = Field(default= None, description="概要数据")
     gene_ciphertext: Optional[str] = Field(default= None, description="基因数据")
     raw_ciphertext: Optional[str] = Field(default= None, description="原始数据")
@@ -4,28 +4,36 @@ from capsules.core.models.additional_props import CapsuleAdditionalPropsModel
 from capsules.core.schema import CapsuleAdditionalProps
 
 
+def additional_props_row(additional_props_in: CapsuleAdditionalPropsModel) -> dict:
+    """
+    附属信息模型对应的数据库列，单个和批量写入共用，保证两条路径存储的列一致
+    """
+    return {
+        "owner": additional_props_in.owner,
+        "sexy": additional_props_in.sexy,
+        "age": additional_props_in.age,
+        "area": additional_props_in.area,
+        "type": additional_props_in.type,
+        "producer": additional_props_in.producer,
+        "producer_time": additional_props_in.producer_time,
+        "level": additional_props_in.level
+    }
+
+
 class CapsuleAdditionalPropsRepository:
     def __init__(self):
         pass
 
     async def create_additional_props(self, db: Session, additional_props_in: CapsuleAdditionalPropsModel) -> CapsuleAdditionalProps:
         """
-        Create a capsule additional props
+        Create a capsule additional props, flushed to obtain the id and committed by the caller's unit of work
         :param db:
         :param additional_props_in:
         :return:
         """
-        additional_props = CapsuleAdditionalProps(
-            owner=additional_props_in.owner,
-            sexy=additional_props_in.sexy,
-            age=additional_props_in.age,
-            area=additional_props_in.area,
-            type=additional_props_in.type,
-            producer=additional_props_in.producer
-        )
+        additional_props = CapsuleAdditionalProps(**additional_props_row(additional_props_in))
         db.add(additional_props)
-        db.commit()
-        db.refresh(additional_props)
+        db.flush()
         return additional_props
 
 additional_props_repository = CapsuleAdditionalPropsRepository()
\ No newline at end of file
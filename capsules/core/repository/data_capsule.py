@@ -1,7 +1,12 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert, select, or_
 from sqlmodel import Session, and_
 
 from capsules.core.models.additional_props import CapsuleAdditionalPropsModel
 from capsules.core.models.capsule import DataCapsuleModel
+from capsules.core.repository.additional_props import additional_props_row
 from capsules.core.schema import DataCapsule, CapsuleAdditionalProps, CapsuleOwner
 
 
@@ -11,14 +16,43 @@ class DataCapsuleRepository:
 
     async def create_data_capsule(self, db: Session, data_capsule_in: DataCapsuleModel) -> DataCapsule:
         """
-        存储封装好的1阶胶囊到数据库
+        存储封装好的1阶胶囊到数据库，由调用方的事务提交
         """
         db_data_capsule = DataCapsule(**data_capsule_in.model_dump(exclude_unset= True))
         db.add(db_data_capsule)
-        db.commit()
-        db.refresh(db_data_capsule)
+        db.flush()
         return db_data_capsule
 
+    async def create_data_capsules(self, db: Session,
+                                   items: list[tuple[CapsuleAdditionalPropsModel, DataCapsuleModel]]) -> list[str]:
+        """
+        批量存储封装好的1阶胶囊及其附属信息到数据库，附属信息和胶囊各使用一条多行INSERT写入，由调用方的事务提交
+
+        Args:
+            items: (胶囊附属信息, 数据胶囊)列表
+
+        Returns:
+            list[str]: 胶囊UUID列表
+        """
+        if not items:
+            return []
+        # 附属信息的UUID在客户端生成，批量写入后按UUID查回自增ID，不必逐行INSERT获取lastrowid
+        props_rows = [{"uuid": str(uuid.uuid4()), **additional_props_row(additional_props_in)}
+                      for additional_props_in, _ in items]
+        db.execute(insert(CapsuleAdditionalProps), props_rows)
+        props_ids = dict(db.execute(
+            select(CapsuleAdditionalProps.uuid, CapsuleAdditionalProps.id)
+            .where(CapsuleAdditionalProps.uuid.in_([row["uuid"] for row in props_rows]))
+        ).all())
+
+        capsule_rows = []
+        for props_row, (_, data_capsule_in) in zip(props_rows, items):
+            capsule_row = data_capsule_in.model_dump(exclude_unset=True)
+            capsule_row["additional_props_id"] = props_ids[props_row["uuid"]]
+            capsule_rows.append(capsule_row)
+        db.execute(insert(DataCapsule), capsule_rows)
+        return [capsule_row["uuid"] for capsule_row in capsule_rows]
+
     async def get_data_capsule(self, db: Session, uuid: str) -> DataCapsule:
         """
         根据 capsule uuid 获取 capsule
@@ -26,12 +60,18 @@ class DataCapsuleRepository:
         db_data_capsule = db.query(DataCapsule).filter(DataCapsule.uuid == uuid).first()
         return db_data_capsule
 
-    async def list_data_capsule(self, db: Session, skip: int = 0, limit: int = 1000) -> list[DataCapsule]:
+    async def list_data_capsule(self, db: Session, after: tuple[datetime, int] = None, limit: int = 100,
+                                include_ciphertext: bool = False) -> list[dict]:
         """
-        获取所有 capsule
+        按(create_time, id)倒序键集分页获取 capsule，默认只查询元数据列
+
+        Args:
+            after: 上一页最后一条记录的(create_time, id)，为空时从最新的记录开始
+            limit: 返回数量，最多1000
+            include_ciphertext: 是否查询密文和签名列
         """
-        db_data_capsules = db.query(DataCapsule).offset(skip).limit(limit).all()
-        return db_data_capsules
+        query = select(*self._list_columns(include_ciphertext))
+        return self._fetch_page(db, query, after, limit)
 
     async def get_data_capsule_by_additional_props(self, db: Session, additional_props_in: CapsuleAdditionalPropsModel) -> list[DataCapsule]:
         """
@@ -51,28 +91,46 @@ class DataCapsuleRepository:
 
         return query.all()
 
-    async def list_data_capsules_by_owner(self, db: Session, owner_uuid: str, skip: int = 0, limit: int = 1000) -> list[DataCapsule]:
+    async def list_data_capsules_by_owner(self, db: Session, owner_uuid: str, after: tuple[datetime, int] = None,
+                                          limit: int = 100, include_ciphertext: bool = False) -> list[dict]:
         """
-        根据 capsule owner uuid 获取 capsule
-        """
-                # 参数验证
-        if skip < 0:
-            skip = 0
-        if limit <= 0 or limit > 1000:  # 限制最大返回数量
-            limit = 100
+        根据 capsule owner uuid 按(create_time, id)倒序键集分页获取 capsule，默认只查询元数据列
 
+        Args:
+            owner_uuid: 胶囊拥有者
+            after: 上一页最后一条记录的(create_time, id)，为空时从最新的记录开始
+            limit: 返回数量，最多1000
+            include_ciphertext: 是否查询密文和签名列
+        """
+        query = (select(*self._list_columns(include_ciphertext))
+                 .join(CapsuleOwner, DataCapsule.uuid == CapsuleOwner.capsule_uuid)
+                 .where(CapsuleOwner.owner_uuid == owner_uuid))
         try:
-            db_data_capsules = (db.query(DataCapsule)
-                               .join(CapsuleOwner, DataCapsule.uuid == CapsuleOwner.capsule_uuid)
-                               .filter(CapsuleOwner.owner_uuid == owner_uuid)
-                               .offset(skip)
-                               .limit(limit)
-                               .all())
+            return self._fetch_page(db, query, after, limit)
         except Exception as e:
             # 记录日志并重新抛出异常
             raise Exception(f"数据库查询失败: {str(e)}")
 
-        return db_data_capsules
+    @staticmethod
+    def _list_columns(include_ciphertext: bool) -> list:
+        columns = [DataCapsule.id, DataCapsule.uuid, DataCapsule.create_time, DataCapsule.aes_key_id,
+                   DataCapsule.additional_props_id]
+        if include_ciphertext:
+            columns += [DataCapsule.summary_ciphertext, DataCapsule.gene_ciphertext, DataCapsule.raw_ciphertext,
+                        DataCapsule.signature]
+        return columns
+
+    @staticmethod
+    def _fetch_page(db: Session, query, after: tuple[datetime, int] | None, limit: int) -> list[dict]:
+        if limit <= 0 or limit > 1000:  # 限制最大返回数量
+            limit = 100
+        if after is not None:
+            create_time, capsule_id = after
+            # 展开为OR条件，MySQL可以对(create_time, id)索引做范围扫描
+            query = query.where(or_(DataCapsule.create_time < create_time,
+                                    and_(DataCapsule.create_time == create_time, DataCapsule.id < capsule_id)))
+        query = query.order_by(DataCapsule.create_time.desc(), DataCapsule.id.desc()).limit(limit)
+        return [dict(row) for row in db.execute(query).mappings()]
 
     async def list_capsules_by_uuids(self, db: Session, uuids: list[str]) -> list[DataCapsule]:
         """
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from sqlmodel import Session
+
+from capsules.core.schema import ExtractionCache
+
+
+class ExtractionCacheRepository:
+    def __init__(self):
+        pass
+
+    async def get_entry(self, db: Session, section: str, model: str, prompt_version: str,
+                        content_hash: str) -> ExtractionCache | None:
+        """
+        获取未过期的LLM提取结果缓存
+        """
+        return db.query(ExtractionCache).filter(
+            ExtractionCache.section == section,
+            ExtractionCache.model == model,
+            ExtractionCache.prompt_version == prompt_version,
+            ExtractionCache.content_hash == content_hash,
+            ExtractionCache.expires_at > datetime.now()
+        ).first()
+
+    async def save_entry(self, db: Session, entry: ExtractionCache) -> ExtractionCache:
+        """
+        存储LLM提取结果缓存，相同缓存键的旧记录(如已过期)被替换，由调用方的事务提交
+        """
+        db.query(ExtractionCache).filter(
+            ExtractionCache.section == entry.section,
+            ExtractionCache.model == entry.model,
+            ExtractionCache.prompt_version == entry.prompt_version,
+            ExtractionCache.content_hash == entry.content_hash
+        ).delete(synchronize_session=False)
+        db.add(entry)
+        db.flush()
+        return entry
+
+    async def delete_entries(self, db: Session, content_hash: str = None, model: str = None, section: str = None,
+                             expired_only: bool = False) -> int:
+        """
+        删除符合条件的缓存，条件均为空时删除全部缓存，由调用方的事务提交
+
+        Returns:
+            int: 删除的记录数
+        """
+        query = db.query(ExtractionCache)
+        if content_hash:
+            query = query.filter(ExtractionCache.content_hash == content_hash)
+        if model:
+            query = query.filter(ExtractionCache.model == model)
+        if section:
+            query = query.filter(ExtractionCache.section == section)
+        if expired_only:
+            query = query.filter(ExtractionCache.expires_at <= datetime.now())
+        return query.delete(synchronize_session=False)
+
+extraction_cache_repo = ExtractionCacheRepository()
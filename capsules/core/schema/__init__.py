@@ -1,4 +1,5 @@
 from .capsule import DataCapsule
 from .additional_props import CapsuleAdditionalProps
 from .priviledge_types import PrivilegeType
-from .capsule_owner import CapsuleOwner
\ No newline at end of file
+from .capsule_owner import CapsuleOwner
+from .extraction_cache import ExtractionCache
\ No newline at end of file
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, String, DateTime, Text, Integer, ForeignKey
+from sqlalchemy import Column, String, DateTime, Text, Integer, ForeignKey, Index
 from sqlalchemy.orm import Mapped, relationship
 
 from capsules.authorization.schema import CapsuleClaim
@@ -9,6 +9,10 @@ from common.db_base import DBBase
 
 class DataCapsule(DBBase):
     __tablename__ = "capsules"
+    __table_args__ = (
+        # 胶囊列表按(create_time, id)键集分页
+        Index("idx_capsules_create_time_id", "create_time", "id"),
+    )
 
     id: Mapped[int] = Column(Integer, autoincrement=True, primary_key=True, index=True, comment="主键ID")
     uuid: Mapped[str] = Column(String(36), unique=True, default=lambda: str(uuid.uuid4()), nullable=False, comment="数据唯一标识")
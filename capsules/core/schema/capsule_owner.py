@@ -1,12 +1,17 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 
 from common.db_base import DBBase
 
 
 class CapsuleOwner(DBBase):
     __tablename__ = "capsule_owner"
+    __table_args__ = (
+        # 按拥有者列出胶囊时只扫描索引即可得到胶囊UUID
+        Index("idx_capsule_owner_owner_capsule", "owner_uuid", "capsule_uuid"),
+        Index("idx_capsule_owner_capsule_owner", "capsule_uuid", "owner_uuid"),
+    )
 
     id: int = Column(Integer, primary_key=True, index=True, autoincrement=True, comment="自增ID")
     owner_uuid: str = Column(String(36), comment="数据胶囊所有者UUID")
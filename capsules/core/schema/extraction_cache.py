@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from sqlalchemy import Column, String, DateTime, Text, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped
+
+from common.db_base import DBBase
+
+
+class ExtractionCache(DBBase):
+    __tablename__ = "llm_extraction_cache"
+    __table_args__ = (
+        UniqueConstraint("section", "model", "prompt_version", "content_hash", name="uq_extraction_cache_key"),
+    )
+
+    id: Mapped[int] = Column(Integer, autoincrement=True, primary_key=True, index=True, comment="主键ID")
+    section: Mapped[str] = Column(String(32), nullable=False, comment="提取类型: raw_data | summary_data | vision")
+    model: Mapped[str] = Column(String(128), nullable=False, comment="LLM模型名称")
+    prompt_version: Mapped[str] = Column(String(16), nullable=False, comment="提示词模板版本")
+    content_hash: Mapped[str] = Column(String(64), nullable=False, index=True, comment="报告内容SHA-256")
+    ciphertext: Mapped[str] = Column(Text, nullable=False, comment="AES加密后的提取结果(JSON)")
+    aes_iv: Mapped[str] = Column(String(64), nullable=False, comment="本条记录的AES初始向量")
+    key_uuid: Mapped[str] = Column(String(36), nullable=False, comment="加密所用KMS密钥的唯一标识")
+    expires_at: Mapped[datetime] = Column(DateTime, nullable=False, index=True, comment="过期时间")
+    create_time: Mapped[datetime] = Column(DateTime, default=datetime.now, comment="创建时间")
+
+    def __repr__(self):
+        return f"ExtractionCache(id={self.id}, section={self.section}, model={self.model}, prompt_version={self.prompt_version}, content_hash={self.content_hash}, expires_at={self.expires_at})"
@@ -1,2 +1,5 @@
 from .pdf_processor import PdfProcessor
-from .minio_utils import minio_client
\ No newline at end of file
+from .object_store import get_object_store
+
+# 原始医疗数据的对象存储，由settings.object_store_backend选择实现
+object_store = get_object_store()
\ No newline at end of file
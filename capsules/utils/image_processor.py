@@ -0,0 +1,127 @@
+import asyncio
+import io
+import logging
+import math
+import mimetypes
+
+from settings import settings
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# 与背景灰度的差值超过该阈值的像素视为报告内容
+_CROP_THRESHOLD = 40
+# 检测裁剪范围时使用的缩略图尺寸
+_CROP_PROBE_SIZE = 512
+# 裁剪范围外扩的比例，避免切掉报告边缘的文字
+_CROP_MARGIN = 0.01
+
+
+class VisionImage:
+    """
+    交给视觉理解模型的图片，记录编码后的内容、MIME类型和尺寸
+    """
+
+    def __init__(self, data: bytes, media_type: str, width: int = None, height: int = None):
+        self.data = data
+        self.media_type = media_type
+        self.width = width
+        self.height = height
+
+
+class ImageProcessor:
+    """
+    图片格式医疗检测报告的预处理器，在调用视觉理解模型前减小图片体积
+    """
+
+    @staticmethod
+    async def prepare_for_vision(file: str) -> VisionImage:
+        """
+        读取图片并在线程中完成预处理，不阻塞事件循环
+
+        Args:
+            file: 图片文件路径
+
+        Returns:
+            VisionImage: 预处理后的图片
+        """
+        with open(file, "rb") as f:
+            image_bytes = f.read()
+        media_type = mimetypes.guess_type(file)[0] or "image/jpeg"
+        return await asyncio.to_thread(ImageProcessor.preprocess, image_bytes, media_type)
+
+    @staticmethod
+    def preprocess(image_bytes: bytes, media_type: str = "image/jpeg") -> VisionImage:
+        """
+        解码图片，按EXIF自动旋转，裁剪报告四周的背景，缩小到视觉模型的有效分辨率并重新压缩为JPEG。
+        未安装Pillow或图片无法解码时返回原始图片。
+
+        Args:
+            image_bytes: 原始图片内容
+            media_type: 原始图片的MIME类型
+
+        Returns:
+            VisionImage: 预处理后的图片
+        """
+        if Image is None:
+            logger.warning("Pillow is not installed, the image is sent to the vision model as is")
+            return VisionImage(image_bytes, media_type)
+        try:
+            image = Image.open(io.BytesIO(image_bytes))
+            max_side = settings.vision_image_max_side
+            # JPEG在解码时按DCT缩放，大尺寸手机照片不必完整解码
+            scale = max_side / max(image.size)
+            if scale < 1:
+                image.draft("RGB", (math.ceil(image.width * scale), math.ceil(image.height * scale)))
+            image = ImageOps.exif_transpose(image)
+            image = _to_rgb(image)
+            image = _crop_background(image)
+            image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+            output = io.BytesIO()
+            image.save(output, format="JPEG", quality=settings.vision_image_quality, optimize=True)
+            data = output.getvalue()
+            logger.info(f"Preprocessed image from {len(image_bytes)} to {len(data)} bytes, size {image.width}x{image.height}")
+            return VisionImage(data, "image/jpeg", image.width, image.height)
+        except Exception as e:
+            logger.warning(f"Failed to preprocess image, the image is sent to the vision model as is: {e}")
+            return VisionImage(image_bytes, media_type)
+
+
+def _to_rgb(image):
+    if image.mode == "RGB":
+        return image
+    if image.mode in ("RGBA", "LA", "P"):
+        # 透明背景按白色处理
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _crop_background(image):
+    """
+    以四角的灰度作为背景色，裁剪到与背景差异明显的内容范围；内容范围过小(可能误判)或接近整图时不裁剪
+    """
+    probe = image.convert("L")
+    probe.thumbnail((_CROP_PROBE_SIZE, _CROP_PROBE_SIZE))
+    width, height = probe.size
+    corners = sorted(probe.getpixel(point) for point in ((0, 0), (width - 1, 0), (0, height - 1), (width - 1, height - 1)))
+    background = (corners[1] + corners[2]) // 2
+    bbox = probe.point(lambda pixel: 255 if abs(pixel - background) > _CROP_THRESHOLD else 0).getbbox()
+    if bbox is None:
+        return image
+    left, top, right, bottom = bbox
+    area_ratio = (right - left) * (bottom - top) / (width * height)
+    if area_ratio < 0.2 or area_ratio > 0.9:
+        return image
+    ratio_x, ratio_y = image.width / width, image.height / height
+    margin_x, margin_y = image.width * _CROP_MARGIN, image.height * _CROP_MARGIN
+    return image.crop((max(0, int(left * ratio_x - margin_x)), max(0, int(top * ratio_y - margin_y)),
+                       min(image.width, int(right * ratio_x + margin_x)), min(image.height, int(bottom * ratio_y + margin_y))))
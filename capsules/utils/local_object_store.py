@@ -0,0 +1,112 @@
+import logging
+import mimetypes
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import AsyncIterator
+from urllib.parse import quote
+
+from capsules.utils.object_store import BaseObjectStore
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LocalObjectStore(BaseObjectStore):
+    """
+    本地文件系统上的对象存储，接口与MinIO实现一致，用于测试和单节点部署
+    """
+
+    def __init__(self, root_dir: str = None):
+        super().__init__()
+        self.name = "LocalObjectStore"
+        self.description = "Store raw medical data on the local filesystem."
+        self.root_dir = os.path.abspath(root_dir or settings.object_store_dir)
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def object_path(self, object_name: str) -> str:
+        """
+        对象在本地文件系统中的路径，对象名称不能跳出存储根目录
+        """
+        file_path = os.path.normpath(os.path.join(self.root_dir, object_name))
+        if os.path.commonpath([self.root_dir, file_path]) != self.root_dir:
+            raise ValueError(f"Invalid object name: {object_name}")
+        return file_path
+
+    async def upload_file(self, file_path: str, object_name: str, content_type: str = "application/octet-stream") -> bool:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Local file not found: {file_path}")
+        await self._run(self._copy, file_path, self.object_path(object_name))
+        logger.info(f"File {file_path} uploaded successfully as {object_name}")
+        return True
+
+    async def download_file(self, object_name: str, file_path: str) -> bool:
+        await self._run(self._copy, self.object_path(object_name), file_path)
+        logger.info(f"File {object_name} downloaded successfully to {file_path}")
+        return True
+
+    async def delete_file(self, object_name: str) -> bool:
+        file_path = self.object_path(object_name)
+        if not os.path.exists(file_path):
+            return False
+        await self._run(os.remove, file_path)
+        logger.info(f"File {object_name} deleted successfully")
+        return True
+
+    async def file_exists(self, object_name: str) -> bool:
+        return os.path.isfile(self.object_path(object_name))
+
+    async def list_files(self, prefix: str = "") -> list:
+        file_list = await self._run(self._list, prefix)
+        logger.info(f"Listed {len(file_list)} files with prefix '{prefix}'")
+        return file_list
+
+    async def get_file_url(self, object_name: str, expires: int = 86400) -> str:
+        """
+        本地存储没有可供客户端直接访问的地址，返回平台的流式下载接口，调用方需附带claim_uuid和owner完成授权
+        """
+        self.object_path(object_name)
+        return f"/api/{settings.api_version}/capsules/rawdata/{quote(object_name, safe='')}/stream"
+
+    async def stat_file(self, object_name: str) -> dict:
+        file_stat = os.stat(self.object_path(object_name))
+        return {
+            "size": file_stat.st_size,
+            "content_type": mimetypes.guess_type(object_name)[0] or "application/octet-stream",
+            "etag": f"{file_stat.st_size:x}-{file_stat.st_mtime_ns:x}",
+            "last_modified": datetime.fromtimestamp(file_stat.st_mtime, tz=timezone.utc)
+        }
+
+    async def iter_range(self, object_name: str, offset: int, length: int,
+                         chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        file = open(self.object_path(object_name), "rb")
+        try:
+            file.seek(offset)
+            while length > 0:
+                chunk = await self._run(file.read, min(chunk_size, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+        finally:
+            file.close()
+
+    def local_path(self, object_name: str) -> str | None:
+        return self.object_path(object_name)
+
+    @staticmethod
+    def _copy(source: str, target: str):
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+        # 先写临时文件再替换，读取方不会看到写了一半的对象
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+
+    def _list(self, prefix: str) -> list:
+        file_list = []
+        for dir_path, _, file_names in os.walk(self.root_dir):
+            for file_name in file_names:
+                object_name = os.path.relpath(os.path.join(dir_path, file_name), self.root_dir).replace(os.sep, "/")
+                if object_name.startswith(prefix) and not object_name.endswith(".tmp"):
+                    file_list.append(object_name)
+        return sorted(file_list)
@@ -1,29 +1,48 @@
+import asyncio
 import logging
 import os.path
 from datetime import timedelta
+from typing import AsyncIterator
 
+import urllib3
 from minio import Minio
 from minio.error import S3Error
 
+from capsules.utils.object_store import BaseObjectStore
 from settings import settings
 
 logger = logging.getLogger(__name__)
 
-class MinioUtils:
+class MinioUtils(BaseObjectStore):
     """
     Minio工具类，用于进行Minio操作，如上传、下载、删除文件等
+
+    同步的Minio调用在有界线程池中执行；大文件按settings.object_store_part_size_mb分片，
+    以settings.object_store_parallel_parts个分片并行上传和下载，所有请求复用同一个HTTP连接池。
     """
     
     def __init__(self):
         """
         初始化Minio客户端，从settings配置类获取连接信息
         """
+        super().__init__()
+        self.name = "MinioUtils"
+        self.description = "Store raw medical data in MinIO."
+        self.part_size = settings.object_store_part_size_mb * 1024 * 1024
+        self.parallel_parts = settings.object_store_parallel_parts
         try:
+            # 连接池大小覆盖线程池和每个请求的并行分片，避免连接被反复创建和丢弃
+            http_client = urllib3.PoolManager(
+                maxsize=settings.object_store_workers * self.parallel_parts,
+                timeout=urllib3.Timeout(connect=10, read=300),
+                retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+            )
             self.client = Minio(
                 f"{settings.minio_url}:{settings.minio_port}",
                 access_key=settings.minio_access_key,
                 secret_key=settings.minio_secret_key,
-                secure=False  # 根据实际需要设置为True或False
+                secure=False,  # 根据实际需要设置为True或False
+                http_client=http_client
             )
             self.bucket_name = settings.minio_bucket
             logger.info(f"MinIO client initialized successfully for bucket: {self.bucket_name}")
@@ -52,12 +71,15 @@ class MinioUtils:
             if not os.path.exists(file_path):
                 raise FileNotFoundError(f"Local file not found: {file_path}")
             
-            # 上传文件
-            self.client.fput_object(
+            # 上传文件，在线程池中执行同步的Minio调用，避免阻塞事件循环；大文件分片并行上传
+            await self._run(
+                self.client.fput_object,
                 self.bucket_name,
                 object_name,
                 file_path,
-                content_type=content_type
+                content_type=content_type,
+                part_size=self.part_size,
+                num_parallel_uploads=self.parallel_parts
             )
             logger.info(f"File {file_path} uploaded successfully as {object_name}")
             return True
@@ -87,12 +109,12 @@ class MinioUtils:
             S3Error: Minio操作异常
         """
         try:
-            # 下载文件
-            self.client.fget_object(
-                self.bucket_name,
-                object_name,
-                file_path
-            )
+            # 下载文件，大文件按分片并行下载
+            stat = await self._run(self.client.stat_object, self.bucket_name, object_name)
+            if stat.size <= self.part_size:
+                await self._run(self.client.fget_object, self.bucket_name, object_name, file_path)
+            else:
+                await self._download_parts(object_name, file_path, stat.size)
             logger.info(f"File {object_name} downloaded successfully to {file_path}")
             return True
             
@@ -118,7 +140,8 @@ class MinioUtils:
         """
         try:
             # 删除文件
-            self.client.remove_object(
+            await self._run(
+                self.client.remove_object,
                 self.bucket_name,
                 object_name
             )
@@ -146,7 +169,8 @@ class MinioUtils:
             S3Error: Minio操作异常
         """
         try:
-            statics = self.client.stat_object(
+            statics = await self._run(
+                self.client.stat_object,
                 self.bucket_name,
                 object_name
             )
@@ -178,12 +202,11 @@ class MinioUtils:
             S3Error: Minio操作异常
         """
         try:
-            objects = self.client.list_objects(
-                self.bucket_name,
-                prefix=prefix,
-                recursive=True
+            # list_objects返回的是惰性迭代器，分页请求在遍历时发生，需在线程池中遍历
+            file_list = await self._run(
+                lambda: [obj.object_name for obj in
+                         self.client.list_objects(self.bucket_name, prefix=prefix, recursive=True)]
             )
-            file_list = [obj.object_name for obj in objects]
             logger.info(f"Listed {len(file_list)} files with prefix '{prefix}'")
             return file_list
             
@@ -194,7 +217,7 @@ class MinioUtils:
             logger.error(f"Unexpected error during file listing: {str(e)}")
             raise
     
-    def get_file_url(self, object_name: str, expires: int = 86400) -> str:
+    async def get_file_url(self, object_name: str, expires: int = 86400) -> str:
         """
         获取文件的临时访问URL
         
@@ -209,7 +232,8 @@ class MinioUtils:
             S3Error: Minio操作异常
         """
         try:
-            url = self.client.presigned_get_object(
+            url = await self._run(
+                self.client.presigned_get_object,
                 self.bucket_name,
                 object_name,
                 expires=timedelta(seconds=expires)
@@ -224,4 +248,74 @@ class MinioUtils:
             logger.error(f"Unexpected error during presigned URL generation: {str(e)}")
             raise
 
+    async def stat_file(self, object_name: str) -> dict:
+        """
+        获取Minio对象的元数据
+
+        Args:
+            object_name: Minio中的对象名称
+
+        Returns:
+            dict: size, content_type, etag和last_modified
+        """
+        try:
+            stat = await self._run(self.client.stat_object, self.bucket_name, object_name)
+            return {
+                "size": stat.size,
+                "content_type": stat.content_type or "application/octet-stream",
+                "etag": stat.etag,
+                "last_modified": stat.last_modified
+            }
+        except S3Error as e:
+            logger.error(f"MinIO stat error: {str(e)}")
+            raise
+
+    async def iter_range(self, object_name: str, offset: int, length: int,
+                         chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        """
+        以Range请求读取Minio对象，按块返回；调用方取走一块后才读取下一块，慢客户端不会让数据堆积在内存中
+        """
+        response = await self._run(self.client.get_object, self.bucket_name, object_name, offset=offset, length=length)
+        try:
+            while True:
+                chunk = await self._run(response.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            response.close()
+            response.release_conn()
+
+    async def _download_parts(self, object_name: str, file_path: str, size: int):
+        """
+        按分片并行下载对象，各分片直接写入目标文件的对应位置，完成后再替换目标文件
+        """
+        tmp_path = f"{file_path}.{os.getpid()}.part"
+        with open(tmp_path, "wb") as file:
+            file.truncate(size)
+        semaphore = asyncio.Semaphore(self.parallel_parts)
+
+        async def download_part(offset: int):
+            async with semaphore:
+                await self._run(self._download_range, object_name, tmp_path, offset, min(self.part_size, size - offset))
+
+        try:
+            await asyncio.gather(*(download_part(offset) for offset in range(0, size, self.part_size)))
+            os.replace(tmp_path, file_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _download_range(self, object_name: str, file_path: str, offset: int, length: int):
+        response = self.client.get_object(self.bucket_name, object_name, offset=offset, length=length)
+        try:
+            with open(file_path, "r+b") as file:
+                file.seek(offset)
+                for chunk in response.stream(1024 * 1024):
+                    file.write(chunk)
+        finally:
+            response.close()
+            response.release_conn()
+
 minio_client = MinioUtils()
\ No newline at end of file
@@ -0,0 +1,120 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, AsyncIterator
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BaseObjectStore:
+    """
+    原始医疗数据的对象存储，所有方法均为异步接口。
+
+    底层的同步I/O在有界线程池(settings.object_store_workers)中执行，不阻塞事件循环，
+    并发请求过多时在线程池中排队，而不是无限制地创建线程和连接。
+    """
+
+    def __init__(self):
+        self.name = "BaseObjectStore"
+        self.description = "A base object store for raw medical data."
+        self.executor = ThreadPoolExecutor(max_workers=settings.object_store_workers,
+                                           thread_name_prefix="object-store")
+
+    async def _run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在对象存储线程池中执行同步调用。
+
+        线程中的同步调用无法中断，调用方被取消时等待其执行结束后再传播取消，
+        调用方在取消后清理(如删除上传中的临时文件)时不会与仍在执行的调用竞争
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            await asyncio.wait([future])
+            raise
+
+    async def upload_file(self, file_path: str, object_name: str, content_type: str = "application/octet-stream") -> bool:
+        """
+        上传本地文件
+
+        Args:
+            file_path: 本地文件路径
+            object_name: 对象名称
+            content_type: 文件内容类型
+        """
+        raise NotImplementedError("Must provide a implementation in derived classes.")
+
+    async def download_file(self, object_name: str, file_path: str) -> bool:
+        """
+        下载对象到本地文件
+        """
+        raise NotImplementedError("Must provide a implementation in derived classes.")
+
+    async def delete_file(self, object_name: str) -> bool:
+        """
+        删除对象
+        """
+        raise NotImplementedError("Must provide a implementation in derived classes.")
+
+    async def file_exists(self, object_name: str) -> bool:
+        """
+        检查对象是否存在
+        """
+        raise NotImplementedError("Must provide a implementation in derived classes.")
+
+    async def list_files(self, prefix: str = "") -> list:
+        """
+        列出名称以prefix开头的对象
+        """
+        raise NotImplementedError("Must provide a implementation in derived classes.")
+
+    async def get_file_url(self, object_name: str, expires: int = 86400) -> str:
+        """
+        获取对象的临时访问地址，expires为过期时间(秒)
+        """
+        raise NotImplementedError("Must provide a implementation in derived classes.")
+
+    async def stat_file(self, object_name: str) -> dict:
+        """
+        获取对象的元数据
+
+        Returns:
+            dict: size, content_type, etag和last_modified
+        """
+        raise NotImplementedError("Must provide a implementation in derived classes.")
+
+    async def iter_range(self, object_name: str, offset: int, length: int,
+                         chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        """
+        按块读取对象从offset开始的length个字节，调用方取走一块后才读取下一块
+        """
+        raise NotImplementedError("Must provide a implementation in derived classes.")
+        yield b""
+
+    def local_path(self, object_name: str) -> str | None:
+        """
+        对象在本地文件系统中的路径，可直接用sendfile发送；非本地存储返回None
+        """
+        return None
+
+    def close(self):
+        """
+        释放线程池
+        """
+        self.executor.shutdown(wait=False)
+
+
+def get_object_store() -> BaseObjectStore:
+    """
+    Get the object store configured by settings.object_store_backend, minio | local.
+    """
+    if settings.object_store_backend == "local":
+        from .local_object_store import LocalObjectStore
+        return LocalObjectStore()
+    from .minio_utils import minio_client
+    return minio_client
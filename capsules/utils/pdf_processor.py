@@ -1,12 +1,15 @@
 # - *- coding: utf-8 -
+import asyncio
 import logging
 import pathlib
-import shutil
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional, Tuple
 import os
 
 import pymupdf4llm
 
+from settings import settings
+
 try:
     import pymupdf as fitz  # PyMuPDF
     from pymupdf import Document
@@ -338,32 +341,104 @@ class PdfProcessor:
     @staticmethod
     def extract_content_for_markdown(pdf_path: str, write_images: bool = False, embed_images: bool = False) -> str:
         """
-        从PDF中提取所有内容并将其转换为MD格式，包含图片类型内容r
+        从PDF中提取所有内容并将其转换为MD格式，包含图片类型内容
+
+        图片只在内存中处理：embed_images时以base64内嵌到Markdown，不写入共享的临时目录，并发请求之间互不影响。
+        PDF内嵌图片的视觉模型解析尚未实现，write_images暂时被忽略，不再提取图片字节
         """
-        tmp_dir = "./tmp"
         try:
-            md_content = pymupdf4llm.to_markdown(pdf_path, image_path=tmp_dir, write_images= write_images, embed_images= embed_images)
+            md_content = _convert_pages(pdf_path, None, embed_images)
             logger.info(f"Converted PDF to markdown successfully.")
-            # 遍历临时目录下的文件，并交给LLM视觉处理模型提取图片内容
-            if write_images:
-                for filename in os.listdir(tmp_dir):
-                    md_content += _vision_process(os.path.join(tmp_dir, filename))
+            _skip_image_extraction(write_images)
+            return md_content
+        except Exception as e:
+            logger.error(f"Error converting PDF to markdown: {str(e)}")
+            return ""
+
+    @staticmethod
+    async def convert_to_markdown(pdf_path: str, write_images: bool = False, embed_images: bool = False) -> str:
+        """
+        在进程池中将PDF转换为Markdown，页数超过settings.pdf_pages_per_task的报告按页范围拆分后并行转换，
+        再按页序拼接；转换不占用事件循环和GIL，不会阻塞其他请求
+
+        Args:
+            pdf_path: PDF文件路径
+            write_images: 是否提取图片内容交给视觉模型，视觉解析尚未实现，暂时被忽略
+            embed_images: 是否将图片以base64内嵌到Markdown
+
+        Returns:
+            str: Markdown内容，转换失败时返回空字符串
+        """
+        loop = asyncio.get_running_loop()
+        executor = _get_executor()
+        try:
+            with fitz.open(pdf_path) as doc:
+                page_count = doc.page_count
+            page_ranges = [list(range(start, min(start + settings.pdf_pages_per_task, page_count)))
+                           for start in range(0, page_count, settings.pdf_pages_per_task)]
+            if len(page_ranges) <= 1:
+                page_ranges = [None]
+            parts = await asyncio.gather(*(loop.run_in_executor(executor, _convert_pages, pdf_path, pages, embed_images)
+                                           for pages in page_ranges))
+            md_content = "".join(parts)
+            logger.info(f"Converted PDF of {page_count} pages to markdown in {len(page_ranges)} parts.")
+            _skip_image_extraction(write_images)
             return md_content
         except Exception as e:
             logger.error(f"Error converting PDF to markdown: {str(e)}")
             return ""
-        finally:
-            if os.path.exists(tmp_dir):
-                # 删除临时目录下的文件，但是保留临时目录
-                for filename in os.listdir(tmp_dir):
-                    file_path = os.path.join(tmp_dir, filename)
-                    try:
-                        os.remove(file_path)
-                    except Exception as e:
-                        logger.error(f"Error deleting file {file_path}: {str(e)}")
-
-def _vision_process(param):
-   pass
+
+    @staticmethod
+    async def find_tables(pdf_path: str) -> list:
+        """
+        在进程池中提取PDF的全部表格，每个表格为行的列表，提取失败时返回空列表
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), _extract_tables, pdf_path) or []
+
+    @staticmethod
+    def shutdown():
+        """
+        关闭PDF转换进程池，应用关闭时调用
+        """
+        global _executor
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """
+    PDF转换进程池，首次使用时创建，进程数为settings.pdf_workers
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.pdf_workers)
+    return _executor
+
+
+def _convert_pages(pdf_path: str, pages: Optional[list], embed_images: bool) -> str:
+    """
+    转换PDF的指定页(为空时转换全部页面)为Markdown，在进程池的子进程中执行
+    """
+    return pymupdf4llm.to_markdown(pdf_path, pages=pages, write_images=False, embed_images=embed_images,
+                                   show_progress=False)
+
+
+def _extract_tables(pdf_path: str) -> Optional[list]:
+    """
+    提取PDF表格，在进程池的子进程中执行
+    """
+    return PdfProcessor().extract_tables(pdf_path)
+
+
+def _skip_image_extraction(write_images: bool):
+    # PDF内嵌图片的视觉解析接入后再提取图片字节，在此之前提取图片只会浪费进程池的时间
+    if write_images:
+        logger.warning("Vision extraction of PDF images is not implemented yet, images are skipped.")
 
 if __name__ == "__main__":
     pdf_path = "E:/血常规-血常规报告单解读-详细版.pdf"
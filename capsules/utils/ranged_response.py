@@ -0,0 +1,126 @@
+import logging
+import os
+import re
+from email.utils import format_datetime
+from http import HTTPStatus
+
+from starlette.responses import Response, StreamingResponse
+from starlette.types import Scope, Receive, Send
+
+from capsules.utils.object_store import BaseObjectStore
+
+logger = logging.getLogger(__name__)
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# ASGI的零拷贝发送扩展，服务器在scope["extensions"]中声明支持时由服务器对文件调用sendfile。
+# uvicorn不声明该扩展，在uvicorn下始终使用流式读取的回退路径
+ZERO_COPY_EXTENSION = "http.response.zerocopysend"
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(range_header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    解析单个字节范围的Range请求头
+
+    Args:
+        range_header: Range请求头，如bytes=0-1023, bytes=1024-, bytes=-512
+        size: 对象大小
+
+    Returns:
+        tuple | None: (起始偏移, 长度)；无Range请求头或格式不支持(如多个范围)时返回None，按完整对象返回
+
+    Raises:
+        RangeNotSatisfiable: 范围超出对象大小
+    """
+    if not range_header:
+        return None
+    match = _RANGE.match(range_header.strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # 后缀范围：最后end个字节
+        length = min(int(end), size)
+        if length == 0:
+            raise RangeNotSatisfiable(range_header)
+        return size - length, length
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable(range_header)
+    return start, end - start + 1
+
+
+class ZeroCopyFileResponse(Response):
+    """
+    通过ASGI零拷贝扩展发送本地文件的一个字节范围，文件内容不经过Python缓冲区
+    """
+
+    def __init__(self, path: str, offset: int, count: int, status_code: int, headers: dict, media_type: str):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.offset = offset
+        self.count = count
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        with open(self.path, "rb") as file:
+            # 扩展规范要求传递文件对象，而不是文件描述符
+            await send({"type": ZERO_COPY_EXTENSION, "file": file, "offset": self.offset,
+                        "count": self.count, "more_body": False})
+
+
+async def build_object_response(scope: Scope, store: BaseObjectStore, object_name: str, range_header: str = None,
+                                if_range: str = None, chunk_size: int = 1024 * 1024, stat: dict = None) -> Response:
+    """
+    构建对象的下载响应，支持单个字节范围的Range请求(206)和断点续传
+
+    本地存储且服务器声明支持零拷贝扩展时使用sendfile发送；否则(包括uvicorn)按块流式读取，每块发送完成后才读取
+    下一块，慢客户端的背压会传递到对象存储，内存占用不超过一个块。
+
+    Args:
+        scope: 请求的ASGI scope
+        store: 对象存储
+        object_name: 对象名称
+        range_header: Range请求头
+        if_range: If-Range请求头，与对象的ETag不一致时忽略Range返回完整对象
+        chunk_size: 流式读取的块大小
+        stat: 调用方已获取的对象元数据，为空时从对象存储获取
+    """
+    if stat is None:
+        stat = await store.stat_file(object_name)
+    size = stat["size"]
+    etag = '"{}"'.format(stat["etag"].strip('"')) if stat.get("etag") else None
+    headers = {"Accept-Ranges": "bytes"}
+    if etag:
+        headers["ETag"] = etag
+    if stat.get("last_modified"):
+        headers["Last-Modified"] = format_datetime(stat["last_modified"], usegmt=True)
+
+    if if_range and if_range != etag:
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        return Response(status_code=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+                        headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        offset, length, status_code = 0, size, HTTPStatus.OK
+    else:
+        offset, length = byte_range
+        status_code = HTTPStatus.PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {offset}-{offset + length - 1}/{size}"
+    headers["Content-Length"] = str(length)
+
+    local_path = store.local_path(object_name)
+    if local_path and os.path.isfile(local_path) and ZERO_COPY_EXTENSION in scope.get("extensions", {}):
+        return ZeroCopyFileResponse(local_path, offset, length, status_code, headers, stat["content_type"])
+    return StreamingResponse(store.iter_range(object_name, offset, length, chunk_size), status_code=status_code,
+                             headers=headers, media_type=stat["content_type"])
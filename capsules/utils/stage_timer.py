@@ -0,0 +1,39 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable
+
+
+class StageTimer:
+    """
+    记录胶囊封装流程各阶段的耗时(毫秒)，各阶段可以并发执行，total_ms为端到端耗时；
+    metrics记录流程中的其他度量，如LLM输入的token数量
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.metrics: dict[str, Any] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    async def run(self, name: str, awaitable: Awaitable[Any]) -> Any:
+        """
+        等待awaitable完成并记录为name阶段的耗时，用于并发执行的阶段
+        """
+        with self.stage(name):
+            return await awaitable
+
+    def record(self, name: str, value: Any):
+        self.metrics[name] = value
+
+    def to_dict(self) -> dict:
+        result = {"stages": self.stages, "total_ms": round((time.perf_counter() - self.start) * 1000, 2)}
+        if self.metrics:
+            result["metrics"] = self.metrics
+        return result
@@ -0,0 +1,60 @@
+import asyncio
+import hashlib
+import logging
+import os.path
+from typing import BinaryIO
+
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+# 每次读取的块大小，单个请求的内存占用不超过该值
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class SpooledUpload:
+    """
+    已落盘的上传文件，记录保存路径、内容SHA-256和大小
+    """
+
+    def __init__(self, path: str, sha256: str, size: int):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+
+
+async def spool_upload(upload: UploadFile, file_path: str, chunk_size: int = UPLOAD_CHUNK_SIZE) -> SpooledUpload:
+    """
+    将上传文件按块写入file_path，同时计算SHA-256和大小，不把完整文件读入内存。
+    后续的报告解析和对象存储上传都直接读取该文件。
+
+    上传内容已由Starlette缓存在SpooledTemporaryFile中，读取、写入和哈希均为同步操作，
+    整个复制过程在一个线程中完成，不阻塞事件循环，也不必每块切换一次线程。
+
+    Args:
+        upload: 上传文件
+        file_path: 保存路径
+        chunk_size: 每次读取的块大小
+
+    Returns:
+        SpooledUpload: 保存结果
+    """
+    sha256, size = await asyncio.to_thread(_copy_to_file, upload.file, file_path, chunk_size)
+    logger.info(f"File spooled: {file_path}, size: {size} bytes, and content_type: {upload.content_type}")
+    return SpooledUpload(file_path, sha256, size)
+
+
+def _copy_to_file(source: BinaryIO, file_path: str, chunk_size: int) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(file_path, 'wb') as buffer:
+            while chunk := source.read(chunk_size):
+                digest.update(chunk)
+                buffer.write(chunk)
+                size += len(chunk)
+    except Exception:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return digest.hexdigest(), size
@@ -1,6 +1,12 @@
 FILE_SIZE_200MB=200 * 1024 * 1024
 ALLOWED_FILE_TYPES = [
-                        "application/pdf"
+                        "application/pdf",
+                        "text/csv",
+                        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 ]
-IMAGE_EXT = [".jpg", ".jpeg", ".png", ".bmp"]
\ No newline at end of file
+IMAGE_EXT = [".jpg", ".jpeg", ".png", ".bmp"]
+# 相似度检索可接受的最大余弦距离
+MAX_ACCEPTED_DISTANCE = 0.5
+# 向量库文档时间戳格式(定长文本，字典序即时间序)
+VECTOR_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from typing import Generator, Annotated
 
 from fastapi import Depends
@@ -10,4 +11,17 @@ def get_db() -> Generator:
         yield session
 
 
-SessionDep = Annotated[Session, Depends(get_db)]
\ No newline at end of file
+SessionDep = Annotated[Session, Depends(get_db)]
+
+
+@contextmanager
+def unit_of_work(db: Session) -> Generator:
+    """
+    调用方管理的事务：仓库方法只flush(获取自增ID)，不提交；代码块正常结束时提交一次，出现异常时回滚并重新抛出
+    """
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
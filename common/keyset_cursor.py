@@ -0,0 +1,53 @@
+import base64
+from datetime import datetime
+from typing import List
+
+from common.bus_exception import BusException
+
+# 与仓库的分页上限一致
+MAX_PAGE_SIZE = 1000
+DEFAULT_PAGE_SIZE = 100
+
+
+def page_size(limit: int) -> int:
+    """
+    校验分页大小，超出范围时使用默认值
+    """
+    return limit if 0 < limit <= MAX_PAGE_SIZE else DEFAULT_PAGE_SIZE
+
+
+def encode_cursor(create_time: datetime, row_id: int) -> str:
+    """
+    将(create_time, id)编码为分页游标
+    """
+    return base64.urlsafe_b64encode(f"{create_time.isoformat()}|{row_id}".encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str | None) -> tuple[datetime, int] | None:
+    """
+    解析分页游标为(create_time, id)，游标为空时返回None
+
+    Raises:
+        BusException: 游标无法解析
+    """
+    if not cursor:
+        return None
+    try:
+        create_time, row_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").rsplit("|", 1)
+        return datetime.fromisoformat(create_time), int(row_id)
+    except ValueError:
+        raise BusException(code=10011, message="分页游标无效")
+
+
+def build_page(items: List[dict], limit: int) -> dict:
+    """
+    组装分页结果，取满一页时以最后一条记录的(create_time, id)作为下一页游标
+
+    Returns:
+        dict: {"items": 记录列表, "next_cursor": 下一页游标，没有更多数据时为None}
+    """
+    next_cursor = None
+    if items and len(items) >= limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last["create_time"], last["id"])
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,98 @@
+"""
+Benchmark the LLM call latency with a fresh AsyncClient per call against the pooled client of the registry.
+
+A fresh client pays the TCP and TLS handshake on every call, the pooled client reuses keep-alive connections. Both
+modes send the same minimal chat completion (max_tokens=1), so the difference is dominated by connection setup.
+
+Usage:
+    python -m llm.benchmark_clients --vendor openai --requests 200 --concurrency 16
+    python -m llm.benchmark_clients --vendor qwen --modes pooled --requests 500 --concurrency 64
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from openai import AsyncClient
+
+from llm.model_provider.client_registry import LLMClientRegistry
+from llm.model_provider.model_base import ModelBase
+
+MODES = ["fresh", "pooled"]
+
+
+def fresh_client(vendor: str) -> AsyncClient:
+    model_settings = ModelBase.instance(vendor).model_settings
+    client_kwargs = {"api_key": model_settings["api_key"]}
+    if model_settings.get("api_base"):
+        client_kwargs["base_url"] = model_settings["api_base"]
+    return AsyncClient(**client_kwargs)
+
+
+async def call(client: AsyncClient, model: str) -> None:
+    await client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": "ping"}],
+        max_tokens=1,
+        temperature=0,
+        stream=False
+    )
+
+
+async def run(mode: str, vendor: str, requests: int, concurrency: int) -> dict:
+    model = ModelBase.instance(vendor).model_settings["default_model"]
+    registry = LLMClientRegistry()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one() -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if mode == "fresh":
+                    client = fresh_client(vendor)
+                    try:
+                        await call(client, model)
+                    finally:
+                        await client.close()
+                else:
+                    await call(registry.get(vendor), model)
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                errors += 1
+
+    if mode == "pooled":
+        # Warm up the pool so that the handshake of the first calls is not counted.
+        await asyncio.gather(*(one() for _ in range(min(concurrency, requests))))
+        latencies.clear()
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    await registry.close()
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else float("nan")
+    return {"mode": mode, "ok": len(latencies), "errors": errors,
+            "mean_ms": statistics.fmean(latencies) if latencies else float("nan"),
+            "p50_ms": percentile(0.5), "p95_ms": percentile(0.95), "rps": len(latencies) / elapsed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="LLM call latency with fresh clients against pooled clients.")
+    parser.add_argument("--vendor", default=None, help="Model provider in model_providers, default the selected one.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    args = parser.parse_args()
+
+    print(f"Benchmarking {args.requests} calls with concurrency {args.concurrency}...")
+    print(f"{'mode':>8} {'ok':>6} {'errors':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'req/s':>8}")
+    for mode in args.modes:
+        result = asyncio.run(run(mode, args.vendor, args.requests, args.concurrency))
+        print(f"{result['mode']:>8} {result['ok']:>6} {result['errors']:>7} {result['mean_ms']:>9.1f} "
+              f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['rps']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
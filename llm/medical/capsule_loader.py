@@ -1,9 +1,12 @@
+import asyncio
 import json
 import logging
 from typing import Any
 
-from openai import AsyncClient, APIConnectionError, RateLimitError
+from openai import APIConnectionError, RateLimitError
 
+from llm.medical.report_splitter import count_tokens, split_report, merge_raw_data
+from llm.model_provider.client_registry import llm_clients
 from llm.model_provider.model_base import ModelBase, model_providers
 from llm.prompts.bnf import get_capsule_section
 from settings import settings
@@ -19,19 +22,8 @@ class CapsuleLoader:
         if vendor is None:
             vendor = settings.sel_model_provider
         self.model_base = ModelBase.instance(vendor)
-        
-        # 正确初始化AsyncClient，避免传递不支持的参数
-        model_settings = self.model_base.model_settings
-        client_kwargs = {
-            "api_key": model_settings["api_key"]
-        }
-        
-        # 只有在api_base存在且非空时才添加base_url参数
-        if model_settings.get("api_base"):
-            client_kwargs["base_url"] = model_settings["api_base"]
-            
-        # 确保不传递proxies等可能不支持的参数
-        self.async_client = AsyncClient(**client_kwargs)
+        # 使用进程内共享的客户端连接池，不能在调用结束后关闭
+        self.async_client = llm_clients.get(vendor)
 
     async def calc_raw_data_by_bnf(self, origin_text: str) -> dict[str, Any] | None:
         """
@@ -42,24 +34,12 @@ class CapsuleLoader:
         Returns:
             符合BNF规范约束的JSON类型字符串
         """
+        # 超出token预算的长报告拆分后并发提取再合并
+        if count_tokens(origin_text) > settings.llm_part_token_budget:
+            return await self.calc_raw_data_by_parts(origin_text)
         logger.info(f"Start to calc raw data using {self.model_base.model_settings['default_model']}")
         try:
-            bnf_template = get_capsule_section("raw_data").replace("{text}", origin_text)
-            result = await self.async_client.chat.completions.create(
-                model=self.model_base.model_settings["default_model"],
-                messages=[
-                    {"role": "system", "content": "You are a medical report extractor"},
-                    {"role": "user", "content": bnf_template}
-                ],
-                temperature=self.model_base.temperature,
-                top_p=self.model_base.top_p,
-                stream=False
-            )
-            logger.debug(f"The result of the query is: /n*******/n{result.choices[0].message.content}/n*******")
-            # 检查输出内容是否符合JSON格式
-            json_data = json.loads(result.choices[0].message.content)
-            logger.debug(f"The result of the query is: /n*******/n{json_data}/n*******")
-            return json_data
+            return await self._extract_raw_part(origin_text)
         except APIConnectionError as e:
             logger.error(f"The server could not be reached: {e}")
             raise e
@@ -70,8 +50,66 @@ class CapsuleLoader:
             logger.error(f"4xx or 5xx status code was received, its status is: {e.status_code}, "
                          f"and response {e.response}")
             raise e
-        finally:
-            await self.async_client.close()
+
+    async def calc_raw_data_by_parts(self, origin_text: str, token_budget: int = None) -> dict[str, Any]:
+        """
+        长报告的拆分提取：按章节/分页将报告拆分为不超过token预算的若干部分，并发提取各部分的BNF数据，
+        只重试失败的部分，全部成功后按拆分顺序确定性地合并
+
+        Args:
+            origin_text: str, 原始医疗数据报告内容
+            token_budget: 每部分的token上限，默认为settings.llm_part_token_budget
+        Returns:
+            合并后的BNF数据
+        """
+        parts = split_report(origin_text, token_budget or settings.llm_part_token_budget)
+        logger.info(f"Start to calc raw data of {len(parts)} parts using {self.model_base.model_settings['default_model']}")
+        results: list[dict[str, Any] | None] = [None] * len(parts)
+        semaphore = asyncio.Semaphore(settings.llm_part_concurrency)
+
+        async def extract(index: int) -> bool:
+            async with semaphore:
+                try:
+                    results[index] = await self._extract_raw_part(parts[index])
+                    return True
+                except Exception as e:
+                    logger.warning(f"Failed to calc raw data of part {index + 1}/{len(parts)}: {e}")
+                    return False
+
+        pending = list(range(len(parts)))
+        for attempt in range(settings.llm_part_retries + 1):
+            if attempt:
+                logger.info(f"Retry {len(pending)} failed parts, attempt {attempt}")
+            succeeded = await asyncio.gather(*(extract(index) for index in pending))
+            pending = [index for index, ok in zip(pending, succeeded) if not ok]
+            if not pending:
+                break
+        if pending:
+            raise ValueError(f"Failed to calc raw data of parts {[index + 1 for index in pending]} of {len(parts)}")
+        return merge_raw_data(results)
+
+    async def _extract_raw_part(self, text: str) -> dict[str, Any]:
+        """
+        调用LLM提取一段报告内容的BNF数据，输出不是JSON对象时抛出ValueError
+        """
+        bnf_template = get_capsule_section("raw_data").replace("{text}", text)
+        result = await self.async_client.chat.completions.create(
+            model=self.model_base.model_settings["default_model"],
+            messages=[
+                {"role": "system", "content": "You are a medical report extractor"},
+                {"role": "user", "content": bnf_template}
+            ],
+            temperature=self.model_base.temperature,
+            top_p=self.model_base.top_p,
+            stream=False
+        )
+        logger.debug(f"The result of the query is: /n*******/n{result.choices[0].message.content}/n*******")
+        # 检查输出内容是否符合JSON格式
+        json_data = json.loads(result.choices[0].message.content)
+        if not isinstance(json_data, dict):
+            raise ValueError("The result is not a JSON object")
+        logger.debug(f"The result of the query is: /n*******/n{json_data}/n*******")
+        return json_data
 
     async def calc_summary_data_by_bnf(self, origin_text: str) -> str | None:
         """
@@ -107,15 +145,14 @@ class CapsuleLoader:
             logger.error(f"4xx or 5xx status code was received, its status is: {e.status_code}, "
                          f"and response {e.response}")
             raise e
-        finally:
-            await self.async_client.close()
 
-    async def extract_text_from_image(self, base64_image: str) -> str | None:
+    async def extract_text_from_image(self, base64_image: str, media_type: str = "image/jpeg") -> str | None:
         """
         从图片中提取文本内容
 
         Args:
             base64_image: str, 图片的base64编码
+            media_type: str, 图片的MIME类型
         Returns:
             图片中的文本内容
         """
@@ -126,8 +163,8 @@ class CapsuleLoader:
                 model=vision_model,
                 messages=[
                     {"role": "user", "content": [
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}},
-                        {"type": "text", "text": "Extract the text from the image"}
+                        {"type": "image_url", "image_url": {"url": f"data:{media_type};base64,{base64_image}"}},
+                        {"type": "text", "text": get_capsule_section("vision")}
                     ]}
                 ],
                 temperature=self.model_base.temperature,
@@ -145,6 +182,4 @@ class CapsuleLoader:
         except Exception as e:
             logger.error(f"4xx or 5xx status code was received, its status is: {e.status_code}, "
                          f"and response {e.response}")
-            raise e
-        finally:
-            await self.async_client.close()
\ No newline at end of file
+            raise e
\ No newline at end of file
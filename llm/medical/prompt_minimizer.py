@@ -0,0 +1,129 @@
+import logging
+import re
+from collections import Counter
+
+from llm.medical.report_splitter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# pymupdf4llm的分页线
+_PAGE_BREAK = re.compile(r"(?m)^-{3,}\s*$")
+# 页码行: 第1页/共3页, 第 1 页 共 3 页, Page 1 of 3, - 1 -
+# 单独的数字或分数(如血压120/80)可能是检测结果，不作为页码
+_PAGE_NUMBER = re.compile(r"^\W*(?:第\s*\d+\s*页\W*(?:共\s*\d+\s*页)?|共\s*\d+\s*页\W*第\s*\d+\s*页|"
+                          r"page\s*\d+(?:\s*of\s*\d+)?|[-—]\s*\d+\s*[-—])\W*$", re.IGNORECASE)
+# 非内嵌的图片占位符，内嵌的base64图片(data:)保留
+_IMAGE_PLACEHOLDER = re.compile(r"!\[[^\]]*\]\((?!data:)[^)]*\)")
+# 只有装饰符号的行
+_DECORATION = re.compile(r"^[\s\-=*_~#>|:.·•—]*$")
+# 表格分隔行
+_TABLE_SEPARATOR = re.compile(r"^\|?(?:\s*:?-+:?\s*\|)+\s*:?-*:?\s*$")
+# 对数据提取没有信息量的医院通用声明
+_BOILERPLATE = re.compile(
+    r"本报告仅对(?:所检|送检|本次)|仅对本次.{0,6}负责|仅供临床参考|如有疑问|请妥善保管|结果仅供参考|"
+    r"此报告仅|未经.{0,10}不得复制|报告(?:单)?须经.{0,10}(?:签字|盖章)|请于.{0,10}(?:领取|复诊)|"
+    r"谢谢合作|祝您健康|欢迎(?:再次)?光临"
+)
+# 通用声明从匹配位置删除到所在句子的结尾，不跨越表格单元格，同一行中的检测结果等内容保留
+_BOILERPLATE_SENTENCE = re.compile(rf"(?:{_BOILERPLATE.pattern})[^。；;！!|]*[。；;！!]?")
+# 出现在至少该比例的页面上的行视为页眉页脚
+_FURNITURE_PAGE_RATIO = 0.5
+# 页眉页脚所在的页首和页尾行数
+_FURNITURE_ZONE_LINES = 3
+
+
+def minimize_report(text: str) -> str:
+    """
+    精简报告Markdown中对提取没有信息量的内容，减少LLM的输入token:
+    - 去除各页重复的页眉页脚(只保留第一次出现)和页码
+    - 压缩空白和表格单元格的对齐填充，去除空表格行和装饰行
+    - 去除图片占位符和医院通用声明
+
+    Args:
+        text: PdfProcessor转换出的报告Markdown内容
+
+    Returns:
+        str: 精简后的Markdown内容
+    """
+    if not text:
+        return text
+    pages = [page for page in _PAGE_BREAK.split(text) if page.strip()]
+    furniture = _find_furniture(pages)
+    seen_furniture = set()
+    lines = []
+    for page in pages:
+        for line in page.splitlines():
+            line = _compact_line(line)
+            if not line:
+                if lines and lines[-1]:
+                    lines.append("")
+                continue
+            key = _normalize(line)
+            if key in furniture:
+                if key in seen_furniture:
+                    continue
+                seen_furniture.add(key)
+            line = _strip_boilerplate(line)
+            if not line or not _is_informative(line):
+                continue
+            lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def minimize_with_stats(text: str) -> tuple[str, dict]:
+    """
+    精简报告Markdown，并统计精简前后的token数量
+
+    Returns:
+        tuple: (精简后的内容, {"tokens_before", "tokens_after", "reduction"})
+    """
+    minimized = minimize_report(text)
+    before, after = count_tokens(text or ""), count_tokens(minimized or "")
+    stats = {"tokens_before": before, "tokens_after": after,
+             "reduction": round(1 - after / before, 4) if before else 0.0}
+    logger.info(f"Minimized report from {before} to {after} tokens ({stats['reduction']:.1%} reduction)")
+    return minimized, stats
+
+
+def _find_furniture(pages: list[str]) -> set[str]:
+    if len(pages) < 2:
+        return set()
+    counter = Counter()
+    for page in pages:
+        # 表格行是报告内容，比较时又忽略数字，同一项目在各页的不同结果会被误判为页眉页脚
+        lines = [line for line in page.splitlines() if line.strip() and not line.lstrip().startswith("|")]
+        # 只在页首和页尾的几行中查找，避免误删各页重复出现的检测项目
+        zone = lines[:_FURNITURE_ZONE_LINES] + lines[-_FURNITURE_ZONE_LINES:]
+        counter.update({_normalize(line) for line in zone})
+    threshold = max(2, len(pages) * _FURNITURE_PAGE_RATIO)
+    return {key for key, count in counter.items() if count >= threshold}
+
+
+def _compact_line(line: str) -> str:
+    line = _IMAGE_PLACEHOLDER.sub("", line).strip()
+    if line.startswith("|"):
+        # 只去掉首尾各一个边界竖线，保留首列或末列的空单元格，避免其余单元格错列
+        inner = line[1:-1] if len(line) > 1 and line.endswith("|") else line[1:]
+        cells = [re.sub(r"\s+", " ", cell).strip() for cell in inner.split("|")]
+        if _TABLE_SEPARATOR.match(line):
+            return "|" + "|".join("-" for _ in cells) + "|"
+        # 空表格行压缩为只有竖线的装饰行，由_is_informative去除，不作为段落间的空行打断表格
+        return "|" + "|".join(cells) + "|"
+    return re.sub(r"[ \t　]+", " ", line)
+
+
+def _normalize(line: str) -> str:
+    # 页眉页脚中的页码、日期等数字在各页不同，比较时忽略
+    return re.sub(r"\d+", "#", re.sub(r"\s+", "", line))
+
+
+def _strip_boilerplate(line: str) -> str:
+    if not _BOILERPLATE.search(line):
+        return line
+    return _compact_line(_BOILERPLATE_SENTENCE.sub("", line))
+
+
+def _is_informative(line: str) -> bool:
+    if _TABLE_SEPARATOR.match(line):
+        return True
+    return not (_DECORATION.match(line) or _PAGE_NUMBER.match(line))
@@ -0,0 +1,136 @@
+import json
+import logging
+import re
+from typing import Any
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+# tiktoken不可用(未安装或编码文件无法下载)时为True，改用按字符估算
+_encoding_unavailable = False
+_CJK = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+# Markdown标题或pymupdf4llm的分页线作为章节边界
+_SECTION_BOUNDARY = re.compile(r"(?m)^(?=#{1,6}\s)|^-{3,}\s*$")
+
+
+def count_tokens(text: str) -> int:
+    """
+    计算文本的token数量，采用cl100k_base编码；tiktoken不可用时按字符数估算
+    """
+    global _encoding, _encoding_unavailable
+    if _encoding is None and not _encoding_unavailable:
+        try:
+            if tiktoken is None:
+                raise ImportError("tiktoken is not installed")
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            _encoding_unavailable = True
+            logger.warning(f"Failed to load the cl100k_base encoding, token counts are estimated by characters: {e}")
+    if _encoding is None:
+        return _estimate_tokens(text)
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def _estimate_tokens(text: str) -> int:
+    # 汉字和全角符号按1个token、其余字符按3个字符1个token估算(cl100k_base实际平均约4个字符)，宁可偏大以免超出预算
+    cjk = len(_CJK.findall(text))
+    return cjk + -(-(len(text) - cjk) // 3)
+
+
+def split_report(text: str, token_budget: int) -> list[str]:
+    """
+    按章节/分页将报告Markdown拆分为不超过token_budget的若干部分，相邻的小章节合并到同一部分，
+    超长的章节再按行拆分，拆分结果按原文顺序排列
+
+    Args:
+        text: 报告Markdown内容
+        token_budget: 每部分的token上限
+
+    Returns:
+        list[str]: 拆分后的各部分
+    """
+    sections = [section.strip() for section in _SECTION_BOUNDARY.split(text) if section and section.strip()]
+    blocks = []
+    for section in sections:
+        if count_tokens(section) <= token_budget:
+            blocks.append(section)
+        else:
+            blocks.extend(_split_lines(section, token_budget))
+
+    parts, current, current_tokens = [], [], 0
+    for block in blocks:
+        tokens = count_tokens(block)
+        if current and current_tokens + tokens > token_budget:
+            parts.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(block)
+        current_tokens += tokens
+    if current:
+        parts.append("\n\n".join(current))
+    return parts
+
+
+def _split_lines(section: str, token_budget: int) -> list[str]:
+    lines = section.splitlines()
+    # 超长章节的后续部分带上章节标题，保留上下文
+    heading = lines[0] if lines and lines[0].startswith("#") else None
+    blocks, current, current_tokens = [], [], 0
+    for line in lines:
+        tokens = count_tokens(line)
+        if current and current_tokens + tokens > token_budget:
+            blocks.append("\n".join(current))
+            current, current_tokens = ([heading], count_tokens(heading)) if heading else ([], 0)
+        current.append(line)
+        current_tokens += tokens
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def merge_raw_data(parts: list[Any]) -> Any:
+    """
+    按拆分顺序合并各部分提取出的BNF JSON，合并结果只取决于输入顺序:
+    - 对象按键递归合并，键的顺序为首次出现的顺序
+    - 两侧都是数组时按顺序拼接并去除重复元素
+    - 其余情况保留第一个非空值，不同部分的值冲突时记录日志，不改变字段的类型
+    """
+    merged = None
+    for part in parts:
+        merged = _merge(merged, part)
+    return merged
+
+
+def _merge(left: Any, right: Any, path: str = "$") -> Any:
+    if _is_empty(left):
+        return right
+    if _is_empty(right):
+        return left
+    if isinstance(left, dict) and isinstance(right, dict):
+        merged = dict(left)
+        for key, value in right.items():
+            merged[key] = _merge(merged.get(key), value, f"{path}.{key}")
+        return merged
+    if isinstance(left, list) and isinstance(right, list):
+        return _dedupe(left + right)
+    if left != right:
+        logger.warning(f"Conflicting values at {path} while merging report parts, keep {left!r} and drop {right!r}")
+    return left
+
+
+def _dedupe(items: list) -> list:
+    seen, result = set(), []
+    for item in items:
+        key = json.dumps(item, ensure_ascii=False, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            result.append(item)
+    return result
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
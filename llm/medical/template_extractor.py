@@ -0,0 +1,271 @@
+import logging
+import re
+from typing import Any, Optional
+
+from capsules.core.capsule_type import CapsuleType
+
+logger = logging.getLogger(__name__)
+
+_NUMBER = re.compile(r"[-+]?\d+(?:\.\d+)?")
+# 参考范围: 3.5-9.5, 3.5～9.5, 3.5--9.5, 3.5至9.5
+_RANGE = re.compile(r"^\s*([-+]?\d+(?:\.\d+)?)\s*(?:-{1,2}|～|~|—|至)\s*([-+]?\d+(?:\.\d+)?)\s*$")
+# 单侧参考范围: <5.2, ≤5.2, >1.0, ≥1.0
+_UPPER = re.compile(r"^\s*(?:<|≤|<=|＜)\s*([-+]?\d+(?:\.\d+)?)\s*$")
+_LOWER = re.compile(r"^\s*(?:>|≥|>=|＞)\s*([-+]?\d+(?:\.\d+)?)\s*$")
+# 结果值后的异常标记
+_FLAGS = re.compile(r"[↑↓HLhl*]+$")
+
+
+class TableTemplate:
+    """
+    固定表格版式的化验报告模板，通过表头别名定位指标名、结果和参考范围所在的列
+    """
+
+    def __init__(self, section: str, known_items: list[str] = None,
+                 name_headers: list[str] = None, value_headers: list[str] = None, range_headers: list[str] = None,
+                 low_headers: list[str] = None, high_headers: list[str] = None, unit_headers: list[str] = None):
+        """
+        Args:
+            section: BNF报告单内容的分类，如血液检查
+            known_items: 该类报告的常见指标名，用于评估提取置信度
+            name_headers: 指标名列的表头别名
+            value_headers: 结果列的表头别名
+            range_headers: 参考范围列的表头别名
+            low_headers: 参考下限列的表头别名(下限和上限分列的版式)
+            high_headers: 参考上限列的表头别名
+            unit_headers: 单位列的表头别名
+        """
+        self.section = section
+        self.known_items = set(known_items or [])
+        self.name_headers = name_headers or ["项目", "检验项目", "项目名称", "中文名称", "检测项目", "指标"]
+        self.value_headers = value_headers or ["结果", "检验结果", "测定结果", "测定值", "检测结果"]
+        self.range_headers = range_headers or ["参考范围", "参考区间", "参考值", "正常范围", "生物参考区间"]
+        self.low_headers = low_headers or ["参考下限", "下限"]
+        self.high_headers = high_headers or ["参考上限", "上限"]
+        self.unit_headers = unit_headers or ["单位"]
+
+    def locate_columns(self, header: list) -> Optional[dict]:
+        """
+        根据表头定位各列，缺少指标名或结果列时返回None
+        """
+        cells = [re.sub(r"\s+", "", str(cell or "")) for cell in header]
+
+        def find(aliases: list[str]) -> Optional[int]:
+            for alias in aliases:
+                for index, cell in enumerate(cells):
+                    if cell == alias:
+                        return index
+            for alias in aliases:
+                for index, cell in enumerate(cells):
+                    if alias in cell:
+                        return index
+            return None
+
+        columns = {"name": find(self.name_headers), "value": find(self.value_headers),
+                   "range": find(self.range_headers), "low": find(self.low_headers),
+                   "high": find(self.high_headers), "unit": find(self.unit_headers)}
+        if columns["name"] is None or columns["value"] is None or columns["name"] == columns["value"]:
+            return None
+        return columns
+
+
+class TemplateExtractor:
+    """
+    基于固定表格版式的1阶胶囊raw_data提取器，不调用LLM。
+
+    将化验报告表格的每一行映射为BNF范式的<指标名><指标值><范围下限><范围上限>，
+    并根据可解析行的比例和常见指标的命中率给出置信度，置信度不足时由调用方回退到LLM提取。
+    """
+
+    def __init__(self, capsule_type: CapsuleType, template: TableTemplate, producer: str = None, min_items: int = 3):
+        """
+        Args:
+            capsule_type: 胶囊类型
+            template: 表格模板
+            producer: 采集机构，为空时作为该胶囊类型的通用提取器
+            min_items: 至少提取出的指标数量，少于该数量时置信度为0
+        """
+        self.capsule_type = capsule_type
+        self.template = template
+        self.producer = producer
+        self.min_items = min_items
+        self.name = f"TemplateExtractor[{capsule_type.name}{'/' + producer if producer else ''}]"
+
+    def extract(self, tables: list[list[list]], report_time: str = None, producer: str = None) -> tuple[Optional[dict], float]:
+        """
+        从报告表格中提取raw_data
+
+        Args:
+            tables: PdfProcessor.extract_tables提取的表格，每个表格为行的列表
+            report_time: 报告生成时间
+            producer: 报告生成单位
+
+        Returns:
+            tuple: (raw_data, 置信度)，无法提取时raw_data为None
+        """
+        items, candidate_rows = [], 0
+        for table in tables or []:
+            if not table or len(table) < 2:
+                continue
+            columns = self.template.locate_columns(table[0])
+            if columns is None:
+                continue
+            for row in table[1:]:
+                name = self._cell(row, columns["name"])
+                if not name:
+                    continue
+                candidate_rows += 1
+                item = self._parse_row(row, columns, name)
+                if item is not None:
+                    items.append(item)
+
+        if len(items) < self.min_items or candidate_rows == 0:
+            return None, 0.0
+        confidence = self._confidence(items, candidate_rows)
+        raw_data = {
+            "生成时间戳": report_time,
+            "生成单位": producer,
+            "报告单内容": {self.template.section: items}
+        }
+        return raw_data, confidence
+
+    def summarize(self, raw_data: dict) -> str:
+        """
+        根据提取出的指标生成数据概要，列出超出参考范围的指标
+        """
+        items = raw_data["报告单内容"][self.template.section]
+        abnormal = []
+        for item in items:
+            value, low, high = item["指标值"], item["范围下限"], item["范围上限"]
+            if not isinstance(value, (int, float)):
+                continue
+            if low is not None and value < low:
+                abnormal.append(f"{item['指标名']}偏低")
+            elif high is not None and value > high:
+                abnormal.append(f"{item['指标名']}偏高")
+        summary = f"{self.template.section}共{len(items)}项指标，"
+        if not abnormal:
+            return summary + "均在参考范围内。"
+        return summary + f"{len(abnormal)}项异常：" + "、".join(abnormal) + "。"
+
+    def _parse_row(self, row: list, columns: dict, name: str) -> Optional[dict]:
+        value_text = _FLAGS.sub("", self._cell(row, columns["value"])).strip()
+        if not value_text:
+            return None
+        value = self._number(value_text)
+        low, high = None, None
+        range_text = self._cell(row, columns["range"])
+        if range_text:
+            low, high = self._parse_range(range_text)
+        else:
+            low = self._number(self._cell(row, columns["low"]))
+            high = self._number(self._cell(row, columns["high"]))
+        # 数值结果必须带有可解析的参考范围，否则版式可能不匹配
+        if value is None or (low is None and high is None):
+            return None
+        return {"指标名": name, "指标值": value, "范围下限": low, "范围上限": high}
+
+    def _confidence(self, items: list[dict], candidate_rows: int) -> float:
+        parsed_ratio = len(items) / candidate_rows
+        if not self.template.known_items:
+            return parsed_ratio
+        known = sum(1 for item in items if any(known in item["指标名"] for known in self.template.known_items))
+        return 0.7 * parsed_ratio + 0.3 * known / len(items)
+
+    @staticmethod
+    def _cell(row: list, index: Optional[int]) -> str:
+        if index is None or index >= len(row) or row[index] is None:
+            return ""
+        return re.sub(r"\s+", " ", str(row[index])).strip()
+
+    @staticmethod
+    def _number(text: str) -> Optional[float]:
+        if not text:
+            return None
+        match = _NUMBER.fullmatch(text.strip())
+        return float(match.group()) if match else None
+
+    @staticmethod
+    def _parse_range(text: str) -> tuple[Optional[float], Optional[float]]:
+        match = _RANGE.match(text)
+        if match:
+            return float(match.group(1)), float(match.group(2))
+        match = _UPPER.match(text)
+        if match:
+            return None, float(match.group(1))
+        match = _LOWER.match(text)
+        if match:
+            return float(match.group(1)), None
+        return None, None
+
+
+class TemplateExtractorRegistry:
+    """
+    模板提取器注册表，按(胶囊类型, 采集机构)查找，采集机构没有专用模板时使用该胶囊类型的通用模板
+    """
+
+    def __init__(self):
+        self.extractors: dict[tuple[str, Optional[str]], TemplateExtractor] = {}
+
+    def register(self, extractor: TemplateExtractor):
+        self.extractors[(extractor.capsule_type.value, extractor.producer)] = extractor
+
+    def get(self, capsule_type: str, producer: str = None) -> Optional[TemplateExtractor]:
+        capsule_type = capsule_type.value if isinstance(capsule_type, CapsuleType) else capsule_type
+        producer = producer.strip() if producer else None
+        return self.extractors.get((capsule_type, producer)) or self.extractors.get((capsule_type, None))
+
+
+_BLOOD_TEST_ITEMS = [
+    "白细胞", "红细胞", "血红蛋白", "红细胞压积", "平均红细胞体积", "平均红细胞血红蛋白", "血小板",
+    "中性粒细胞", "淋巴细胞", "单核细胞", "嗜酸性粒细胞", "嗜碱性粒细胞", "WBC", "RBC", "HGB", "HCT", "MCV",
+    "MCH", "MCHC", "PLT", "RDW", "MPV", "NEUT", "LYMPH", "MONO", "EO", "BASO"
+]
+# 金域医学检验的血常规报告: 检验项目 | 缩写 | 检验结果 | 提示 | 单位 | 参考值下限 | 参考值上限，参考范围分两列
+KINGMED_PRODUCER = "广州金域医学检验中心"
+
+template_extractors = TemplateExtractorRegistry()
+template_extractors.register(TemplateExtractor(CapsuleType.BLOOD_TEST, TableTemplate("血液检查", _BLOOD_TEST_ITEMS)))
+template_extractors.register(TemplateExtractor(CapsuleType.BLOOD_TEST, TableTemplate(
+    "血液检查", _BLOOD_TEST_ITEMS,
+    name_headers=["检验项目", "项目名称"],
+    value_headers=["检验结果", "结果"],
+    # 该版式没有合并的参考范围列，"参考值"会按包含关系误匹配到参考值下限列
+    range_headers=["参考区间"],
+    low_headers=["参考值下限", "下限"],
+    high_headers=["参考值上限", "上限"],
+    unit_headers=["单位"]
+), producer=KINGMED_PRODUCER))
+template_extractors.register(TemplateExtractor(CapsuleType.LIPID, TableTemplate("血液检查", [
+    "总胆固醇", "甘油三酯", "高密度脂蛋白", "低密度脂蛋白", "载脂蛋白", "脂蛋白", "TC", "TG", "HDL", "LDL",
+    "APOA1", "APOB", "LP(a)"
+])))
+template_extractors.register(TemplateExtractor(CapsuleType.GLUCOSE, TableTemplate("血液检查", [
+    "葡萄糖", "血糖", "空腹血糖", "餐后", "糖化血红蛋白", "胰岛素", "C肽", "GLU", "HbA1c", "FPG"
+]), min_items=1))
+template_extractors.register(TemplateExtractor(CapsuleType.THYROID, TableTemplate("血液检查", [
+    "促甲状腺激素", "游离甲状腺素", "游离三碘甲状腺原氨酸", "甲状腺素", "三碘甲状腺原氨酸", "甲状腺球蛋白",
+    "抗甲状腺过氧化物酶抗体", "抗甲状腺球蛋白抗体", "TSH", "FT3", "FT4", "T3", "T4", "TG", "TPOAb", "TGAb"
+])))
+
+
+def extract_by_template(capsule_type: str, producer: str, tables: list[list[list]], report_time: str = None,
+                        min_confidence: float = 0.85) -> Optional[tuple[dict, str]]:
+    """
+    使用已注册的模板提取器提取raw_data和数据概要
+
+    Returns:
+        tuple | None: (raw_data, summary_data)，没有匹配的提取器或置信度低于min_confidence时返回None
+    """
+    extractor = template_extractors.get(capsule_type, producer)
+    if extractor is None:
+        return None
+    raw_data, confidence = extractor.extract(tables, report_time, producer)
+    logger.info(f"{extractor.name} extracted with confidence {confidence:.2f}")
+    if raw_data is None or confidence < min_confidence:
+        return None
+    return raw_data, extractor.summarize(raw_data)
+
+
+def has_template(capsule_type: Any, producer: str = None) -> bool:
+    return template_extractors.get(capsule_type, producer) is not None
@@ -0,0 +1,71 @@
+import logging
+
+import httpx
+from openai import AsyncClient
+
+from llm.model_provider.model_base import ModelBase
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClientRegistry:
+    """
+    进程内按模型供应商(model_providers)复用的AsyncClient注册表。
+
+    每个供应商持有一个长连接的httpx连接池，LLM调用复用已建立的TCP/TLS连接，不再每次调用都握手；
+    客户端在首次使用时创建，由应用lifespan在关闭时统一释放，调用方不能关闭取得的客户端。
+    """
+
+    def __init__(self):
+        self.clients: dict[str, AsyncClient] = {}
+
+    def get(self, vendor: str = None) -> AsyncClient:
+        """
+        获取供应商对应的共享客户端
+
+        Args:
+            vendor: 模型供应商，默认为settings.sel_model_provider
+        """
+        vendor = (vendor or settings.sel_model_provider).lower()
+        client = self.clients.get(vendor)
+        if client is None or client.is_closed():
+            client = self._create_client(vendor)
+            self.clients[vendor] = client
+        return client
+
+    @staticmethod
+    def _create_client(vendor: str) -> AsyncClient:
+        model_settings = ModelBase.instance(vendor).model_settings
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_keepalive_connections,
+                keepalive_expiry=settings.llm_keepalive_expiry_seconds
+            ),
+            timeout=httpx.Timeout(settings.llm_timeout_seconds, connect=10.0),
+            follow_redirects=True
+        )
+        client_kwargs = {
+            "api_key": model_settings["api_key"],
+            "http_client": http_client
+        }
+        # 只有在api_base存在且非空时才添加base_url参数
+        if model_settings.get("api_base"):
+            client_kwargs["base_url"] = model_settings["api_base"]
+        logger.info(f"Create pooled LLM client for {vendor}")
+        return AsyncClient(**client_kwargs)
+
+    async def close(self):
+        """
+        关闭所有客户端及其连接池，应用关闭时调用
+        """
+        clients, self.clients = self.clients, {}
+        for vendor, client in clients.items():
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close LLM client of {vendor}: {str(e)}")
+
+
+llm_clients = LLMClientRegistry()
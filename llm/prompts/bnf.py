@@ -1,3 +1,4 @@
+import hashlib
 from typing import Annotated
 
 from fastapi.params import Depends
@@ -17,9 +18,16 @@ _capsule_section = {
     ------------分割线---------------
     {text}
     """,
+    "vision": "Extract the text from the image",
 }
 
 def get_capsule_section(section_name: str) -> str:
     return _capsule_section[section_name]
 
+def get_capsule_section_version(section_name: str) -> str:
+    """
+    提示词模板版本，取模板内容的SHA-256前12位，模板修改后基于该模板的LLM提取结果缓存自动失效
+    """
+    return hashlib.sha256(_capsule_section[section_name].encode("utf-8")).hexdigest()[:12]
+
 SectionDep = Annotated[str, Depends(get_capsule_section)]
\ No newline at end of file
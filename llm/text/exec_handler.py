@@ -1,8 +1,9 @@
 import logging
 
 from fastapi.encoders import jsonable_encoder
-from openai import AsyncClient, APIConnectionError, RateLimitError, APIStatusError
+from openai import APIConnectionError, RateLimitError, APIStatusError
 
+from llm.model_provider.client_registry import llm_clients
 from llm.model_provider.model_base import ModelBase
 from llm.model_provider.options import Vendor, StyleName, TargetPlatform
 from llm.prompts.general_scenes import get_scene
@@ -23,7 +24,7 @@ async def do_title(payload: TitlePayload, vendor: Vendor, template: str, prompt:
     """
     base_model = ModelBase.instance(vendor.name)
     print(f"******{jsonable_encoder(base_model)}*****")
-    client = AsyncClient(api_key=base_model.model_settings["api_key"], base_url=base_model.model_settings["api_base"])
+    client = llm_clients.get(vendor.name)
     logger.info(f"Start to create titles using {vendor.value}")
     try:
         logger.debug(f"Using the template/n{template}/nto generate the results")
@@ -47,8 +48,6 @@ async def do_title(payload: TitlePayload, vendor: Vendor, template: str, prompt:
     except APIStatusError as e:
         logger.error(f"4xx or 5xx status code was received, its status is: {e.status_code}, "
                      f"and response {e.response}")
-    finally:
-        await client.close()
 
 async def do_content(payload: ContentPayload, vendor: Vendor, template: str, prompt: dict[str, str]):
     """
@@ -59,7 +58,7 @@ async def do_content(payload: ContentPayload, vendor: Vendor, template: str, pro
     :return:
     """
     base_model = ModelBase.instance(vendor.name)
-    client = AsyncClient(api_key=base_model.model_settings["api_key"], base_url=base_model.model_settings["api_base"])
+    client = llm_clients.get(vendor.name)
     logger.info(f"Start to create contents using {vendor.value}")
     try:
         logger.debug(f"Using the template/n{template}/nto generate the results")
@@ -83,8 +82,6 @@ async def do_content(payload: ContentPayload, vendor: Vendor, template: str, pro
     except APIStatusError as e:
         logger.error(f"4xx or 5xx status code was received, its status is: {e.status_code}, "
                      f"and response {e.response}")
-    finally:
-        await client.close()
 
 async def do_action_proc(payload: ContextActionPayload, vendor: Vendor):
     """
@@ -95,7 +92,7 @@ async def do_action_proc(payload: ContextActionPayload, vendor: Vendor):
     :return:
     """
     base_model = ModelBase.instance(vendor.name)
-    client = AsyncClient(api_key=base_model.model_settings["api_key"], base_url=base_model.model_settings["api_base"])
+    client = llm_clients.get(vendor.name)
     logger.info(f"Start to do action using {vendor.value}")
     try:
         logger.debug(f"Do the action {payload.action.value}")
@@ -121,8 +118,6 @@ async def do_action_proc(payload: ContextActionPayload, vendor: Vendor):
             f"4xx or 5xx status code was received, its status is: {e.status_code}, "
             f"and response {e.response}"
         )
-    finally:
-        await client.close()
 
 async def convert_style_proc(text: str, vendor: Vendor, style_name: StyleName):
     """
@@ -133,7 +128,7 @@ async def convert_style_proc(text: str, vendor: Vendor, style_name: StyleName):
     :return:
     """
     base_model = ModelBase.instance(vendor.name)
-    client = AsyncClient(api_key=base_model.model_settings["api_key"], base_url=base_model.model_settings["api_base"])
+    client = llm_clients.get(vendor.name)
     logger.info(f"Start to convert style using {vendor.value}")
     try:
         logger.debug(f"Convert original text to style for {style_name}")
@@ -165,8 +160,6 @@ async def convert_style_proc(text: str, vendor: Vendor, style_name: StyleName):
             f"4xx or 5xx status code was received, its status is: {e.status_code}, "
             f"and response {e.response}"
         )
-    finally:
-        await client.close()
 
 async def create_ecommerce_proc(payload: EcommercePayload, template: dict, vendor: Vendor):
     """
@@ -177,7 +170,7 @@ async def create_ecommerce_proc(payload: EcommercePayload, template: dict, vendo
     :return:
     """
     base_model = ModelBase.instance(vendor.name)
-    client = AsyncClient(api_key=base_model.model_settings["api_key"], base_url=base_model.model_settings["api_base"])
+    client = llm_clients.get(vendor.name)
     logger.info(f"Start to create ecommerce content using {vendor.value}")
     query = template["user_prompt"].format(background=payload.background, number=payload.number, subject=payload.subject)
     try:
@@ -201,6 +194,4 @@ async def create_ecommerce_proc(payload: EcommercePayload, template: dict, vendo
         logger.error(
             f"4xx or 5xx status code was received, its status is: {e.status_code}, "
             f"and response {e.response}"
-        )
-    finally:
-        await client.close()
\ No newline at end of file
+        )
\ No newline at end of file
@@ -1,21 +1,28 @@
+import asyncio
 import logging
 import time
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI, Request
 from starlette.middleware.cors import CORSMiddleware
 from uvicorn.config import LOGGING_CONFIG
 
+from capsules.utils import object_store, PdfProcessor
 from common.bus_exception import BusException
 from common.db_base import DBBase
 from config.app_holder import set_app
 from config.database import engine
 from config.logs import setup_logging
 from kb.v1.api import kb_api_router
+from llm.model_provider.client_registry import llm_clients
 from llm.text.v1.api import text_api_router
 from security.v1.api import access_token_router
 from settings import settings
 from utils.ip_util import IPUtils
+from vectors.engines.tenants import run_tenant_sweeper
+from vectors.retrievers.expiry import run_expiry_sweeper
+from vectors.schema.schema_initializer import SchemaInitializer
 from vectors.v1.api import vector_api_router
 from capsules.authorization.v1.api import capsule_api_router
 import capsules.core.schema
@@ -38,8 +45,25 @@ logger.info("Creating database...")
 # Base.metadata.create_all(bind=engine)
 DBBase.metadata.create_all(engine)
 logger.info("Database created successfully!")
+
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    # 向量库集合未迁移到多租户或向量维度与已有集合记录的维度不一致时拒绝启动
+    await asyncio.to_thread(SchemaInitializer.verify_schema)
+    # 启动后台任务：卸载空闲的向量库租户，清理过期的向量库文档
+    background_tasks = [asyncio.create_task(run_tenant_sweeper()), asyncio.create_task(run_expiry_sweeper())]
+    yield
+    for task in background_tasks:
+        task.cancel()
+    # 关闭共享的LLM客户端连接池
+    await llm_clients.close()
+    object_store.close()
+    PdfProcessor.shutdown()
+
+
 app = FastAPI(title=settings.project_name, description="数据银行中台",
-              version=settings.api_version)
+              version=settings.api_version, lifespan=lifespan)
 set_app(app)
 app.include_router(kb_api_router)
 app.include_router(vector_api_router)
@@ -25,7 +25,7 @@ class KeyRepository:
 
     async def create_key(self, db: Session, key: KeyModel) -> SecretKey:
         """
-        创建密钥
+        创建密钥，只flush获取ID，由调用方的事务提交
         :param db
         :param key:
         :return:
@@ -33,8 +33,7 @@ class KeyRepository:
         self.logger.info(f"create_key key: {key}")
         key_create = SecretKey(**key.model_dump(exclude_unset= True))
         db.add(key_create)
-        db.commit()
-        db.refresh(key_create)
+        db.flush()
 
         return key_create
 
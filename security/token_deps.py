@@ -56,7 +56,7 @@ async def is_token_valid(db: SessionDep, tenant_uuid: str = Header(..., descript
                 if expires < datetime.now():
                     raise unauthorized_exception
             if await acl_control_repo.is_acl_control_valid(db, acl_key, acl_secret, tenant_uuid):
-                return response_base.success_simple(data={"tenant_uuid": tenant_uuid, "acl_key": acl_key, "acl_secret": acl_secret})
+                return await response_base.success_simple(data={"tenant_uuid": tenant_uuid, "acl_key": acl_key, "acl_secret": acl_secret})
             else:
                 raise unauthorized_exception
         else:
@@ -70,4 +70,32 @@ async def is_token_valid(db: SessionDep, tenant_uuid: str = Header(..., descript
         logger.error(f"Unexpected error during token validation: {str(e)}", exc_info=True)
         raise unauthorized_exception
 
-TokenDeps = Depends(is_token_valid)
\ No newline at end of file
+TokenDeps = Depends(is_token_valid)
+
+
+async def get_verified_tenant(tenant_uuid: str = Header(..., description="租户唯一标识"),
+                              token_result: dict = Depends(is_token_valid)) -> str:
+    """
+    返回Token中经过验证的租户，请求头的租户与之不一致时拒绝访问，避免持有A租户Token的请求访问B租户的数据
+    """
+    verified_tenant = token_result["data"]["tenant_uuid"]
+    if tenant_uuid != verified_tenant:
+        logger.warning(f"Tenant {tenant_uuid} in request header does not match the token tenant {verified_tenant}")
+        raise HTTPException(status_code=403, detail="租户与Token不匹配")
+    return verified_tenant
+
+
+TenantDeps = Depends(get_verified_tenant)
+
+
+async def get_admin_tenant(tenant_uuid: str = Depends(get_verified_tenant)) -> str:
+    """
+    返回经过验证的运维管理租户(settings.admin_tenants)，其他租户拒绝访问跨租户的运维接口
+    """
+    if tenant_uuid not in settings.admin_tenants:
+        logger.warning(f"Tenant {tenant_uuid} is not an admin tenant")
+        raise HTTPException(status_code=403, detail="需要运维管理租户的权限")
+    return tenant_uuid
+
+
+AdminTenantDeps = Depends(get_admin_tenant)
@@ -23,6 +23,8 @@ class APISettings(BaseSettings):
     server_port: int = 8000
     # Host配置
     trusted_hosts: list[str] = ["*"]
+    # 运维管理租户，只有这些租户的Token可以调用跨租户的运维接口(如清除LLM提取结果缓存)，逗号分隔
+    admin_tenants: list[str] = [tenant for tenant in os.environ.get("ADMIN_TENANTS", "").split(",") if tenant]
     # Mysql配置从环境变量中获取
     database_url: str = "mysql+pymysql://{}:{}@{}:{}/{}?charset=utf8mb4&autocommit=true".format(
         os.environ.get("DATABASE_USER", "mysql"),
@@ -38,15 +40,41 @@ class APISettings(BaseSettings):
     minio_access_key: str = os.environ.get("MINIO_ACCESS_KEY", "minio")
     minio_secret_key: str = os.environ.get("MINIO_SECRET_KEY", "minio123")
     minio_bucket: str = os.environ.get("MINIO_BUCKET", "data-bank")
+    # 原始医疗数据的对象存储: minio | local
+    object_store_backend: str = os.environ.get("OBJECT_STORE_BACKEND", "minio")
+    # local对象存储的根目录
+    object_store_dir: str = "./upload/objects"
+    # 对象存储同步I/O的线程池大小
+    object_store_workers: int = 16
+    # 大文件分片上传和下载的分片大小(MB)及每个文件并行的分片数
+    object_store_part_size_mb: int = 16
+    object_store_parallel_parts: int = 4
+    # 向量库文档全文存储位置: minio | local，Weaviate中仅保存其地址和哈希
+    vector_content_store: str = os.environ.get("VECTOR_CONTENT_STORE", "minio")
+    vector_content_dir: str = "./upload/contents"
     # Weaviate
     weaviate_host: str = os.environ.get("WEAVIATE_HOST", "192.168.1.182")
     weaviate_port: int = os.environ.get("WEAVIATE_PORT", "8080")
     weaviate_grpc_port: int = 50051
+    # 向量库多租户：未携带租户的请求使用的默认租户，空闲超过该时间的租户将被卸载(OFFLOADED | INACTIVE)
+    vector_default_tenant: str = "default"
+    vector_tenant_idle_minutes: int = 30
+    vector_tenant_idle_status: str = os.environ.get("VECTOR_TENANT_IDLE_STATUS", "OFFLOADED")
+    # 向量库过期文档(expires_at)清理间隔(分钟)，0表示不清理
+    vector_ttl_sweep_minutes: int = int(os.environ.get("VECTOR_TTL_SWEEP_MINUTES", 60))
     # Chunking
     chunk_size: int = 1024
     chunk_overlap: int = 20
     chunk_type: str = "word"
+    # 表格类文件(csv/xlsx)每个chunk包含的行数
+    tabular_batch_rows: int = 50
     default_openai_embedding_model: str = "text-embedding-ada-002"
+    # 向量维度，0表示使用embedding模型的原生维度，text-embedding-3系列模型支持服务端降维
+    embedding_dimensions: int = int(os.environ.get("EMBEDDING_DIMENSIONS", 0))
+    # embedding后端: openai | local，local为本地确定性哈希向量，用于离线压测和CI，可配置维度和模拟的调用延迟(毫秒)
+    embedding_backend: str = os.environ.get("EMBEDDING_BACKEND", "openai")
+    local_embedding_dimensions: int = int(os.environ.get("LOCAL_EMBEDDING_DIMENSIONS", 384))
+    local_embedding_latency_ms: float = float(os.environ.get("LOCAL_EMBEDDING_LATENCY_MS", 0))
     # JWT
     SECRET_KEY: str = os.environ.get("SECRET_KEY", "secret_key")
     ALGORITHM: str = "HS256"
@@ -71,6 +99,20 @@ class APISettings(BaseSettings):
 
     # 默认模型
     sel_model_provider: str = os.environ.get("SEL_MODEL_PROVIDER", "openai")
+    # 图片报告交给视觉模型前缩小到的最长边(像素)和重新压缩的JPEG质量
+    vision_image_max_side: int = 2048
+    vision_image_quality: int = 85
+    # LLM提取前精简报告内容(页眉页脚、空白填充、通用声明等)
+    prompt_minimize_enabled: bool = True
+    # 长报告拆分提取：每部分的token上限、并发提取的部分数和失败部分的重试次数
+    llm_part_token_budget: int = 3000
+    llm_part_concurrency: int = 4
+    llm_part_retries: int = 2
+    # LLM客户端连接池，每个模型供应商一个，进程内共享
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 50
+    llm_keepalive_expiry_seconds: float = 60.0
+    llm_timeout_seconds: float = 120.0
 
     # 密钥保护密码
     SECRET_PASSPHRASE: str = os.environ.get("SECRET_PASSPHRASE", "")
@@ -79,6 +121,22 @@ class APISettings(BaseSettings):
     log_dir: str = "./logs"
     # 临时文件目录
     tmp_dir: str = "./upload"
+    # PDF转Markdown的进程池大小，以及大报告按页拆分并行转换时每个任务的页数
+    pdf_workers: int = max(1, (os.cpu_count() or 2) - 1)
+    pdf_pages_per_task: int = 8
+    # 异步采集任务结束后保留的时间(分钟)，用于状态查询
+    collect_job_ttl_minutes: int = 60
+    # 批量采集时并发封装的报告数量上限
+    batch_collect_concurrency: int = 16
+    # 批量采集单个压缩包解压后的大小上限(MB)
+    batch_collect_max_archive_mb: int = 1024
+    # 固定版式的常规化验报告按表格模板提取，置信度低于阈值时回退到LLM
+    fast_path_enabled: bool = True
+    fast_path_min_confidence: float = 0.85
+    # LLM提取结果缓存，相同报告重复提交时不再调用LLM
+    extraction_cache_enabled: bool = True
+    # LLM提取结果缓存的有效期(小时)
+    extraction_cache_ttl_hours: int = 168
     # 密钥目录
     certs_dir: str = "./certs"
     # OCR
@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+# config.database在导入时连接数据库，测试使用临时的SQLite数据库，不连接MySQL
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'data_bank_test.db')}")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+# 注册所有映射类，关系和外键才能解析
+import capsules.authorization.schema  # noqa: F401
+import capsules.core.schema  # noqa: F401
+import pki.kms  # noqa: F401
+from common.db_base import DBBase
+
+
+@pytest.fixture
+def db_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    DBBase.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(db_engine):
+    with Session(db_engine) as session:
+        yield session
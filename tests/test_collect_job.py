@@ -0,0 +1,37 @@
+import asyncio
+
+from capsules.authorization.services.collect_job import CollectJobRegistry
+
+
+async def _collect(job):
+    job.emit("stored")
+    return "capsule-uuid"
+
+
+def test_jobs_are_only_visible_to_their_tenant():
+    async def main():
+        registry = CollectJobRegistry()
+        job, created = registry.submit("file-hash", _collect, owner="tenant_a")
+        await job.task
+        assert created and job.status == "succeeded"
+        assert registry.get(job.job_id, "tenant_a") is job
+        # 其他租户和未指定租户按任务不存在处理
+        assert registry.get(job.job_id, "tenant_b") is None
+        assert registry.get(job.job_id) is None
+        assert registry.get("unknown", "tenant_a") is None
+
+    asyncio.run(main())
+
+
+def test_duplicate_submissions_are_deduplicated_per_tenant():
+    async def main():
+        registry = CollectJobRegistry()
+        job_a, _ = registry.submit("file-hash", _collect, owner="tenant_a")
+        retried, created = registry.submit("file-hash", _collect, owner="tenant_a")
+        assert retried is job_a and not created
+        # 相同去重键的其他租户任务不会复用
+        job_b, created = registry.submit("file-hash", _collect, owner="tenant_b")
+        assert created and job_b is not job_a
+        await asyncio.gather(job_a.task, job_b.task)
+
+    asyncio.run(main())
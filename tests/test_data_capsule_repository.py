@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import select
+
+from capsules.core.models.additional_props import CapsuleAdditionalPropsModel
+from capsules.core.models.capsule import DataCapsuleModel
+from capsules.core.repository.additional_props import additional_props_repository
+from capsules.core.repository.data_capsule import data_capsule_repo
+from capsules.core.schema import CapsuleAdditionalProps, DataCapsule
+from common.db_deps import unit_of_work
+
+# 每行比较的列，不包括各自生成的主键、UUID和创建时间
+PROPS_COLUMNS = ["owner", "sexy", "age", "area", "type", "producer", "producer_time", "level"]
+
+
+def _props(owner: str) -> CapsuleAdditionalPropsModel:
+    return CapsuleAdditionalPropsModel(type="20001", owner=owner, producer="某医院检验科",
+                                       producer_time=datetime(2024, 1, 2, 8, 30), sexy=1, age=40,
+                                       area={"province": "广东", "city": "广州"})
+
+
+def _capsule(uuid: str) -> DataCapsuleModel:
+    return DataCapsuleModel(uuid=uuid, summary_ciphertext="summary", gene_ciphertext="gene",
+                            raw_ciphertext="raw", signature="signature")
+
+
+def _row(db, model, uuid_column, uuid: str, columns: list[str]) -> dict:
+    row = db.execute(select(model).where(uuid_column == uuid)).scalar_one()
+    return {column: getattr(row, column) for column in columns}
+
+
+def test_batch_insert_stores_the_same_columns_as_single_insert(db):
+    with unit_of_work(db):
+        props = asyncio.run(additional_props_repository.create_additional_props(db, _props("owner-1")))
+        capsule = _capsule("capsule-single")
+        capsule.additional_props_id = props.id
+        asyncio.run(data_capsule_repo.create_data_capsule(db, capsule))
+    with unit_of_work(db):
+        uuids = asyncio.run(data_capsule_repo.create_data_capsules(db, [(_props("owner-1"), _capsule("capsule-batch-1")),
+                                                                        (_props("owner-2"), _capsule("capsule-batch-2"))]))
+    assert uuids == ["capsule-batch-1", "capsule-batch-2"]
+
+    def props_of(capsule_uuid: str) -> dict:
+        capsule = db.execute(select(DataCapsule).where(DataCapsule.uuid == capsule_uuid)).scalar_one()
+        return _row(db, CapsuleAdditionalProps, CapsuleAdditionalProps.id, capsule.additional_props_id, PROPS_COLUMNS)
+
+    single, batch = props_of("capsule-single"), props_of("capsule-batch-1")
+    assert batch == single
+    assert batch["producer_time"] == datetime(2024, 1, 2, 8, 30)
+    assert batch["level"] == 1
+    assert props_of("capsule-batch-2")["owner"] == "owner-2"
+
+    capsule_columns = ["summary_ciphertext", "gene_ciphertext", "raw_ciphertext", "signature"]
+    assert _row(db, DataCapsule, DataCapsule.uuid, "capsule-batch-1", capsule_columns) == \
+           _row(db, DataCapsule, DataCapsule.uuid, "capsule-single", capsule_columns)
+
+
+def test_batch_insert_without_items(db):
+    assert asyncio.run(data_capsule_repo.create_data_capsules(db, [])) == []
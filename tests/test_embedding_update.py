@@ -0,0 +1,87 @@
+import contextlib
+import json
+import uuid as uuid_lib
+from types import SimpleNamespace
+
+from vectors.embeddings import base_embedding
+from vectors.embeddings.base_embedding import BaseEmbedding
+from vectors.embeddings.hashing_embedding import HashingEmbedding
+from vectors.models.chunk import Chunk
+from vectors.models.document import Document
+from vectors.stores import BaseContentStore
+
+
+class FakeBatch:
+    def __init__(self):
+        self.objects = []
+
+    def add_object(self, properties: dict, uuid: str, vector: list):
+        self.objects.append((uuid, properties, vector))
+
+
+class FakeCollection:
+    def __init__(self):
+        self.batch_objects = FakeBatch()
+        self.deleted = []
+        self.updated = []
+        self.batch = SimpleNamespace(dynamic=lambda: contextlib.nullcontext(self.batch_objects))
+        self.data = SimpleNamespace(delete_many=lambda where: self.deleted.append(where),
+                                    update=lambda uuid, properties: self.updated.append(uuid))
+
+
+class CountingEmbedding(HashingEmbedding):
+    def __init__(self):
+        super().__init__(dimensions=8, latency_ms=0)
+        self.calls = []
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(texts)
+        return super().embed_texts(texts)
+
+
+def _stored(uuid: str, content: str, chunk_id: int):
+    return SimpleNamespace(uuid=uuid, properties={"content_hash": BaseContentStore.hash_content(content),
+                                                  "chunk_id": chunk_id, "metadata": json.dumps(None)})
+
+
+def test_chunks_are_embedded_in_groups_of_batch_size():
+    embedding = CountingEmbedding()
+    embedding.batch_size = 2
+    batch = FakeBatch()
+    chunks = [Chunk(doc_name="doc", content=f"chunk {i}", chunk_id=i) for i in range(5)]
+    embedding._add_embedded_chunks(batch, chunks)
+    assert [len(texts) for texts in embedding.calls] == [2, 2, 1]
+    assert len(batch.objects) == 5
+
+
+def test_update_embeds_only_new_chunks_and_moves_the_others(monkeypatch):
+    collections = {"Documents": FakeCollection(), "Chunks": FakeCollection()}
+    client = SimpleNamespace(
+        collections=SimpleNamespace(get=lambda name: SimpleNamespace(with_tenant=lambda tenant: collections[name])),
+        batch=SimpleNamespace(failed_objects=[]),
+        close=lambda: None)
+    monkeypatch.setattr(base_embedding, "WeaviateEngine", lambda: SimpleNamespace(get_engine=lambda: client))
+    monkeypatch.setattr(base_embedding, "get_content_store",
+                        lambda: SimpleNamespace(put=lambda content, namespace: ("uri", "hash")))
+    alpha, beta, gamma = (str(uuid_lib.uuid4()) for _ in range(3))
+    stored = [_stored(alpha, "alpha", 0), _stored(beta, "beta", 1), _stored(gamma, "gamma", 2)]
+    monkeypatch.setattr(BaseEmbedding, "_fetch_chunks", staticmethod(lambda chunks, doc_uuid: stored))
+    monkeypatch.setattr(BaseEmbedding, "_fetch_vectors",
+                        staticmethod(lambda chunks, uuids: {uuid: [1.0] * 8 for uuid in uuids}))
+
+    doc = Document(name="doc", content="delta alpha gamma",
+                   chunks=[Chunk(doc_name="doc", content=content, chunk_id=i)
+                           for i, content in enumerate(["delta", "alpha", "gamma"])])
+    embedding = CountingEmbedding()
+    embedding.update(doc, {"uuid": "doc-uuid", "content_hash": "hash", "content_uri": "uri"})
+
+    chunks = collections["Chunks"]
+    # 只为新增的分块调用一次embedding，移动的分块沿用存储的向量
+    assert embedding.calls == [["delta"]]
+    written = {properties["content"]: (uuid, vector) for uuid, properties, vector in chunks.batch_objects.objects}
+    assert set(written) == {"delta", "alpha"}
+    assert written["alpha"] == (alpha, [1.0] * 8)
+    assert written["delta"][1] == embedding.embed_texts(["delta"])[0]
+    # 未匹配的分块被删除，文档元数据原地更新
+    assert len(chunks.deleted) == 1 and beta in str(chunks.deleted[0])
+    assert collections["Documents"].updated == ["doc-uuid"]
@@ -0,0 +1,50 @@
+import base64
+import string
+from datetime import datetime
+
+import pytest
+
+from common.bus_exception import BusException
+from common.keyset_cursor import DEFAULT_PAGE_SIZE, build_page, decode_cursor, encode_cursor, page_size
+
+
+@pytest.mark.parametrize("create_time", [datetime(2024, 1, 1, 8, 30), datetime(2024, 1, 1, 8, 30, 15, 123456)])
+def test_cursor_round_trip(create_time):
+    cursor = encode_cursor(create_time, 42)
+    # 游标作为查询参数传递，只包含URL安全的字符
+    assert set(cursor) <= set(string.ascii_letters + string.digits + "-_=")
+    assert decode_cursor(cursor) == (create_time, 42)
+
+
+def test_empty_cursor_is_first_page():
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    "游标",
+    base64.urlsafe_b64encode(b"2024-01-01T08:30:00").decode(),
+    base64.urlsafe_b64encode(b"yesterday|1").decode(),
+    base64.urlsafe_b64encode(b"2024-01-01T08:30:00|abc").decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe|1").decode(),
+])
+def test_invalid_cursor(cursor):
+    with pytest.raises(BusException) as exc_info:
+        decode_cursor(cursor)
+    assert exc_info.value.code == 10011
+
+
+def test_build_page_sets_next_cursor_only_on_full_page():
+    items = [{"id": 3, "create_time": datetime(2024, 1, 3)}, {"id": 2, "create_time": datetime(2024, 1, 2)}]
+    page = build_page(items, 2)
+    assert page["items"] is items
+    assert decode_cursor(page["next_cursor"]) == (datetime(2024, 1, 2), 2)
+    assert build_page(items, 3)["next_cursor"] is None
+    assert build_page([], 2) == {"items": [], "next_cursor": None}
+
+
+@pytest.mark.parametrize("limit, expected", [(1, 1), (1000, 1000), (0, DEFAULT_PAGE_SIZE), (-5, DEFAULT_PAGE_SIZE),
+                                             (1001, DEFAULT_PAGE_SIZE)])
+def test_page_size(limit, expected):
+    assert page_size(limit) == expected
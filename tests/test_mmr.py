@@ -0,0 +1,27 @@
+from vectors.retrievers.mmr import mmr_select
+
+
+def test_empty_candidates_or_zero_top_k():
+    assert mmr_select([1.0, 0.0], [], 3) == []
+    assert mmr_select([1.0, 0.0], [[1.0, 0.0]], 0) == []
+
+
+def test_pure_relevance_order():
+    candidates = [[0.0, 1.0], [1.0, 0.0], [0.8, 0.6]]
+    assert mmr_select([1.0, 0.0], candidates, 3, lambda_mult=1.0) == [1, 2, 0]
+
+
+def test_diversity_skips_near_duplicates():
+    # 第2个候选与最相关的候选几乎相同，降低lambda_mult后应先选择不同方向的候选
+    candidates = [[1.0, 0.0], [0.99, 0.01], [0.6, 0.8]]
+    assert mmr_select([1.0, 0.0], candidates, 2, lambda_mult=1.0) == [0, 1]
+    assert mmr_select([1.0, 0.0], candidates, 2, lambda_mult=0.3) == [0, 2]
+
+
+def test_top_k_larger_than_candidates():
+    selected = mmr_select([1.0, 0.0], [[1.0, 0.0], [0.0, 1.0]], 5)
+    assert sorted(selected) == [0, 1]
+
+
+def test_zero_vectors_do_not_divide_by_zero():
+    assert mmr_select([0.0, 0.0], [[0.0, 0.0], [1.0, 0.0]], 2) == [0, 1]
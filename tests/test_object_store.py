@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+from capsules.utils.object_store import BaseObjectStore
+
+
+def test_cancelled_call_waits_for_the_worker_thread():
+    started, release, finished = threading.Event(), threading.Event(), threading.Event()
+
+    def blocking_upload():
+        started.set()
+        release.wait(5)
+        finished.set()
+
+    async def main():
+        store = BaseObjectStore()
+        task = asyncio.create_task(store._run(blocking_upload))
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        # 线程仍在执行时取消不会完成
+        assert not task.done()
+        release.set()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        assert task.cancelled()
+        assert finished.is_set()
+        store.executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_local_file_url_is_the_stream_route(tmp_path):
+    from capsules.utils.local_object_store import LocalObjectStore
+
+    store = LocalObjectStore(str(tmp_path))
+    url = asyncio.run(store.get_file_url("capsule-1"))
+    # 不暴露服务器文件路径
+    assert url == "/api/v1/capsules/rawdata/capsule-1/stream"
+    assert str(tmp_path) not in url
+    store.executor.shutdown()
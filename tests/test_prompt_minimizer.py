@@ -0,0 +1,46 @@
+from llm.medical.prompt_minimizer import minimize_report, minimize_with_stats
+
+
+def test_keeps_empty_boundary_cell_in_table_rows():
+    text = "|  | 项目 | 结果 |\n|---|---|---|\n||WBC|5.2|\n|  RBC  |   4.5 ||"
+    assert minimize_report(text).splitlines() == ["||项目|结果|", "|-|-|-|", "||WBC|5.2|", "|RBC|4.5||"]
+
+
+def test_drops_empty_rows_and_decorations_without_breaking_tables():
+    text = "|项目|结果|\n|---|---|\n|WBC|5.2|\n|  |  |\n====\n|RBC|4.5|"
+    assert minimize_report(text) == "|项目|结果|\n|-|-|\n|WBC|5.2|\n|RBC|4.5|"
+
+
+def test_drops_image_placeholders_but_keeps_embedded_images():
+    text = "白细胞 5.2 ![](image_1.png)\n![logo](data:image/png;base64,AAAA)"
+    assert minimize_report(text) == "白细胞 5.2\n![logo](data:image/png;base64,AAAA)"
+
+
+def test_removes_boilerplate_span_but_keeps_results():
+    text = ("|项目|结果|备注|\n|---|---|---|\n|WBC|5.2|仅供临床参考|\n"
+            "空腹血糖 5.6 mmol/L，本报告仅对所检标本负责。请空腹复查\n"
+            "谢谢合作！\n"
+            "|仅供临床参考| |")
+    assert minimize_report(text).splitlines() == [
+        "|项目|结果|备注|", "|-|-|-|", "|WBC|5.2||", "空腹血糖 5.6 mmol/L，请空腹复查"
+    ]
+
+
+def test_repeated_page_furniture_and_page_numbers():
+    page = "某某医院检验报告单\n|项目|结果|\n|---|---|\n|WBC|{value}|\n第{n}页 共2页"
+    text = page.format(value="5.2", n=1) + "\n---\n" + page.format(value="6.1", n=2)
+    lines = minimize_report(text).splitlines()
+    assert lines.count("某某医院检验报告单") == 1
+    assert not any("页" in line for line in lines if line != "某某医院检验报告单")
+    assert "|WBC|5.2|" in lines and "|WBC|6.1|" in lines
+
+
+def test_keeps_values_that_look_like_page_numbers():
+    assert minimize_report("血压\n120/80\n3") == "血压\n120/80\n3"
+
+
+def test_stats():
+    minimized, stats = minimize_with_stats("a    b\n\n\n仅供临床参考")
+    assert minimized == "a b"
+    assert stats["tokens_before"] > stats["tokens_after"] > 0
+    assert minimize_with_stats("")[1]["reduction"] == 0.0
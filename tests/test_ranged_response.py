@@ -0,0 +1,33 @@
+import pytest
+
+from capsules.utils.ranged_response import RangeNotSatisfiable, parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 100)),
+    ("bytes=100-", (100, 900)),
+    ("bytes=-100", (900, 100)),
+    # 结束位置超出对象大小时截断到最后一个字节
+    ("bytes=900-5000", (900, 100)),
+    # 后缀长度超出对象大小时返回完整对象
+    ("bytes=-5000", (0, 1000)),
+    (" bytes=0-0 ", (0, 1)),
+])
+def test_parse_single_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [None, "", "bytes=-", "bytes=0-1,5-6", "items=0-1", "bytes=a-b"])
+def test_unsupported_range_returns_full_object(header):
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=500-100", "bytes=-0"])
+def test_unsatisfiable_range(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 1000)
+
+
+def test_empty_object_is_unsatisfiable():
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=0-", 0)
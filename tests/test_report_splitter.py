@@ -0,0 +1,57 @@
+import logging
+
+from llm.medical.report_splitter import count_tokens, merge_raw_data, split_report
+
+
+def test_merge_objects_keeps_key_order_and_concatenates_lists():
+    parts = [
+        {"生成单位": "某医院", "报告单内容": {"血液检查": [{"指标名": "WBC", "指标值": 5.2}]}},
+        {"生成时间戳": "2024-01-01", "报告单内容": {"血液检查": [{"指标名": "WBC", "指标值": 5.2},
+                                                                {"指标名": "RBC", "指标值": 4.5}]}},
+    ]
+    merged = merge_raw_data(parts)
+    assert list(merged) == ["生成单位", "报告单内容", "生成时间戳"]
+    assert merged["报告单内容"]["血液检查"] == [{"指标名": "WBC", "指标值": 5.2}, {"指标名": "RBC", "指标值": 4.5}]
+
+
+def test_merge_scalar_conflict_keeps_first_value(caplog):
+    with caplog.at_level(logging.WARNING):
+        merged = merge_raw_data([{"生成时间戳": "2024-01-01"}, {"生成时间戳": "2024-01-02"}])
+    assert merged == {"生成时间戳": "2024-01-01"}
+    assert "$.生成时间戳" in caplog.text
+
+
+def test_merge_empty_values_are_filled_by_later_parts():
+    merged = merge_raw_data([{"生成单位": "", "结论": None}, {"生成单位": "某医院", "结论": "正常"}])
+    assert merged == {"生成单位": "某医院", "结论": "正常"}
+
+
+def test_merge_list_and_scalar_keeps_first_value():
+    assert merge_raw_data([{"a": ["x"]}, {"a": "y"}]) == {"a": ["x"]}
+    assert merge_raw_data([{"a": "y"}, {"a": ["x"]}]) == {"a": "y"}
+
+
+def test_merge_depends_only_on_order():
+    parts = [{"a": 1}, {"a": 2, "b": [1]}, {"b": [2, 1]}]
+    assert merge_raw_data(parts) == merge_raw_data(list(parts)) == {"a": 1, "b": [1, 2]}
+    assert merge_raw_data([]) is None
+
+
+def test_split_report_keeps_order():
+    text = "\n".join(f"# 第{i}节\n" + "\n".join(f"项目{i}-{j} 结果 {j}" for j in range(5)) for i in range(6))
+    budget = count_tokens(text) // 3
+    parts = split_report(text, budget)
+    assert len(parts) > 1
+    assert [line for part in parts for line in part.splitlines() if line.strip()] == \
+           [line for line in text.splitlines() if line.strip()]
+
+
+def test_split_long_section_repeats_heading():
+    text = "# 血常规\n" + "\n".join(f"项目{i} 结果 {i}" for i in range(40))
+    parts = split_report(text, count_tokens(text) // 4)
+    assert len(parts) > 1
+    assert all(part.startswith("# 血常规") for part in parts)
+
+
+def test_split_short_report_is_single_part():
+    assert split_report("# a\nxx\n---\n# b\nyy", 1000) == ["# a\nxx\n\n# b\nyy"]
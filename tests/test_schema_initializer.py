@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from weaviate.classes.tenants import Tenant, TenantActivityStatus
+
+from settings import settings
+from vectors.schema.schema_initializer import SchemaInitializer
+
+
+class FakeCollection:
+    def __init__(self, tenants: dict[str, tuple[TenantActivityStatus, list]]):
+        self.tenants_data = tenants
+        self.tenants = SimpleNamespace(get=lambda: {
+            name: Tenant(name=name, activity_status=status) for name, (status, _) in tenants.items()})
+        self.fetched = []
+
+    def with_tenant(self, tenant: str):
+        objects = [SimpleNamespace(vector={"default": vector}) for vector in self.tenants_data[tenant][1]]
+
+        def fetch_objects(limit: int, include_vector: bool):
+            self.fetched.append(tenant)
+            return SimpleNamespace(objects=objects[:limit])
+        return SimpleNamespace(query=SimpleNamespace(fetch_objects=fetch_objects))
+
+
+def test_stored_dimensions_skips_inactive_and_empty_tenants():
+    collection = FakeCollection({
+        "cold": (TenantActivityStatus.INACTIVE, [[0.0] * 8]),
+        "empty": (TenantActivityStatus.ACTIVE, []),
+        "hot": (TenantActivityStatus.ACTIVE, [[0.0] * 4]),
+    })
+    client = SimpleNamespace(collections=SimpleNamespace(get=lambda name: collection))
+    assert SchemaInitializer.stored_dimensions(client, "Chunks") == 4
+    # 不激活冷租户
+    assert "cold" not in collection.fetched
+
+
+def test_expected_dimensions_follow_the_embedding_backend(monkeypatch):
+    monkeypatch.setitem(SchemaInitializer.vector_dimensions, "Chunks", 0)
+    monkeypatch.setattr(settings, "embedding_backend", "openai")
+    monkeypatch.setattr(settings, "default_openai_embedding_model", "text-embedding-3-large")
+    assert SchemaInitializer.expected_dimensions("Chunks") == 3072
+    monkeypatch.setitem(SchemaInitializer.vector_dimensions, "Chunks", 256)
+    assert SchemaInitializer.expected_dimensions("Chunks") == 256
+    monkeypatch.setattr(settings, "default_openai_embedding_model", "unknown-model")
+    assert SchemaInitializer.expected_dimensions("Chunks") == 256
+    monkeypatch.setitem(SchemaInitializer.vector_dimensions, "Chunks", 0)
+    assert SchemaInitializer.expected_dimensions("Chunks") is None
+    monkeypatch.setattr(settings, "embedding_backend", "local")
+    assert SchemaInitializer.expected_dimensions("Chunks") == settings.local_embedding_dimensions
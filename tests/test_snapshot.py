@@ -0,0 +1,18 @@
+import pyarrow as pa
+import pytest
+
+from vectors.snapshot import SnapshotWriter, _read_batches
+
+
+@pytest.mark.parametrize("file_format", ["arrow", "parquet"])
+def test_vectors_after_a_batch_without_vectors_are_kept(tmp_path, file_format):
+    file_path = str(tmp_path / f"chunks.{file_format}")
+    writer = SnapshotWriter(file_path, file_format, {"uuid": pa.string(), "content": pa.string()})
+    writer.write([{"uuid": "a", "content": "no vector"}])
+    writer.write([{"uuid": "b", "content": "with vector", "vector": [0.5, 0.25]}])
+    writer.close()
+
+    rows = [row for batch in _read_batches(file_path, file_format, 10) for row in batch.to_pylist()]
+    assert writer.rows == 2
+    assert rows[0]["vector"] is None
+    assert rows[1]["vector"] == [0.5, 0.25]
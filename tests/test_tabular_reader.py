@@ -0,0 +1,51 @@
+from openpyxl import Workbook
+
+from vectors.readers.tabular_reader import TabularReader
+
+
+def test_csv_rows_are_chunked_with_headers_and_row_ranges(tmp_path):
+    file_name = tmp_path / "labs.csv"
+    file_name.write_text("item,value,unit\nALT,35,U/L\n\nAST,28,U/L\nGLU,5.4,mmol/L\n", encoding="utf-8")
+
+    docs = TabularReader(batch_rows=2).load(str(file_name))
+
+    assert len(docs) == 1
+    doc = docs[0]
+    assert [chunk.content for chunk in doc.chunks] == [
+        "|item|value|unit|\n|ALT|35|U/L|",
+        "|item|value|unit|\n|AST|28|U/L|\n|GLU|5.4|mmol/L|",
+    ]
+    # 空行不生成内容，但计入行号
+    assert [(chunk.metadata["row_start"], chunk.metadata["row_end"]) for chunk in doc.chunks] == [(1, 1), (3, 4)]
+    assert doc.metadata == {"sheets": ["labs"], "rows": 3, "batch_rows": 2}
+    assert doc.content == "labs: |item|value|unit|"
+
+
+def test_xlsx_sheets_are_chunked_separately(tmp_path):
+    workbook = Workbook()
+    first = workbook.active
+    first.title = "blood"
+    first.append(["item", "value"])
+    for row in (["WBC", 6.1], [None, None], ["RBC", 4.8], ["HGB", 140]):
+        first.append(row)
+    second = workbook.create_sheet("urine")
+    second.append(["item", "value"])
+    second.append(["PH", 6])
+    file_name = tmp_path / "labs.xlsx"
+    workbook.save(file_name)
+
+    doc = TabularReader(batch_rows=2).load(str(file_name))[0]
+
+    assert [(chunk.metadata["sheet"], chunk.metadata["row_start"], chunk.metadata["row_end"])
+            for chunk in doc.chunks] == [("blood", 1, 3), ("blood", 4, 4), ("urine", 1, 1)]
+    assert doc.chunks[0].content == "|item|value|\n|WBC|6.1|\n|RBC|4.8|"
+    assert [chunk.chunk_id for chunk in doc.chunks] == [0, 1, 2]
+    assert doc.metadata["rows"] == 4
+
+
+def test_unsupported_or_missing_files_are_skipped(tmp_path):
+    reader = TabularReader()
+    assert reader.load(str(tmp_path / "missing.csv")) == []
+    other = tmp_path / "labs.txt"
+    other.write_text("item,value\n", encoding="utf-8")
+    assert reader.load(str(other)) == []
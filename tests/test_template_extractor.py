@@ -0,0 +1,72 @@
+from capsules.core.capsule_type import CapsuleType
+from llm.medical.template_extractor import (KINGMED_PRODUCER, TableTemplate, TemplateExtractor, extract_by_template,
+                                            template_extractors)
+
+BLOOD_TABLE = [
+    ["项目", "结果", "单位", "参考范围"],
+    ["白细胞(WBC)", "12.1↑", "10^9/L", "3.5-9.5"],
+    ["红细胞(RBC)", "4.5", "10^12/L", "4.3～5.8"],
+    ["血红蛋白(HGB)", "140", "g/L", "130-175"],
+    ["血小板(PLT)", "90 L", "10^9/L", "125--350"],
+]
+
+
+def _extractor(**kwargs):
+    return TemplateExtractor(CapsuleType.BLOOD_TEST, TableTemplate("血液检查", ["白细胞", "红细胞", "血红蛋白", "血小板"]),
+                             **kwargs)
+
+
+def test_extract_rows_and_strip_flags():
+    raw_data, confidence = _extractor().extract([BLOOD_TABLE], "2024-01-01 08:00:00", "某医院")
+    items = raw_data["报告单内容"]["血液检查"]
+    assert raw_data["生成时间戳"] == "2024-01-01 08:00:00"
+    assert raw_data["生成单位"] == "某医院"
+    assert items[0] == {"指标名": "白细胞(WBC)", "指标值": 12.1, "范围下限": 3.5, "范围上限": 9.5}
+    assert items[3]["指标值"] == 90.0
+    assert confidence == 1.0
+
+
+def test_one_sided_ranges():
+    table = [["项目", "结果", "参考范围"], ["A", "1", "<5.2"], ["B", "2", "≥1.0"], ["C", "3", "0-4"]]
+    items = _extractor().extract([table])[0]["报告单内容"]["血液检查"]
+    assert [(item["范围下限"], item["范围上限"]) for item in items] == [(None, 5.2), (1.0, None), (0.0, 4.0)]
+
+
+def test_unparsable_rows_lower_confidence():
+    table = BLOOD_TABLE + [["尿胆原", "阴性", "", "阴性"]]
+    raw_data, confidence = _extractor().extract([table])
+    assert len(raw_data["报告单内容"]["血液检查"]) == 4
+    assert 0 < confidence < 1
+
+
+def test_too_few_items_or_unknown_layout():
+    assert _extractor().extract([BLOOD_TABLE[:2]]) == (None, 0.0)
+    assert _extractor().extract([[["姓名", "性别"], ["张三", "男"]]]) == (None, 0.0)
+
+
+def test_summary_lists_abnormal_items():
+    extractor = _extractor()
+    raw_data, _ = extractor.extract([BLOOD_TABLE])
+    assert extractor.summarize(raw_data) == "血液检查共4项指标，2项异常：白细胞(WBC)偏高、血小板(PLT)偏低。"
+
+
+def test_registry_prefers_producer_template():
+    generic = template_extractors.get(CapsuleType.BLOOD_TEST.value)
+    specific = template_extractors.get(CapsuleType.BLOOD_TEST, f" {KINGMED_PRODUCER} ")
+    assert generic.producer is None
+    assert specific.producer == KINGMED_PRODUCER
+    assert template_extractors.get(CapsuleType.BLOOD_TEST, "其他医院") is generic
+    assert template_extractors.get(CapsuleType.CT) is None
+
+
+def test_producer_template_reads_split_reference_columns():
+    table = [
+        ["检验项目", "缩写", "检验结果", "提示", "单位", "参考值下限", "参考值上限"],
+        ["白细胞", "WBC", "5.2", "", "10^9/L", "3.5", "9.5"],
+        ["红细胞", "RBC", "4.5", "", "10^12/L", "4.3", "5.8"],
+        ["血红蛋白", "HGB", "120", "↓", "g/L", "130", "175"],
+    ]
+    raw_data, summary = extract_by_template(CapsuleType.BLOOD_TEST.value, KINGMED_PRODUCER, [table])
+    items = raw_data["报告单内容"]["血液检查"]
+    assert items[0] == {"指标名": "白细胞", "指标值": 5.2, "范围下限": 3.5, "范围上限": 9.5}
+    assert summary.endswith("血红蛋白偏低。")
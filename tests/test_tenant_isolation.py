@@ -0,0 +1,54 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from starlette.exceptions import HTTPException
+
+from security.token_deps import get_verified_tenant
+from vectors.engines import tenants
+from vectors.engines.tenants import pop_idle_tenants, resolve_tenant, tenant_collection
+from vectors.retrievers import weaviate_retriever
+from vectors.retrievers.weaviate_retriever import WeaviateRetriever
+
+
+class FakeTenantCollection:
+    def __init__(self, objects: dict):
+        self.query = SimpleNamespace(fetch_object_by_id=lambda uuid: objects.get(uuid))
+
+
+def _client(data: dict[str, dict]):
+    # data: {tenant: {uuid: object}}，每个租户一个独立分片
+    collection = SimpleNamespace(with_tenant=lambda tenant: FakeTenantCollection(data.get(tenant, {})))
+    return SimpleNamespace(collections=SimpleNamespace(get=lambda name: collection), close=lambda: None)
+
+
+def test_resolve_tenant_uses_default_and_valid_names():
+    assert resolve_tenant(None) == "default"
+    assert resolve_tenant("") == "default"
+    assert resolve_tenant("6f1c2a4e-0b7d-4f5e-9a3c-1d2e3f4a5b6c") == "6f1c2a4e-0b7d-4f5e-9a3c-1d2e3f4a5b6c"
+    assert resolve_tenant("a.b/c") == "a_b_c"
+
+
+def test_tenant_collection_scopes_to_the_tenant_and_records_activity(monkeypatch):
+    monkeypatch.setattr(tenants, "_last_seen", {})
+    client = _client({"tenant_a": {"doc-1": object()}})
+    assert tenant_collection(client, "Documents", "tenant_a").query.fetch_object_by_id("doc-1") is not None
+    assert tenant_collection(client, "Documents", "tenant_b").query.fetch_object_by_id("doc-1") is None
+    assert sorted(pop_idle_tenants(0)) == ["tenant_a", "tenant_b"]
+
+
+def test_retriever_cannot_read_other_tenants_documents(monkeypatch):
+    data = {"tenant_a": {"doc-1": object()}}
+    monkeypatch.setattr(weaviate_retriever, "WeaviateEngine", lambda: SimpleNamespace(get_engine=lambda: _client(data)))
+    assert WeaviateRetriever(tenant="tenant_a").check_by_id("doc-1")
+    # 其他租户和未指定租户(默认租户)都看不到该文档
+    assert not WeaviateRetriever(tenant="tenant_b").check_by_id("doc-1")
+    assert not WeaviateRetriever().check_by_id("doc-1")
+
+
+def test_request_tenant_must_match_the_token_tenant():
+    token_result = {"data": {"tenant_uuid": "tenant_a"}}
+    assert asyncio.run(get_verified_tenant("tenant_a", token_result)) == "tenant_a"
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(get_verified_tenant("tenant_b", token_result))
+    assert e.value.status_code == 403
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from capsules.core.models.capsule import DataCapsuleModel
+from capsules.core.repository.data_capsule import data_capsule_repo
+from capsules.core.schema import DataCapsule
+from common.db_deps import unit_of_work
+
+
+def _capsule(uuid: str) -> DataCapsuleModel:
+    return DataCapsuleModel(uuid=uuid, summary_ciphertext="summary", gene_ciphertext="gene",
+                            raw_ciphertext="raw", signature="signature")
+
+
+def _count(db_engine) -> int:
+    with Session(db_engine) as session:
+        return session.execute(select(func.count()).select_from(DataCapsule)).scalar_one()
+
+
+def test_commits_once_when_the_block_succeeds(db, db_engine):
+    with unit_of_work(db):
+        asyncio.run(data_capsule_repo.create_data_capsule(db, _capsule("capsule-1")))
+        asyncio.run(data_capsule_repo.create_data_capsule(db, _capsule("capsule-2")))
+        # 仓库方法只flush，事务在代码块结束时才提交
+        assert db.in_transaction()
+    assert not db.in_transaction()
+    assert _count(db_engine) == 2
+
+
+def test_rolls_back_and_reraises_on_error(db, db_engine):
+    with pytest.raises(RuntimeError):
+        with unit_of_work(db):
+            asyncio.run(data_capsule_repo.create_data_capsule(db, _capsule("capsule-1")))
+            raise RuntimeError("store failed")
+    assert not db.in_transaction()
+    assert _count(db_engine) == 0
+    # 回滚后会话仍可继续使用
+    with unit_of_work(db):
+        asyncio.run(data_capsule_repo.create_data_capsule(db, _capsule("capsule-1")))
+    assert _count(db_engine) == 1
@@ -0,0 +1,31 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import UploadFile
+
+from capsules.utils.upload_spool import spool_upload
+
+
+def test_spool_upload_writes_file_and_hash(tmp_path):
+    content = b"report" * 100000
+    upload = UploadFile(io.BytesIO(content), filename="report.pdf")
+    spooled = asyncio.run(spool_upload(upload, str(tmp_path / "report.pdf"), chunk_size=4096))
+    assert spooled.size == len(content)
+    assert spooled.sha256 == hashlib.sha256(content).hexdigest()
+    assert (tmp_path / "report.pdf").read_bytes() == content
+
+
+def test_spool_upload_removes_partial_file_on_error(tmp_path):
+    class BrokenFile(io.BytesIO):
+        def read(self, size=-1):
+            if self.tell() > 0:
+                raise OSError("connection lost")
+            return super().read(size)
+
+    upload = UploadFile(BrokenFile(b"x" * 10000), filename="report.pdf")
+    path = tmp_path / "report.pdf"
+    with pytest.raises(OSError):
+        asyncio.run(spool_upload(upload, str(path), chunk_size=1024))
+    assert not path.exists()
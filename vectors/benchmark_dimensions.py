@@ -0,0 +1,91 @@
+"""
+Benchmark the recall and memory trade-off of truncated embedding dimensions.
+
+The full dimension vectors are taken as the ground truth: for every query the top k neighbours found with the
+truncated and re-normalized vectors are compared with the top k neighbours found with the full vectors.
+
+Usage:
+    python -m vectors.benchmark_dimensions --input passages.txt --top-k 10
+    python -m vectors.benchmark_dimensions --synthetic 20000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from vectors.embeddings.base_embedding import truncate_and_normalize
+
+DEFAULT_DIMENSIONS = [256, 512, 1024]
+
+
+def load_vectors(input_file: str, batch_size: int = 100) -> np.ndarray:
+    """
+    Embed every non-empty line of the input file with the configured embedding model at its native dimension.
+    """
+    from vectors.embeddings.ada_embedding import AdaEmbedding
+
+    with open(input_file, "r", encoding="utf-8") as file:
+        texts = [line.strip() for line in file if line.strip()]
+    embedder = AdaEmbedding(dimensions=0)
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        vectors.extend(embedder.embed_texts(texts[i:i + batch_size]))
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def synthetic_vectors(count: int, dimensions: int = 1536, seed: int = 7) -> np.ndarray:
+    """
+    Random vectors whose variance decays along the dimensions, which mimics the front-loaded information of
+    Matryoshka trained embedding models.
+    """
+    rng = np.random.default_rng(seed)
+    scale = 1.0 / np.sqrt(np.arange(1, dimensions + 1, dtype=np.float32))
+    return rng.standard_normal((count, dimensions), dtype=np.float32) * scale
+
+
+def top_k(matrix: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ matrix.T
+    # Exclude the query itself, the queries are sampled from the corpus.
+    np.fill_diagonal(scores[:, :len(queries)], -np.inf)
+    return np.argpartition(-scores, k, axis=1)[:, :k]
+
+
+def run(vectors: np.ndarray, dimensions: list[int], k: int, queries: int) -> list[dict]:
+    full = np.asarray(truncate_and_normalize(vectors.tolist(), 0), dtype=np.float32)
+    queries = min(queries, len(full))
+    truth = top_k(full, full[:queries], k)
+    results = [{"dimensions": full.shape[1], "recall": 1.0, "bytes": full.nbytes, "search_ms": None}]
+    for dims in dimensions:
+        if dims >= full.shape[1]:
+            continue
+        reduced = np.asarray(truncate_and_normalize(vectors.tolist(), dims), dtype=np.float32)
+        start = time.perf_counter()
+        found = top_k(reduced, reduced[:queries], k)
+        elapsed = (time.perf_counter() - start) * 1000 / queries
+        hits = sum(len(set(truth[i]) & set(found[i])) for i in range(queries))
+        results.append({"dimensions": dims, "recall": hits / (queries * k), "bytes": reduced.nbytes,
+                        "search_ms": elapsed})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recall and memory trade-off of truncated embedding dimensions.")
+    parser.add_argument("--input", help="A text file with one passage per line, embedded with the configured model.")
+    parser.add_argument("--synthetic", type=int, default=10000, help="Number of synthetic vectors without --input.")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=DEFAULT_DIMENSIONS)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.input) if args.input else synthetic_vectors(args.synthetic)
+    print(f"Benchmarking {len(vectors)} vectors of {vectors.shape[1]} dimensions, recall@{args.top_k}...")
+    print(f"{'dims':>6} {'recall':>8} {'vectors MB':>11} {'per 1M chunks GB':>17} {'ms/query':>9}")
+    for result in run(vectors, args.dimensions, args.top_k, args.queries):
+        per_million = result["bytes"] / len(vectors) * 1_000_000 / 1024 ** 3
+        search_ms = f"{result['search_ms']:.3f}" if result["search_ms"] is not None else "-"
+        print(f"{result['dimensions']:>6} {result['recall']:>8.3f} {result['bytes'] / 1024 ** 2:>11.1f} "
+              f"{per_million:>17.2f} {search_ms:>9}")
+
+
+if __name__ == "__main__":
+    main()
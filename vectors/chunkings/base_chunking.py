@@ -9,4 +9,23 @@ class BaseChunking:
         self.description = "A base class for chunking data."
 
     def chunk_data(self, doc: Document) -> Document:
-        raise NotImplementedError("Must provide a implementation in derived classes.")
\ No newline at end of file
+        raise NotImplementedError("Must provide a implementation in derived classes.")
+
+    def chunk_document(self, doc: Document) -> Document:
+        """
+        Chunk the document page by page when the reader kept its pages, so the chunk boundaries are anchored at the
+        page starts and an edit only changes the chunks of the edited pages. Each chunk records its page number.
+        """
+        if len(doc.chunks) > 0 or not doc.pages:
+            return self.chunk_data(doc)
+
+        for page_no, page in enumerate(doc.pages, start=1):
+            if not page or not page.strip():
+                continue
+            page_doc = self.chunk_data(Document(name=doc.name, ext=doc.ext, content=page, chunks=[],
+                                                timestamp=doc.timestamp))
+            for chunk in page_doc.chunks:
+                chunk.chunk_id = len(doc.chunks)
+                chunk.metadata = {"page": page_no}
+                doc.chunks.append(chunk)
+        return doc
@@ -1,13 +1,16 @@
 import logging
+from datetime import datetime, timedelta
 from pathlib import Path
 
+from common import constants
 from settings import settings
 from vectors.chunkings.sentence_chunking import SentenceChunking
 from vectors.chunkings.tiktoken_chunking import TiktokenChunking
 from vectors.chunkings.word_chunking import WordChunking
-from vectors.embeddings.ada_embedding import AdaEmbedding
+from vectors.embeddings import get_embedding
 from vectors.readers.common_reader import CommonReader
 from vectors.readers.pdf_reader import PDFReader
+from vectors.readers.tabular_reader import TabularReader
 from vectors.retrievers.weaviate_retriever import WeaviateRetriever
 
 logger: logging.Logger = logging.getLogger(__name__)
@@ -20,16 +23,22 @@ class DataLoader:
     def __init__(self):
         self.name = "DataLoader"
         self.description = "A data loader for loading data from a file or directory."
-        self.extensions = [".txt", ".md", ".docx", ".pptx", ".pdf"]
+        self.extensions = [".txt", ".md", ".docx", ".pptx", ".pdf", ".csv", ".xlsx"]
         self.reader = None
         self.chunker = None
         self.embedder = None
 
-    def load(self, file_name: str, file_dir: str = None, **kwargs):
+    def load(self, file_name: str, file_dir: str = None, tenant: str = None, ttl_days: int = None, **kwargs):
+        """
+        Load, chunk and embed the documents into the vector collections of the given tenant, documents loaded with
+        ttl_days are purged by the TTL sweeper once expired.
+        """
         if file_name is not None:
             ext = Path(file_name).suffix.lower()
             if ext == '.pdf':
                 self.reader = PDFReader()
+            elif ext in ('.csv', '.xlsx'):
+                self.reader = TabularReader()
             else:
                 self.reader = CommonReader()
 
@@ -43,10 +52,18 @@ class DataLoader:
             logger.info("No documents found")
 
         for doc in documents:
-            retriever = WeaviateRetriever()
-            if retriever.check_by_name(doc.name):
-                logger.info(f"Document {doc.name} already exists in the database")
-                continue
+            # A re-uploaded document is only re-ingested when one of its pages changed.
+            existing = WeaviateRetriever(tenant=tenant).find_by_name(doc.name)
+            page_hashes = doc.hash_pages()
+            if existing is not None:
+                if page_hashes == existing["page_hashes"]:
+                    logger.info(f"Document {doc.name} already exists in the database and is unchanged")
+                    continue
+                changed = len(set(page_hashes) - set(existing["page_hashes"]))
+                logger.info(f"Document {doc.name} already exists, {changed} of {len(page_hashes)} pages changed")
+
+            if ttl_days:
+                doc.expires_at = (datetime.now() + timedelta(days=ttl_days)).strftime(constants.VECTOR_TIMESTAMP_FORMAT)
 
             # Step into chunk documentation.
             chunk_type = settings.chunk_type
@@ -59,10 +76,13 @@ class DataLoader:
             else:
                 raise ValueError(f"Invalid chunk way: {chunk_type}")
 
-            chunk_doc = self.chunker.chunk_data(doc)
+            chunk_doc = self.chunker.chunk_document(doc)
             logger.info(f"Chunked {len(chunk_doc.chunks)} chunks")
 
             # Step into embedding.
-            self.embedder = AdaEmbedding()
-            self.embedder.embed(chunk_doc)
+            self.embedder = get_embedding(tenant=tenant)
+            if existing is not None:
+                self.embedder.update(chunk_doc, existing)
+            else:
+                self.embedder.embed(chunk_doc)
             logger.info(f"Finish document {doc.name} vectorization.")
@@ -0,0 +1,13 @@
+from settings import settings
+from .base_embedding import BaseEmbedding
+
+
+def get_embedding(dimensions: int = None, tenant: str = None) -> BaseEmbedding:
+    """
+    Get the embedding backend configured by settings.embedding_backend, openai | local.
+    """
+    if settings.embedding_backend == "local":
+        from .hashing_embedding import HashingEmbedding
+        return HashingEmbedding(dimensions=dimensions, tenant=tenant)
+    from .ada_embedding import AdaEmbedding
+    return AdaEmbedding(dimensions=dimensions, tenant=tenant)
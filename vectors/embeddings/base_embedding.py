@@ -1,25 +1,246 @@
+import json
 import logging
+import os
+import time
 
+import numpy as np
+import weaviate.classes as wvc
+from weaviate.exceptions import WeaviateBatchValidationError, UnexpectedStatusCodeError
+from weaviate.util import generate_uuid5
+
+from vectors.engines.tenants import tenant_collection, resolve_tenant
+from vectors.engines.weaviate_engine import WeaviateEngine
 from vectors.models.document import Document
+from vectors.stores import get_content_store, BaseContentStore
 
 
 logger = logging.getLogger(__name__)
 
+
+def truncate_and_normalize(vectors: list[list[float]], dimensions: int) -> list[list[float]]:
+    """
+    Matryoshka-style client side truncation: keep the leading `dimensions` components of every vector and
+    re-normalize them to unit L2 length, so cosine distance stays meaningful on the shortened vectors.
+
+    Parameters:
+        vectors(list[list[float]]): the vectors returned by the embedding provider.
+        dimensions(int): the target dimension, 0 or a value not smaller than the vector length keeps it unchanged.
+    Returns:
+        list[list[float]]: the truncated and normalized vectors.
+    """
+    if not vectors:
+        return []
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if 0 < dimensions < matrix.shape[1]:
+        matrix = matrix[:, :dimensions]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).tolist()
+
+
 class BaseEmbedding():
     def __init__(self):
         self.name = "BaseEmbedding"
         self.batch_size = 100
         self.vectorizer = ""
+        self.dimensions = 0
+        self.tenant = None
 
     def embed(self, doc: Document):
         """
         As OpenAI's API rate limit, there should have a back-off strategy to slow down requests when approaching the limit
         """
+        self._exec_embed(doc)
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embed a list of texts and return one vector per text with the configured dimensions.
+        """
         raise NotImplementedError("Must provide a implementation in derived classes.")
 
+    def embed_query(self, query: str) -> list[float]:
+        """
+        Embed a single search query with the same dimensions as the stored chunks.
+        """
+        return self.embed_texts([query])[0]
+
+    def _document_properties(self, doc: Document, content_uri: str, content_hash: str) -> dict:
+        properties = {
+            "content_uri": content_uri,
+            "content_hash": content_hash,
+            "name": doc.name,
+            "ext": doc.ext,
+            "linker": "",
+            "metadata": json.dumps(doc.metadata),
+            "timestamp": doc.timestamp,
+            "chunk_count": len(doc.chunks),
+            "page_hashes": json.dumps(doc.hash_pages()),
+            # "embedding": self.openai_client.embeddings.create(
+            #     input=doc.content,
+            #     model=self.vectorizer
+            # ).data[0].embedding
+        }
+        # Documents without expiry keep expires_at null, so the TTL sweeper never matches them.
+        if doc.expires_at:
+            properties["expires_at"] = doc.expires_at
+        return properties
+
+    @staticmethod
+    def _chunk_properties(chunk) -> dict:
+        return {
+            "content": chunk.content,
+            "content_hash": BaseContentStore.hash_content(chunk.content),
+            "chunk_id": chunk.chunk_id,
+            "doc_uuid": chunk.doc_uuid,
+            "doc_name": chunk.doc_name,
+            "metadata": json.dumps(chunk.metadata),
+            "timestamp": chunk.timestamp,
+            "tokens": chunk.tokens,
+        }
+
+    @staticmethod
+    def _rate_limit():
+        rate_limit = os.getenv("EMBEDDING_RATE_LIMIT", 0)
+        if int(rate_limit) > 0:
+            logger.info(f"Sleep for {rate_limit} milliseconds.")
+            time.sleep(int(rate_limit) / 1000)
+
+    def _add_embedded_chunks(self, batch, chunks: list):
+        """
+        Embed the chunks in groups of batch_size texts, one provider call per group, and add them to the batch.
+        """
+        for i in range(0, len(chunks), self.batch_size):
+            group = chunks[i:i + self.batch_size]
+            for chunk, vector in zip(group, self.embed_texts([chunk.content for chunk in group])):
+                if vector is None:
+                    logger.error(f"Generate embedding for {chunk.content} failed.")
+                    continue
+                batch.add_object(properties=self._chunk_properties(chunk), uuid=generate_uuid5(chunk), vector=vector)
+            self._rate_limit()
+
     def _exec_embed(self, doc: Document):
         """
         Execute embedding for a single document
         """
         if self.vectorizer == "":
-            logger.warn(f"No vectorizer is provided for {self.name}.")
+            logger.info(f"No vectorizer is provided for {self.name}.")
+
+        client = WeaviateEngine().get_engine()
+        try:
+            start = time.time()
+            logger.info(f"Embedding {doc.name} using {self.vectorizer}, and started at {start}")
+            # The full document body goes to the content store, only its pointer and hash are kept in Weaviate.
+            content_uri, content_hash = get_content_store().put(doc.content, namespace=resolve_tenant(self.tenant))
+            documents = tenant_collection(client, "Documents", self.tenant)
+            uuid = documents.data.insert(properties=self._document_properties(doc, content_uri, content_hash))
+
+            logger.info(f"Embedding {doc.name} completed, uuid {uuid} and executed time period {time.time() - start: .6f} seconds.")
+            for chunk in doc.chunks:
+                chunk.doc_uuid = uuid
+
+            start = time.time()
+            chunks = tenant_collection(client, "Chunks", self.tenant)
+            logger.info(f"Embedding chunks for {doc.name} using {self.vectorizer}, and started at {start}")
+            with chunks.batch.dynamic() as batch:
+                self._add_embedded_chunks(batch, doc.chunks)
+            logger.info(f"Embedding {doc.name} all chunks complete, and finished with {time.time() - start: .6f} seconds.")
+            # Log all failed batch objects.
+            logger.info(f"Failed batch objects: {json.dumps(client.batch.failed_objects, indent=2)}")
+        except UnexpectedStatusCodeError as e:
+            logger.error(f"Unexpected status code: {e}")
+        except WeaviateBatchValidationError as e:
+            logger.error(f"Batch error: {e}")
+        finally:
+            client.close()
+
+    def update(self, doc: Document, existing: dict):
+        """
+        Re-ingest a modified document in place, the cost is proportional to the edit instead of the document size.
+
+        The new chunks are matched to the stored chunks of the document by content hash: only the new or edited
+        chunks are embedded (in batches of batch_size texts), unchanged chunks keep their stored vector and are only
+        rewritten when their chunk_id or metadata moved, and the stored chunks left unmatched are deleted.
+
+        Parameters:
+            doc(Document): the chunked document.
+            existing(dict): the stored document, as returned by WeaviateRetriever.find_by_name.
+        """
+        from vectors.retrievers.weaviate_retriever import WeaviateRetriever
+
+        client = WeaviateEngine().get_engine()
+        try:
+            start = time.time()
+            doc_uuid = existing["uuid"]
+            chunks = tenant_collection(client, "Chunks", self.tenant)
+            stored = {}
+            for obj in self._fetch_chunks(chunks, doc_uuid):
+                stored.setdefault(obj.properties.get("content_hash"), []).append(obj)
+
+            embed, move = [], {}
+            for chunk in doc.chunks:
+                chunk.doc_uuid = doc_uuid
+                candidates = stored.get(BaseContentStore.hash_content(chunk.content))
+                if not candidates:
+                    embed.append(chunk)
+                    continue
+                # Among identical chunks prefer the one already at this position.
+                obj = next((obj for obj in candidates if int(obj.properties["chunk_id"]) == chunk.chunk_id),
+                           candidates[0])
+                candidates.remove(obj)
+                if int(obj.properties["chunk_id"]) != chunk.chunk_id or \
+                        obj.properties.get("metadata") != json.dumps(chunk.metadata):
+                    move[str(obj.uuid)] = chunk
+            removed = [str(obj.uuid) for candidates in stored.values() for obj in candidates]
+            logger.info(f"Re-ingesting {doc.name}: {len(embed)} chunks to embed, {len(move)} to move, "
+                        f"{len(removed)} to delete, {len(doc.chunks) - len(embed) - len(move)} unchanged.")
+
+            with chunks.batch.dynamic() as batch:
+                self._add_embedded_chunks(batch, embed)
+                # Moved chunks are rewritten with their stored vector, no embedding call.
+                for uuid, vector in self._fetch_vectors(chunks, list(move.keys())).items():
+                    batch.add_object(properties=self._chunk_properties(move[uuid]), uuid=uuid, vector=vector)
+            if removed:
+                chunks.data.delete_many(where=wvc.query.Filter.by_id().contains_any(removed))
+
+            content_uri, content_hash = get_content_store().put(doc.content, namespace=resolve_tenant(self.tenant))
+            documents = tenant_collection(client, "Documents", self.tenant)
+            documents.data.update(uuid=doc_uuid, properties=self._document_properties(doc, content_uri, content_hash))
+            if existing.get("content_hash") != content_hash:
+                WeaviateRetriever.release_contents(documents, {existing.get("content_hash"): existing.get("content_uri")})
+            logger.info(f"Re-ingested {doc.name} in {time.time() - start: .6f} seconds.")
+            logger.info(f"Failed batch objects: {json.dumps(client.batch.failed_objects, indent=2)}")
+        except UnexpectedStatusCodeError as e:
+            logger.error(f"Unexpected status code: {e}")
+        except WeaviateBatchValidationError as e:
+            logger.error(f"Batch error: {e}")
+        finally:
+            client.close()
+
+    @staticmethod
+    def _fetch_chunks(chunks, doc_uuid: str, page_size: int = 1000) -> list:
+        objects, offset = [], 0
+        while True:
+            response = chunks.query.fetch_objects(
+                filters=wvc.query.Filter.by_property("doc_uuid").equal(doc_uuid),
+                offset=offset,
+                limit=page_size,
+                return_properties=["content_hash", "chunk_id", "metadata"]
+            )
+            objects.extend(response.objects)
+            if len(response.objects) < page_size:
+                return objects
+            offset += page_size
+
+    @staticmethod
+    def _fetch_vectors(chunks, uuids: list[str], page_size: int = 1000) -> dict:
+        vectors = {}
+        for i in range(0, len(uuids), page_size):
+            response = chunks.query.fetch_objects(
+                filters=wvc.query.Filter.by_id().contains_any(uuids[i:i + page_size]),
+                limit=page_size,
+                include_vector=True,
+                return_properties=[]
+            )
+            for obj in response.objects:
+                vectors[str(obj.uuid)] = obj.vector.get("default") if isinstance(obj.vector, dict) else obj.vector
+        return vectors
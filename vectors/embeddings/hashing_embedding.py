@@ -0,0 +1,77 @@
+import hashlib
+import logging
+import re
+import time
+
+import numpy as np
+
+from settings import settings
+from vectors.embeddings.base_embedding import BaseEmbedding
+from vectors.schema.schema_initializer import SchemaInitializer
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbedding(BaseEmbedding):
+    """
+    A deterministic local embedding for offline benchmarks and CI, no network and no model files.
+
+    Every text is turned into word tokens and character n-grams (which also covers Chinese text without word
+    segmentation), each feature is hashed with BLAKE2b into a signed bucket of the vector, weighted by log(1 + tf),
+    and the vector is L2 normalized. Identical texts always give identical vectors across processes, and texts
+    sharing n-grams are close in cosine distance, so the ingestion and search pipelines behave realistically.
+    An artificial latency per call emulates the round trip of a remote provider for load tests.
+    """
+
+    def __init__(self, dimensions: int = None, tenant: str = None, latency_ms: float = None,
+                 ngram_range: tuple[int, int] = (2, 4)):
+        super().__init__()
+        self.name = "HashingEmbedding"
+        self.tenant = tenant
+        self.batch_size = 100
+        self.vectorizer = "local-hashing"
+        if dimensions is None:
+            dimensions = SchemaInitializer.get_vector_dimensions("Chunks")
+        self.dimensions = dimensions if dimensions > 0 else settings.local_embedding_dimensions
+        self.latency_ms = settings.local_embedding_latency_ms if latency_ms is None else latency_ms
+        self.ngram_range = ngram_range
+        self.description = "Deterministic local embeddings by hashing n-gram projection."
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embed the texts locally, sleeping latency_ms once per call as a remote provider would.
+        """
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            indexes, signs = self._hash_features(self._features(text))
+            if len(indexes) == 0:
+                continue
+            np.add.at(matrix[row], indexes, signs)
+        # Sub-linear term frequency, then unit length for cosine distance.
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).tolist()
+
+    def _features(self, text: str) -> list[str]:
+        text = text.lower()
+        features = [f"w:{word}" for word in _WORD.findall(text)]
+        compact = re.sub(r"\s+", " ", text).strip()
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            features.extend(f"c{n}:{compact[i:i + n]}" for i in range(len(compact) - n + 1))
+        return features
+
+    def _hash_features(self, features: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        if not features:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        digests = np.array([int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                            for feature in features], dtype=np.uint64)
+        indexes = (digests % np.uint64(self.dimensions)).astype(np.int64)
+        # The top bit of the digest picks the sign, so collisions cancel out instead of piling up.
+        signs = np.where(digests >> np.uint64(63), -1.0, 1.0).astype(np.float32)
+        return indexes, signs
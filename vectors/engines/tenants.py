@@ -0,0 +1,79 @@
+"""
+Tenant routing for the multi-tenant vector collections.
+
+Every tenant owns its own shard (and HNSW graph) of the Documents and Chunks collections, so a search only walks the
+caller's data. Tenants are created and re-activated automatically on first use, and the ones idle for longer than
+settings.vector_tenant_idle_minutes are deactivated (offloaded if the cluster has an offload module) by the sweeper.
+"""
+import asyncio
+import logging
+import re
+import threading
+import time
+
+from settings import settings
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+TENANT_COLLECTIONS = ["Documents", "Chunks"]
+
+_last_seen: dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def resolve_tenant(tenant: str | None) -> str:
+    """
+    Map the caller's tenant uuid to a valid Weaviate tenant name, callers without a tenant share the default one.
+    """
+    if not tenant:
+        tenant = settings.vector_default_tenant
+    return re.sub(r"[^A-Za-z0-9_-]", "_", tenant)[:64]
+
+
+def tenant_collection(client, name: str, tenant: str | None):
+    """
+    Get the collection scoped to the tenant, and record the tenant activity for the idle sweeper.
+    """
+    tenant = resolve_tenant(tenant)
+    with _lock:
+        _last_seen[tenant] = time.monotonic()
+    return client.collections.get(name).with_tenant(tenant)
+
+
+def pop_idle_tenants(idle_seconds: float) -> list[str]:
+    """
+    Return and forget the tenants which have not been used for idle_seconds in this process.
+    """
+    now = time.monotonic()
+    with _lock:
+        idle = [tenant for tenant, seen in _last_seen.items() if now - seen >= idle_seconds]
+        for tenant in idle:
+            del _last_seen[tenant]
+    return idle
+
+
+def deactivate_idle_tenants() -> list[str]:
+    """
+    Deactivate the idle tenants of all tenant collections, they are re-activated automatically on the next access.
+    """
+    from vectors.schema.schema_initializer import SchemaInitializer
+
+    idle = pop_idle_tenants(settings.vector_tenant_idle_minutes * 60)
+    if idle:
+        SchemaInitializer.deactivate_tenants(idle)
+    return idle
+
+
+async def run_tenant_sweeper():
+    """
+    Periodically deactivate idle tenants, started in the application lifespan.
+    """
+    interval = max(settings.vector_tenant_idle_minutes * 60 // 2, 60)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            idle = await asyncio.to_thread(deactivate_idle_tenants)
+            if idle:
+                logger.info(f"Deactivated {len(idle)} idle vector tenants: {idle}")
+        except Exception as e:
+            logger.error(f"Failed to deactivate idle vector tenants: {e}")
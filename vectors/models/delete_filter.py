@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class DeleteFilter(BaseModel):
+    """
+    Select the documents of a bulk delete, either by uuids or by filter. All given conditions are combined with AND,
+    the tenant is always the caller's one.
+    """
+    uuids: Optional[List[str]] = Field(default=None, description="Document uuids")
+    name_prefix: Optional[str] = Field(default=None, description="Document name prefix")
+    start_time: Optional[datetime] = Field(default=None, description="Documents ingested at or after this time")
+    end_time: Optional[datetime] = Field(default=None, description="Documents ingested at or before this time")
+
+    def is_empty(self) -> bool:
+        return not self.uuids and not self.name_prefix and self.start_time is None and self.end_time is None
@@ -1,3 +1,4 @@
+import hashlib
 from datetime import datetime
 
 from pydantic import BaseModel
@@ -12,3 +13,22 @@ class Document(BaseModel):
     chunks: list[Chunk] = []
     metadata: dict = None
     timestamp: str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    expires_at: str = None
+    # The page texts, when the reader keeps the page layout (PDF), chunks are then anchored at the page starts.
+    pages: list[str] = None
+    page_hashes: list[str] = None
+
+    def hash_pages(self) -> list[str]:
+        """
+        The SHA-256 of every page, or of every chunk built by the reader itself (tabular row groups), or of the whole
+        content otherwise. Computed once before chunking, used to detect whether a re-uploaded document changed.
+        """
+        if self.page_hashes is None:
+            if self.pages:
+                units = self.pages
+            elif self.chunks:
+                units = [chunk.content for chunk in self.chunks]
+            else:
+                units = [self.content]
+            self.page_hashes = [hashlib.sha256(unit.encode("utf-8")).hexdigest() for unit in units]
+        return self.page_hashes
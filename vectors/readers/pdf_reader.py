@@ -251,8 +251,9 @@ class PDFReader(BaseReader):
             path = Path(file_path)
             reader = PdfReader(path)
 
-            for page in reader.pages:
-                full_text += page.extract_text() + "\n\n"
+            pages = [page.extract_text() for page in reader.pages]
+            for page_text in pages:
+                full_text += page_text + "\n\n"
 
             document = Document(
                 name=path.name,
@@ -260,6 +261,7 @@ class PDFReader(BaseReader):
                 content=full_text,
                 metadata=reader.metadata,
                 timestamp=str(datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+                pages=pages,
             )
             documents.append(document)
         except PyPdfError as e:
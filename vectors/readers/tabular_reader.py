@@ -0,0 +1,147 @@
+import logging
+import os.path
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from settings import settings
+from .base_reader import BaseReader
+from ..models.chunk import Chunk
+from ..models.document import Document
+
+logger = logging.getLogger(__name__)
+
+
+class TabularReader(BaseReader):
+    """
+    A reader for tabular exports (.csv | .xlsx), such as lab result sheets.
+
+    Rows are read in batches (pandas chunksize for CSV, openpyxl read-only mode for XLSX), so the raw sheet is never
+    loaded as a whole; the rendered chunks are still collected on the returned document. Each row group is rendered
+    as a compact text chunk prefixed with the column headers, and the sheet row range (blank rows included in the
+    numbering) is attached to the chunk metadata. The returned document carries its chunks already, so the chunking
+    step of the pipeline is skipped and the chunks go straight to embedding.
+    """
+
+    def __init__(self, batch_rows: int = None):
+        super().__init__()
+        self.name = "TabularReader"
+        self.description = "A reader for .csv and .xlsx tabular files with row-batch chunking."
+        self.extensions = [".csv", ".xlsx"]
+        self.batch_rows = batch_rows or settings.tabular_batch_rows
+
+    def load(self, file_name: str, file_dir: str = None, **kwargs) -> list[Document]:
+        """
+        Load the tabular file as one document whose chunks are the rendered row groups.
+
+        @param file_name: The name of the file
+        @param file_dir: The path of the file, unused for tabular files
+        """
+        if file_name is None:
+            logger.error("File name is required")
+            return []
+        if not os.path.exists(file_name):
+            logger.error(f"File {file_name} does not exist")
+            return []
+
+        ext = Path(file_name).suffix.lower()
+        if ext not in self.extensions:
+            logger.error(f"File extension {ext} is not supported")
+            return []
+
+        doc = Document(name=file_name, ext=ext, chunks=[],
+                       timestamp=str(datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        headers = {}
+        total_rows = 0
+        for sheet, header, rows, row_start, row_end in self._iter_row_groups(file_name, ext):
+            headers.setdefault(sheet, header)
+            doc.chunks.append(Chunk(
+                doc_name=doc.name,
+                content=self._render(header, rows),
+                chunk_id=len(doc.chunks),
+                metadata={"sheet": sheet, "row_start": row_start, "row_end": row_end, "columns": header},
+                timestamp=doc.timestamp
+            ))
+            total_rows += len(rows)
+
+        if not doc.chunks:
+            logger.info(f"No rows found in {file_name}")
+            return []
+
+        # Keep only the table layout as the document body, the rows themselves live in the chunks.
+        doc.content = "\n".join(f"{sheet}: {self._render_row(header)}" for sheet, header in headers.items())
+        doc.metadata = {"sheets": list(headers.keys()), "rows": total_rows, "batch_rows": self.batch_rows}
+        logger.info(f"Loaded {total_rows} rows as {len(doc.chunks)} chunks from {file_name}")
+        return [doc]
+
+    def _iter_row_groups(self, file_name: str, ext: str) -> Iterator[tuple[str, list[str], list[list[str]], int, int]]:
+        """
+        Yield (sheet, header, rows, first_row_number, last_row_number) for every batch of rows. Row numbers are
+        1-based data rows and count the skipped blank rows, so they point at the rows of the source sheet.
+        """
+        if ext == ".csv":
+            yield from self._iter_csv(file_name)
+        else:
+            yield from self._iter_xlsx(file_name)
+
+    def _iter_csv(self, file_name: str):
+        import pandas as pd
+
+        sheet = Path(file_name).stem
+        row_number = 0
+        # Blank lines are kept by pandas so that they are counted in the row numbers, then skipped here.
+        with pd.read_csv(file_name, chunksize=self.batch_rows, dtype=str, keep_default_na=False,
+                         skip_blank_lines=False, encoding="utf-8", encoding_errors="replace") as reader:
+            for frame in reader:
+                header = [str(col) for col in frame.columns]
+                rows, row_start, row_end = [], None, 0
+                for row in frame.values.tolist():
+                    row_number += 1
+                    # Blank lines come back as NaN even with keep_default_na=False.
+                    row = ["" if cell is None or cell != cell else cell for cell in row]
+                    if all(cell == "" for cell in row):
+                        continue
+                    if row_start is None:
+                        row_start = row_number
+                    row_end = row_number
+                    rows.append(row)
+                if rows:
+                    yield sheet, header, rows, row_start, row_end
+
+    def _iter_xlsx(self, file_name: str):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_name, read_only=True, data_only=True)
+        try:
+            for worksheet in workbook.worksheets:
+                row_iter = worksheet.iter_rows(values_only=True)
+                header = next(row_iter, None)
+                if header is None:
+                    continue
+                header = ["" if cell is None else str(cell) for cell in header]
+                rows, row_start, row_end = [], None, 0
+                for row_number, row in enumerate(row_iter, start=1):
+                    if row is None or all(cell is None for cell in row):
+                        continue
+                    if row_start is None:
+                        row_start = row_number
+                    row_end = row_number
+                    rows.append(["" if cell is None else str(cell) for cell in row])
+                    if len(rows) >= self.batch_rows:
+                        yield worksheet.title, header, rows, row_start, row_end
+                        rows, row_start = [], None
+                if rows:
+                    yield worksheet.title, header, rows, row_start, row_end
+        finally:
+            workbook.close()
+
+    def _render(self, header: list[str], rows: list[list[str]]) -> str:
+        """
+        Render a row group as a compact pipe separated table with its column headers.
+        """
+        return "\n".join([self._render_row(header)] + [self._render_row(row) for row in rows])
+
+    @staticmethod
+    def _render_row(row: list) -> str:
+        cells = ["" if cell is None else str(cell).replace("\n", " ").strip() for cell in row]
+        return "|" + "|".join(cells) + "|"
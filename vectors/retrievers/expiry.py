@@ -0,0 +1,60 @@
+"""
+TTL expiry of the vector store documents.
+
+Documents loaded with a ttl carry an expires_at property, the sweeper periodically purges the expired documents of
+every active tenant, with their chunks and contents, in batched deletes. Inactive or offloaded tenants are left
+untouched to avoid re-activating them, they are purged once they are active again.
+"""
+import asyncio
+import logging
+from datetime import datetime
+
+from weaviate.classes.tenants import TenantActivityStatus
+
+from settings import settings
+from vectors.engines.weaviate_engine import WeaviateEngine
+from vectors.retrievers.weaviate_retriever import WeaviateRetriever
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def purge_expired_documents() -> dict[str, dict]:
+    """
+    Delete the expired documents of all active tenants.
+
+    Returns:
+        dict: The number of deleted documents, chunks and contents per tenant, only for tenants with deletions.
+    """
+    filters = WeaviateRetriever.build_document_filter(expired_before=datetime.now())
+    purged = {}
+    client = WeaviateEngine().get_engine()
+    try:
+        documents = client.collections.get("Documents")
+        chunks = client.collections.get("Chunks")
+        for tenant, info in documents.tenants.get().items():
+            if info.activity_status != TenantActivityStatus.ACTIVE:
+                continue
+            # Not going through tenant_collection, the sweep must not count as tenant activity.
+            deleted = WeaviateRetriever.delete_documents(documents.with_tenant(tenant), chunks.with_tenant(tenant),
+                                                         filters)
+            if deleted["documents"] > 0:
+                purged[tenant] = deleted
+        return purged
+    finally:
+        client.close()
+
+
+async def run_expiry_sweeper():
+    """
+    Periodically purge the expired documents, started in the application lifespan.
+    """
+    if settings.vector_ttl_sweep_minutes <= 0:
+        return
+    while True:
+        await asyncio.sleep(settings.vector_ttl_sweep_minutes * 60)
+        try:
+            purged = await asyncio.to_thread(purge_expired_documents)
+            if purged:
+                logger.info(f"Purged expired vector documents: {purged}")
+        except Exception as e:
+            logger.error(f"Failed to purge expired vector documents: {e}")
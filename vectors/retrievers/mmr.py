@@ -0,0 +1,43 @@
+import numpy as np
+
+
+def mmr_select(query_vector: list[float], candidate_vectors: list[list[float]], top_k: int,
+               lambda_mult: float = 0.5) -> list[int]:
+    """
+    Maximal Marginal Relevance selection over the candidates of a vector search.
+
+    The pairwise cosine similarities of the candidates are computed as a single matrix product, then top_k
+    candidates are picked greedily by lambda_mult * relevance - (1 - lambda_mult) * redundancy, where redundancy
+    is the highest similarity to the already selected candidates.
+
+    Parameters:
+        query_vector(list[float]): the query embedding.
+        candidate_vectors(list[list[float]]): the candidate embeddings, ordered by relevance.
+        top_k(int): the number of candidates to select.
+        lambda_mult(float): 1 keeps the pure relevance order, 0 maximizes diversity.
+    Returns:
+        list[int]: the indexes of the selected candidates, in selection order.
+    """
+    if not candidate_vectors or top_k <= 0:
+        return []
+    candidates = np.asarray(candidate_vectors, dtype=np.float32)
+    candidates /= np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_vector, dtype=np.float32)
+    query /= max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+    top_k = min(top_k, len(candidates))
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < top_k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        chosen = int(np.argmax(scores))
+        selected.append(chosen)
+        available[chosen] = False
+        np.maximum(redundancy, similarity[chosen], out=redundancy)
+    return selected
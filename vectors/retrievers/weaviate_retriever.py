@@ -1,16 +1,21 @@
+import asyncio
 import datetime
+import json
 import logging
 import os
 from typing import Dict, List, Any
 
 import weaviate.classes as wvc
-from openai import OpenAI
-from openai.resources import Embeddings
 from weaviate.classes.query import MetadataQuery
 from weaviate.exceptions import UnexpectedStatusCodeError, WeaviateConnectionError
 
+from common import constants
 from common.utils import convert_utc_to_local
+from vectors.embeddings import get_embedding
+from vectors.engines.tenants import tenant_collection
 from vectors.engines.weaviate_engine import WeaviateEngine
+from vectors.retrievers.mmr import mmr_select
+from vectors.stores import get_content_store
 
 from vectors.retrievers.base_retriever import BaseRetrieval
 
@@ -19,13 +24,14 @@ logger = logging.getLogger(__name__)
 
 class WeaviateRetriever(BaseRetrieval):
     """
-    A retriever class for Weaviate.
+    A retriever class for Weaviate, all the reads and deletes are scoped to the caller's tenant.
     """
 
-    def __init__(self):
+    def __init__(self, tenant: str = None):
         super().__init__()
         self.name = "WeaviateRetriever"
         self.description = "A retriever class for Weaviate."
+        self.tenant = tenant
         self.client = WeaviateEngine().get_engine()
 
     def check_by_id(self, uuid: str) -> bool:
@@ -34,7 +40,7 @@ class WeaviateRetriever(BaseRetrieval):
         """
         logger.info(f"Checking if document with UUID {uuid} exists in Weaviate database...")
         try:
-            collection = self.client.collections.get("Documents")
+            collection = tenant_collection(self.client, "Documents", self.tenant)
             if collection is None:
                 return False
             response = collection.query.fetch_object_by_id(uuid)
@@ -49,7 +55,7 @@ class WeaviateRetriever(BaseRetrieval):
     def check_by_name(self, name: str) -> bool:
         logger.info(f"Checking if document with name {name} exists in Weaviate database...")
         try:
-            collection = self.client.collections.get("Documents")
+            collection = tenant_collection(self.client, "Documents", self.tenant)
             if collection is None:
                 return False
 
@@ -65,6 +71,27 @@ class WeaviateRetriever(BaseRetrieval):
         finally:
             self.client.close()
 
+    def find_by_name(self, name: str) -> dict | None:
+        """
+        Find the stored document with the given name, returns its uuid and the hashes used to detect changes.
+        """
+        logger.info(f"Finding document with name {name} in Weaviate database...")
+        try:
+            collection = tenant_collection(self.client, "Documents", self.tenant)
+            response = collection.query.fetch_objects(
+                filters=wvc.query.Filter.by_property("name").equal(name),
+                limit=1,
+                return_properties=["content_uri", "content_hash", "page_hashes"]
+            )
+            if len(response.objects) == 0:
+                return None
+            properties = response.objects[0].properties
+            return {"uuid": str(response.objects[0].uuid), "content_uri": properties.get("content_uri"),
+                    "content_hash": properties.get("content_hash"),
+                    "page_hashes": json.loads(properties.get("page_hashes") or "[]")}
+        finally:
+            self.client.close()
+
     async def list_all_docs(self, offset: int = 0, limit: int = 10) -> dict[str, list[dict[str, int | Any]] | Any]:
         """
         List all documents in the Weaviate database by pagination.
@@ -78,7 +105,7 @@ class WeaviateRetriever(BaseRetrieval):
         """
         logger.info("Listing all documents in Weaviate database...")
         try:
-            collection = self.client.collections.get("Documents")
+            collection = tenant_collection(self.client, "Documents", self.tenant)
             if collection is None:
                 return []
             total_response = collection.aggregate.over_all(total_count=True)
@@ -99,6 +126,56 @@ class WeaviateRetriever(BaseRetrieval):
         finally:
             self.client.close()
 
+    async def get_document(self, uuid: str, includes: list = []) -> dict | None:
+        """
+        Get a document by its UUID. The full content lives in the content store and is only fetched when
+        "content" is in includes.
+
+        Parameters:
+            uuid(str): the uuid of the document.
+            includes(list): optional properties to load, currently only "content".
+
+        Returns:
+            dict: The document, or None if not found.
+        """
+        logger.info(f"Getting document with UUID {uuid} in Weaviate database...")
+        try:
+            collection = tenant_collection(self.client, "Documents", self.tenant)
+            if collection is None:
+                return None
+            response = collection.query.fetch_object_by_id(uuid)
+            if response is None:
+                return None
+            properties = response.properties
+            doc = {"uuid": response.uuid, "name": properties["name"],
+                   "ext": properties["ext"],
+                   "timestamp": convert_utc_to_local(properties["timestamp"]),
+                   "linker": properties["linker"],
+                   "metadata": properties.get("metadata"),
+                   "content_hash": properties.get("content_hash"),
+                   "chunk_count": int(properties["chunk_count"])}
+            if "content" in includes:
+                # The content store client (MinIO) is synchronous, fetch the body off the event loop.
+                doc["content"] = await asyncio.to_thread(self._load_content, properties)
+            return doc
+        finally:
+            self.client.close()
+
+    def _load_content(self, properties: dict) -> str:
+        """
+        Load the full document content lazily from the content store and verify it against the stored hash.
+        Documents ingested before the content store existed still carry the content property.
+        """
+        content_uri = properties.get("content_uri")
+        if not content_uri:
+            return properties.get("content", "")
+        store = get_content_store()
+        content = store.get(content_uri)
+        if properties.get("content_hash") and store.hash_content(content) != properties["content_hash"]:
+            logger.error(f"Content hash mismatch for {content_uri}")
+            raise ValueError(f"Content of {content_uri} does not match its hash.")
+        return content
+
     async def list_all_chunks_by_doc_uuid(self, uuid: str, offset: int = 0, limit: int = 1000) -> list[dict]:
         """
         List all chunks of a document in the Weaviate database.
@@ -113,7 +190,7 @@ class WeaviateRetriever(BaseRetrieval):
         """
         logger.info(f"Listing all chunks of document with doc UUID {uuid} in Weaviate database...")
         try:
-            collection = self.client.collections.get("Chunks")
+            collection = tenant_collection(self.client, "Chunks", self.tenant)
             if collection is None:
                 return []
             response = collection.query.fetch_objects(
@@ -144,7 +221,7 @@ class WeaviateRetriever(BaseRetrieval):
         """
         logger.info(f"Deleting chunk with UUID {uuid} in Weaviate database...")
         try:
-            collection = self.client.collections.get("Chunks")
+            collection = tenant_collection(self.client, "Chunks", self.tenant)
             if collection is None:
                 return False
 
@@ -160,7 +237,7 @@ class WeaviateRetriever(BaseRetrieval):
 
     async def del_document_by_uuid(self, uuid: str) -> bool:
         """
-        Delete a document by its UUID.
+        Delete a document by its UUID, together with its chunks and its stored content.
 
         Parameters:
             uuid(str): The UUID of the document.
@@ -169,18 +246,47 @@ class WeaviateRetriever(BaseRetrieval):
         """
         logger.info(f"Deleting document with UUID {uuid} in Weaviate database...")
         try:
-            collection = self.client.collections.get("Documents")
-            if collection is None:
-                return False
-
-            response = collection.data.delete_by_id(uuid)
-            if response:
+            # Releasing the contents deletes objects through the synchronous content store client.
+            deleted = await asyncio.to_thread(self.delete_documents,
+                                              tenant_collection(self.client, "Documents", self.tenant),
+                                              tenant_collection(self.client, "Chunks", self.tenant),
+                                              self.build_document_filter(uuids=[uuid]))
+            if deleted["documents"] > 0:
                 logger.info(f"Document with UUID {uuid} deleted in Weaviate database.")
-                await self.del_chunks_by_doc_uuid(uuid)
                 return True
             else:
                 logger.error(f"Failed to delete document with UUID {uuid} in Weaviate database.")
                 return False
+        except (WeaviateConnectionError, UnexpectedStatusCodeError) as e:
+            logger.error(f"Failed to delete document with UUID {uuid} in Weaviate database: {e}")
+            return False
+        finally:
+            self.client.close()
+
+    async def bulk_delete(self, uuids: list[str] = None, name_prefix: str = None,
+                          start_time: datetime.datetime = None, end_time: datetime.datetime = None) -> dict:
+        """
+        Delete all the documents of the tenant selected by uuids and/or filters, with their chunks and contents.
+
+        Parameters:
+            uuids(list[str]): the uuids of the documents.
+            name_prefix(str): only the documents whose name starts with the prefix.
+            start_time(datetime): only the documents ingested at or after this time.
+            end_time(datetime): only the documents ingested at or before this time.
+        Returns:
+            dict: The number of deleted documents, chunks and contents.
+        """
+        filters = self.build_document_filter(uuids=uuids, name_prefix=name_prefix, start_time=start_time,
+                                             end_time=end_time)
+        if filters is None:
+            raise ValueError("At least one of uuids, name_prefix, start_time or end_time is required.")
+        logger.info(f"Bulk deleting documents of tenant {self.tenant} in Weaviate database...")
+        try:
+            deleted = await asyncio.to_thread(self.delete_documents,
+                                              tenant_collection(self.client, "Documents", self.tenant),
+                                              tenant_collection(self.client, "Chunks", self.tenant), filters)
+            logger.info(f"Bulk deleted {deleted} of tenant {self.tenant} in Weaviate database.")
+            return deleted
         finally:
             self.client.close()
 
@@ -195,21 +301,9 @@ class WeaviateRetriever(BaseRetrieval):
         """
         logger.info(f"Deleting all chunks of document with UUID {uuid} in Weaviate database...")
         try:
-            collection = self.client.collections.get("Chunks")
-            if collection is None:
-                return False
-
-            response = collection.data.delete_many(
-                where=wvc.query.Filter.by_property("doc_uuid").equal(uuid),
-                verbose=False,
-                dry_run=False
-            )
-            if response:
-                logger.info(f"All chunks of document with UUID {uuid} deleted in Weaviate database.")
-                return True
-            else:
-                logger.error(f"Failed to delete all chunks of document with UUID {uuid} in Weaviate database.")
-                return False
+            count = self._delete_chunks(tenant_collection(self.client, "Chunks", self.tenant), [uuid])
+            logger.info(f"{count} chunks of document with UUID {uuid} deleted in Weaviate database.")
+            return True
         except WeaviateConnectionError as e:
             logger.error(f"Failed to delete all chunks of document with UUID {uuid} in Weaviate database: {e}")
             return False
@@ -219,45 +313,211 @@ class WeaviateRetriever(BaseRetrieval):
         finally:
             self.client.close()
 
-    async def similarity_search(self, query: str, top_k: int = 5) -> list[dict]:
+    @staticmethod
+    def build_document_filter(uuids: list[str] = None, name_prefix: str = None,
+                              start_time: datetime.datetime = None, end_time: datetime.datetime = None,
+                              expired_before: datetime.datetime = None):
+        """
+        Combine the given document conditions with AND, returns None when no condition is given.
+        The timestamps are fixed width texts, so their lexicographic order is the chronological one.
+        """
+        conditions = []
+        if uuids:
+            conditions.append(wvc.query.Filter.by_id().contains_any(uuids))
+        if name_prefix:
+            conditions.append(wvc.query.Filter.by_property("name").like(f"{name_prefix}*"))
+        if start_time is not None:
+            conditions.append(wvc.query.Filter.by_property("timestamp").greater_or_equal(
+                start_time.strftime(constants.VECTOR_TIMESTAMP_FORMAT)))
+        if end_time is not None:
+            conditions.append(wvc.query.Filter.by_property("timestamp").less_or_equal(
+                end_time.strftime(constants.VECTOR_TIMESTAMP_FORMAT)))
+        if expired_before is not None:
+            conditions.append(wvc.query.Filter.by_property("expires_at").less_than(
+                expired_before.strftime(constants.VECTOR_TIMESTAMP_FORMAT)))
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else wvc.query.Filter.all_of(conditions)
+
+    @staticmethod
+    def delete_documents(documents, chunks, filters, batch_size: int = 500) -> dict:
+        """
+        Delete the matching documents batch by batch: one delete_many for the chunks of the batch, one for the
+        documents, and one aggregate query to release the contents no longer referenced. The collections are
+        passed in and left open, so the caller owns the client.
+
+        Returns:
+            dict: The number of deleted documents, chunks and contents.
+        """
+        deleted = {"documents": 0, "chunks": 0, "contents": 0}
+        while True:
+            response = documents.query.fetch_objects(filters=filters, limit=batch_size,
+                                                     return_properties=["content_uri", "content_hash"])
+            if not response.objects:
+                break
+            uuids = [str(doc.uuid) for doc in response.objects]
+            # Chunks go first, so a failure leaves the documents in place for a retry.
+            deleted["chunks"] += WeaviateRetriever._delete_chunks(chunks, uuids)
+            result = documents.data.delete_many(where=wvc.query.Filter.by_id().contains_any(uuids))
+            deleted["documents"] += result.successful
+            deleted["contents"] += WeaviateRetriever.release_contents(documents, {
+                doc.properties.get("content_hash"): doc.properties.get("content_uri") for doc in response.objects})
+            if result.successful == 0:
+                logger.error(f"Failed to delete documents {uuids[:10]}..., stop the bulk delete.")
+                break
+        return deleted
+
+    @staticmethod
+    def _delete_chunks(chunks, doc_uuids: list[str]) -> int:
+        """
+        Delete the chunks of the given documents, delete_many removes a bounded number of objects per call.
+        """
+        count = 0
+        while True:
+            result = chunks.data.delete_many(where=wvc.query.Filter.by_property("doc_uuid").contains_any(doc_uuids))
+            count += result.successful
+            if result.failed > 0:
+                logger.error(f"Failed to delete {result.failed} chunks of documents {doc_uuids[:10]}...")
+            if result.successful == 0 or result.failed > 0:
+                return count
+
+    @staticmethod
+    def release_contents(documents, contents: dict[str, str]) -> int:
+        """
+        Delete the stored contents, given as {content_hash: content_uri}, which no remaining document references.
+        """
+        uris = {content_hash: content_uri for content_hash, content_uri in contents.items()
+                if content_hash and content_uri}
+        if not uris:
+            return 0
+        response = documents.aggregate.over_all(
+            filters=wvc.query.Filter.by_property("content_hash").contains_any(list(uris.keys())),
+            group_by=wvc.aggregate.GroupByAggregate(prop="content_hash")
+        )
+        referenced = {group.grouped_by.value for group in response.groups}
+        store = get_content_store()
+        released = 0
+        for content_hash, content_uri in uris.items():
+            if content_hash not in referenced:
+                store.delete(content_uri)
+                released += 1
+        return released
+
+    async def similarity_search(self, query: str, top_k: int = 5, context_window: int = 0, mmr: bool = False,
+                                mmr_lambda: float = 0.5, fetch_k: int = None) -> list[dict]:
         """
         A similarity search is a way to find similar documents to a given query.
 
         Parameters:
             query(str): the source text to search for.
             top_k(int): the most similar top k results to return.
+            context_window(int): if greater than 0, expand every hit with its chunk_id ± context_window neighbours
+                of the same document and return stitched passages instead of single chunks.
+            mmr(bool): re-rank an over-fetched candidate set with Maximal Marginal Relevance for diverse results.
+            mmr_lambda(float): the MMR trade-off, 1 keeps the relevance order and 0 maximizes diversity.
+            fetch_k(int): the number of candidates fetched for MMR, defaults to 4 * top_k (at least 20).
         Returns:
             list[dict]: A list of documents.
         """
         logger.info(f"Performing similarity search for query '{query}' in Weaviate database...")
         try:
-            collection = self.client.collections.get("Chunks")
+            collection = tenant_collection(self.client, "Chunks", self.tenant)
             if collection is None:
                 return []
-            openai_client = OpenAI(
-                api_key=os.getenv("OPENAI_API_KEY"),
-                base_url=os.getenv("OPENAI_API_BASE")
-            )
-            embedding = Embeddings(openai_client).create(input=query, model=constants.DEFAULT_OPENAI_EMBEDDING_MODEL)
-            if embedding.data[0].embedding is None:
+            # The query vector must have the same dimensions as the stored chunk vectors.
+            query_vector = get_embedding().embed_query(query)
+            if query_vector is None:
                 logger.info(f"Failed to get embedding for query '{query}'.")
                 return []
 
+            # The vectors are only needed by the MMR stage, skip transferring them otherwise.
             response = collection.query.near_vector(
-                near_vector=embedding.data[0].embedding,
-                include_vector=True,
-                limit=top_k,
+                near_vector=query_vector,
+                include_vector=mmr,
+                limit=(fetch_k or max(top_k * 4, 20)) if mmr else top_k,
                 distance=constants.MAX_ACCEPTED_DISTANCE,
                 return_metadata=MetadataQuery(distance=True)
             )
+            objects = response.objects
+            if mmr and len(objects) > top_k:
+                vectors = [doc.vector.get("default") if isinstance(doc.vector, dict) else doc.vector
+                           for doc in objects]
+                objects = [objects[i] for i in mmr_select(query_vector, vectors, top_k, mmr_lambda)]
 
             chunks = [{"uuid": doc.uuid, "content": doc.properties["content"],
                        "chunk_id": doc.properties["chunk_id"],
                        "doc_uuid": doc.properties["doc_uuid"],
                        "doc_name": doc.properties["doc_name"],
                        "distance": doc.metadata.distance
-                       } for doc in response.objects]
+                       } for doc in objects]
             logger.debug(f"Found similar chunks:--- \n{chunks}\n ---in Weaviate database.")
+            if context_window > 0 and chunks:
+                return self._expand_context(collection, chunks, context_window)
             return chunks
         finally:
             self.client.close()
+
+    def _expand_context(self, collection, hits: list[dict], context_window: int) -> list[dict]:
+        """
+        Fetch the neighbour chunks of all hits in one batched filtered query, merge the overlapping ranges of the
+        same document and stitch each range into one passage. Passages are ordered by their best hit distance.
+        """
+        ranges = self._merge_ranges(hits, context_window)
+        filters = [wvc.query.Filter.by_property("doc_uuid").equal(passage["doc_uuid"]) &
+                   wvc.query.Filter.by_property("chunk_id").greater_or_equal(passage["chunk_start"]) &
+                   wvc.query.Filter.by_property("chunk_id").less_or_equal(passage["chunk_end"])
+                   for passage in ranges]
+        response = collection.query.fetch_objects(
+            filters=wvc.query.Filter.any_of(filters) if len(filters) > 1 else filters[0],
+            limit=sum(passage["chunk_end"] - passage["chunk_start"] + 1 for passage in ranges)
+        )
+        neighbours = {}
+        for doc in response.objects:
+            neighbours[(doc.properties["doc_uuid"], int(doc.properties["chunk_id"]))] = doc.properties["content"]
+
+        for passage in ranges:
+            content = ""
+            for chunk_id in range(passage["chunk_start"], passage["chunk_end"] + 1):
+                text = neighbours.get((passage["doc_uuid"], chunk_id))
+                if text:
+                    content = self._join_overlapping(content, text)
+            passage["content"] = content
+        logger.info(f"Expanded {len(hits)} hits into {len(ranges)} passages with context window {context_window}.")
+        return sorted(ranges, key=lambda passage: passage["distance"])
+
+    @staticmethod
+    def _merge_ranges(hits: list[dict], context_window: int) -> list[dict]:
+        """
+        Turn every hit into the chunk range [chunk_id - context_window, chunk_id + context_window], and merge the
+        overlapping or adjacent ranges of the same document.
+        """
+        by_doc = {}
+        for hit in hits:
+            chunk_id = int(hit["chunk_id"])
+            by_doc.setdefault(hit["doc_uuid"], []).append((max(chunk_id - context_window, 0),
+                                                           chunk_id + context_window, hit))
+        ranges = []
+        for doc_uuid, items in by_doc.items():
+            items.sort(key=lambda item: item[0])
+            current = None
+            for start, end, hit in items:
+                if current is not None and start <= current["chunk_end"] + 1:
+                    current["chunk_end"] = max(current["chunk_end"], end)
+                    current["hits"].append(hit["uuid"])
+                    current["distance"] = min(current["distance"], hit["distance"])
+                    continue
+                current = {"doc_uuid": doc_uuid, "doc_name": hit["doc_name"], "chunk_start": start,
+                           "chunk_end": end, "hits": [hit["uuid"]], "distance": hit["distance"]}
+                ranges.append(current)
+        return ranges
+
+    @staticmethod
+    def _join_overlapping(head: str, tail: str, min_overlap: int = 8, max_overlap: int = 2048) -> str:
+        """
+        Concatenate two consecutive chunks, dropping the overlap the chunkers keep between neighbours. Overlaps
+        shorter than min_overlap are treated as coincidence and kept.
+        """
+        for size in range(min(len(head), len(tail), max_overlap), min_overlap - 1, -1):
+            if head.endswith(tail[:size]):
+                return head + tail[size:]
+        return head + tail
@@ -2,157 +2,388 @@ import logging
 
 import weaviate.classes as wvc
 import weaviate.classes.config as wvcc
+from weaviate.classes.tenants import Tenant, TenantActivityStatus
 from weaviate.exceptions import WeaviateConnectionError, UnexpectedStatusCodeException
 
+from settings import settings
+from vectors.engines.tenants import TENANT_COLLECTIONS, resolve_tenant
 from vectors.engines.weaviate_engine import WeaviateEngine
 
 logger: logging.Logger = logging.getLogger(__name__)
 
+# Native vector length of the OpenAI embedding models.
+_NATIVE_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+# Suffix of the staging collection used while migrating a collection to multi-tenancy.
+_MIGRATION_SUFFIX = "Migration"
+
+
+class VectorDimensionMismatch(RuntimeError):
+    """
+    The embedding dimension configured now differs from the one a collection was created with.
+    """
+
+
+class MultiTenancyMigrationError(RuntimeError):
+    """
+    A collection was created before multi-tenancy was enabled and has not been (completely) migrated.
+    """
+
 
 class SchemaInitializer:
     """
     An initializer class for creating and managing vector schema.
     """
 
+    # Target embedding dimension configured per collection, 0 means the native dimension of the embedding model.
+    vector_dimensions = {
+        "Documents": settings.embedding_dimensions,
+        "Chunks": settings.embedding_dimensions,
+    }
+
+    @staticmethod
+    def get_vector_dimensions(collection_name: str) -> int:
+        """
+        Get the target embedding dimension configured for the given collection.
+        """
+        return SchemaInitializer.vector_dimensions.get(collection_name, 0)
+
+    @staticmethod
+    def expected_dimensions(collection_name: str) -> int | None:
+        """
+        The length of the vectors the configured embedding backend writes to the given collection, None if the
+        native length of the configured model is unknown.
+        """
+        dimensions = SchemaInitializer.get_vector_dimensions(collection_name)
+        if settings.embedding_backend == "local":
+            return dimensions or settings.local_embedding_dimensions
+        native = _NATIVE_DIMENSIONS.get(settings.default_openai_embedding_model)
+        if native is None:
+            return dimensions or None
+        return min(dimensions, native) if dimensions > 0 else native
+
+    @staticmethod
+    def stored_dimensions(client, collection_name: str) -> int | None:
+        """
+        The length of a vector stored in the collection, sampled from the first active tenant holding a vector so
+        that no inactive tenant is loaded. None if no active tenant has a vector.
+        """
+        collection = client.collections.get(collection_name)
+        for tenant in collection.tenants.get().values():
+            if tenant.activity_status not in (TenantActivityStatus.ACTIVE, TenantActivityStatus.HOT):
+                continue
+            result = collection.with_tenant(tenant.name).query.fetch_objects(limit=1, include_vector=True)
+            for obj in result.objects:
+                vector = obj.vector.get("default") if isinstance(obj.vector, dict) else obj.vector
+                if vector:
+                    return len(vector)
+        return None
+
+    @staticmethod
+    def verify_schema():
+        """
+        Verify the live collections before the application serves requests, so that a stale schema fails the
+        startup with a clear error instead of failing every request:
+        - every tenant collection must be multi-tenant, otherwise MultiTenancyMigrationError is raised and
+          `python -m vectors.initialize_schema` migrates it
+        - the vectors stored in every collection must have the length the configured embedding backend produces,
+          otherwise VectorDimensionMismatch is raised, empty collections and unknown models are only reported
+        """
+        client = WeaviateEngine().get_engine()
+        try:
+            for name in TENANT_COLLECTIONS:
+                if client.collections.exists(name + _MIGRATION_SUFFIX):
+                    raise MultiTenancyMigrationError(
+                        f"The multi-tenancy migration of collection {name} was interrupted, "
+                        f"run `python -m vectors.initialize_schema` to complete it.")
+                if not client.collections.exists(name):
+                    continue
+                if not SchemaInitializer._is_multi_tenant(client, name):
+                    raise MultiTenancyMigrationError(
+                        f"Collection {name} was created without multi-tenancy, run "
+                        f"`python -m vectors.initialize_schema` to move its objects to tenant {resolve_tenant(None)}.")
+                expected = SchemaInitializer.expected_dimensions(name)
+                stored = SchemaInitializer.stored_dimensions(client, name)
+                if stored is None:
+                    logger.info(f"Collection {name} has no vectors in active tenants, dimensions not verified.")
+                elif expected is None:
+                    logger.warning(f"Native dimensions of {settings.default_openai_embedding_model} unknown, "
+                                   f"cannot verify the {stored} dimensions stored in collection {name}.")
+                elif stored != expected:
+                    raise VectorDimensionMismatch(
+                        f"Collection {name} holds vectors of dimensions {stored} but the configured embedding "
+                        f"produces {expected}, re-embed the collection or restore EMBEDDING_DIMENSIONS.")
+            logger.info("Vector schema verified.")
+        except WeaviateConnectionError as e:
+            logger.error(f"Weaviate connection error: {e}")
+        finally:
+            client.close()
+
     @staticmethod
     def create_schema():
+        """
+        Create the missing tenant collections, and migrate the collections created before multi-tenancy was
+        enabled to multi-tenant ones, their objects are moved to the default tenant.
+        """
         client = WeaviateEngine().get_engine()
         try:
-            # Setup document collection.
-            if not client.collections.exists("Documents"):
-                collection = client.collections.create(
-                    name="Documents",
-                    description="The documents collection contains all the books and courses knowledge.",
-                    vectorizer_config=None,
-                    # vectorizer_config=wvcc.Configure.Vectorizer.text2vec_openai(base_url=os.getenv("OPENAI_API_BASE"), api_key=os.getenv("OPENAI_API_KEY")),
-                    # generative_config=wvcc.Configure.Generative.openai(model="gpt-4"),
-                    vector_index_config=wvcc.Configure.VectorIndex.hnsw(distance_metric=wvc.config.VectorDistances.COSINE),
-                    replication_config=wvcc.Configure.replication(factor=1),
-                    multi_tenancy_config=wvcc.Configure.multi_tenancy(enabled=False),
-                    properties=[
-                        wvcc.Property(
-                            name="content",
-                            data_type=wvcc.DataType.TEXT,
-                            description="Content of the document",
-                            vectorize_property_name=False,
-                            skip_vectorization=True,
-                            index_filterable=False,
-                            index_searchable=False,
-                            tokenization=wvcc.Tokenization.GSE # Used for Chinese and Japanese.
-                        ),
-                        wvcc.Property(
-                            name="name",
-                            data_type=wvcc.DataType.TEXT,
-                            description="Document name",
-                            vectorize_property_name=False,
-                            skip_vectorization=True
-                        ),
-                        wvcc.Property(
-                            name="ext",
-                            data_type=wvcc.DataType.TEXT,
-                            description="Document type",
-                            skip_vectorization=True
-                        ),
-                        wvcc.Property(
-                            name="linker",
-                            data_type=wvcc.DataType.TEXT,
-                            description="Linker for the document",
-                            skip_vectorization=True
-                        ),
-                        wvcc.Property(
-                            name="timestamp",
-                            data_type=wvcc.DataType.TEXT,
-                            description="Timestamp of the document",
-                            skip_vectorization=True
-                        ),
-                        wvcc.Property(
-                            name="metadata",
-                            data_type=wvcc.DataType.TEXT,
-                            description="Metadata of the document",
-                            skip_vectorization=True
-                        ),
-                        wvcc.Property(
-                            name="chunks_count",
-                            data_type=wvcc.DataType.NUMBER,
-                            description="Number of chunks in the document",
-                            skip_vectorization=True
-                        ),
-                    ]
-                )
-                logger.info(f"Schema created: {collection.config}")
-
-            # Setup chunks collection.
-            if not client.collections.exists("Chunks"):
-                collection = client.collections.create(
-                    name="Chunks",
-                    description="The chunks collection contains all the chunks of the specified document.",
-                    vectorizer_config=None,
-                    # vectorizer_config=wvcc.Configure.Vectorizer.text2vec_openai(base_url=os.getenv("OPENAI_API_BASE"), api_key=os.getenv("OPENAI_API_KEY")),
-                    # generative_config=wvcc.Configure.Generative.openai(model="gpt-4"),
-                    vector_index_config=wvcc.Configure.VectorIndex.hnsw(distance_metric=wvc.config.VectorDistances.COSINE),
-                    replication_config=wvcc.Configure.replication(factor=1),
-                    multi_tenancy_config=wvcc.Configure.multi_tenancy(enabled=False),
-                    properties=[
-                        wvcc.Property(
-                            name="content",
-                            data_type=wvcc.DataType.TEXT,
-                            description="Content of the chunk",
-                            vectorize_property_name=False,
-                            skip_vectorization=True
-                        ),
-                        wvcc.Property(
-                            name="chunk_id",
-                            data_type=wvcc.DataType.NUMBER,
-                            description="ID of the chunk",
-                            skip_vectorization=True
-                        ),
-                        wvcc.Property(
-                            name="doc_uuid",
-                            data_type=wvcc.DataType.TEXT,
-                            description="UUID of the document",
-                            skip_vectorization=True
-                        ),
-                        wvcc.Property(
-                            name="tokens",
-                            data_type=wvcc.DataType.NUMBER,
-                            description="Number of tokens in the chunk",
-                            skip_vectorization=True
-                        ),
-                        wvcc.Property(
-                            name="metadata",
-                            data_type=wvcc.DataType.TEXT,
-                            description="Metadata of the chunk",
-                            skip_vectorization=True
-                        ),
-                        wvcc.Property(
-                            name="timestamp",
-                            data_type=wvcc.DataType.TEXT,
-                            description="Timestamp of the chunk",
-                            skip_vectorization=True
-                        ),
-                        wvcc.Property(
-                            name="doc_name",
-                            data_type=wvcc.DataType.TEXT,
-                            description="Name of the document",
-                            skip_vectorization=True
-                        )
-                    ],
-                    # If here needs inverted index?
-                    # inverted_index_config=wvcc.Configure.inverted_index(
-                    #     bm25_b=0.75,
-                    #     bm25_k1=1.25,
-                    #     index_null_state=True, # perform queries that filter on null
-                    #     index_property_length=True, # perform queries that filter on the length of a property
-                    #     index_timestamps=True, # timestamps include creationTimeUnix and lastUpdateTimeUnix, execute queries filtered by timestamps
-                    #     stopwords_preset=StopwordsPreset.NONE,
-                    #     stopwords_additions=[],
-                    #     stopwords_removals=[]
-                    # )
-                )
-                logger.info(f"Schema created: {collection.config}")
+            for name in TENANT_COLLECTIONS:
+                SchemaInitializer._migrate_to_multi_tenancy(client, name)
+                if not client.collections.exists(name):
+                    collection = SchemaInitializer._create_collection(client, name)
+                    logger.info(f"Schema created: {collection.config}")
         except WeaviateConnectionError as e:
             logger.error(f"Weaviate connection error: {e}")
         except UnexpectedStatusCodeException as e:
             logger.error(f"Unexpected status code exception: {e}")
         finally:
-            client.close()
\ No newline at end of file
+            client.close()
+
+    @staticmethod
+    def _is_multi_tenant(client, name: str) -> bool:
+        return bool(client.collections.get(name).config.get().multi_tenancy_config.enabled)
+
+    @staticmethod
+    def _migrate_to_multi_tenancy(client, name: str):
+        """
+        Move the objects of a collection created without multi-tenancy to the default tenant of a multi-tenant one.
+
+        Weaviate can neither enable multi-tenancy on an existing collection nor rename one, so the objects (with their
+        vectors and uuids) are first copied to a multi-tenant staging collection, the legacy collection is recreated
+        as a multi-tenant one, and the objects are copied back. The legacy collection is only deleted after every
+        object reached the staging collection, and an interrupted migration resumes from the staging collection.
+        """
+        staging = name + _MIGRATION_SUFFIX
+        tenant = resolve_tenant(None)
+        if client.collections.exists(name) and not SchemaInitializer._is_multi_tenant(client, name):
+            logger.warning(f"Collection {name} has no multi-tenancy, migrating its objects to tenant {tenant}.")
+            if client.collections.exists(staging):
+                # Left over by an attempt interrupted before the legacy collection was deleted, copy again.
+                client.collections.delete(staging)
+            SchemaInitializer._create_collection(client, name, staging)
+            copied = SchemaInitializer._copy_objects(client.collections.get(name),
+                                                     client.collections.get(staging).with_tenant(tenant))
+            logger.info(f"Copied {copied} objects of {name} to the staging collection {staging}.")
+            client.collections.delete(name)
+        if not client.collections.exists(staging):
+            return
+        if not client.collections.exists(name):
+            SchemaInitializer._create_collection(client, name)
+        copied = SchemaInitializer._copy_objects(client.collections.get(staging).with_tenant(tenant),
+                                                 client.collections.get(name).with_tenant(tenant))
+        client.collections.delete(staging)
+        logger.info(f"Collection {name} migrated to multi-tenancy, {copied} objects moved to tenant {tenant}.")
+
+    @staticmethod
+    def _copy_objects(source, target) -> int:
+        """
+        Copy every object of source to target keeping its uuid and vector, raise if any object failed.
+        """
+        copied = 0
+        with target.batch.dynamic() as batch:
+            for obj in source.iterator(include_vector=True):
+                vector = obj.vector.get("default") if isinstance(obj.vector, dict) else obj.vector
+                batch.add_object(properties=obj.properties, uuid=obj.uuid, vector=vector or None)
+                copied += 1
+        failed = target.batch.failed_objects
+        if failed:
+            raise MultiTenancyMigrationError(
+                f"{len(failed)} of {copied} objects failed to copy to {target.name}: {failed[0].message}")
+        return copied
+
+    @staticmethod
+    def _create_collection(client, name: str, collection_name: str = None):
+        """
+        Create the tenant collection `name` ("Documents" or "Chunks") under collection_name, the name by default.
+        """
+        create = SchemaInitializer._create_documents if name == "Documents" else SchemaInitializer._create_chunks
+        return create(client, collection_name or name)
+
+    @staticmethod
+    def _create_documents(client, collection_name: str = "Documents"):
+        return client.collections.create(
+            name=collection_name,
+            description="The documents collection contains all the books and courses knowledge.",
+            vectorizer_config=None,
+            # vectorizer_config=wvcc.Configure.Vectorizer.text2vec_openai(base_url=os.getenv("OPENAI_API_BASE"), api_key=os.getenv("OPENAI_API_KEY")),
+            # generative_config=wvcc.Configure.Generative.openai(model="gpt-4"),
+            vector_index_config=wvcc.Configure.VectorIndex.hnsw(distance_metric=wvc.config.VectorDistances.COSINE),
+            replication_config=wvcc.Configure.replication(factor=1),
+            multi_tenancy_config=wvcc.Configure.multi_tenancy(enabled=True, auto_tenant_creation=True,
+                                                              auto_tenant_activation=True),
+            properties=[
+                wvcc.Property(
+                    name="content_uri",
+                    data_type=wvcc.DataType.TEXT,
+                    description="Location of the compressed document content in the content store",
+                    vectorize_property_name=False,
+                    skip_vectorization=True,
+                    index_filterable=False,
+                    index_searchable=False
+                ),
+                wvcc.Property(
+                    name="content_hash",
+                    data_type=wvcc.DataType.TEXT,
+                    description="SHA-256 of the document content",
+                    skip_vectorization=True,
+                    index_searchable=False
+                ),
+                wvcc.Property(
+                    name="name",
+                    data_type=wvcc.DataType.TEXT,
+                    description="Document name",
+                    vectorize_property_name=False,
+                    skip_vectorization=True
+                ),
+                wvcc.Property(
+                    name="ext",
+                    data_type=wvcc.DataType.TEXT,
+                    description="Document type",
+                    skip_vectorization=True
+                ),
+                wvcc.Property(
+                    name="linker",
+                    data_type=wvcc.DataType.TEXT,
+                    description="Linker for the document",
+                    skip_vectorization=True
+                ),
+                wvcc.Property(
+                    name="timestamp",
+                    data_type=wvcc.DataType.TEXT,
+                    description="Timestamp of the document",
+                    skip_vectorization=True
+                ),
+                wvcc.Property(
+                    name="metadata",
+                    data_type=wvcc.DataType.TEXT,
+                    description="Metadata of the document",
+                    skip_vectorization=True
+                ),
+                wvcc.Property(
+                    name="page_hashes",
+                    data_type=wvcc.DataType.TEXT,
+                    description="JSON list of the SHA-256 of every page, to detect changes on re-upload",
+                    skip_vectorization=True,
+                    index_filterable=False,
+                    index_searchable=False
+                ),
+                wvcc.Property(
+                    name="expires_at",
+                    data_type=wvcc.DataType.TEXT,
+                    description="Expiry time of the document, purged by the TTL sweeper, empty never expires",
+                    skip_vectorization=True,
+                    index_searchable=False
+                ),
+                wvcc.Property(
+                    name="chunks_count",
+                    data_type=wvcc.DataType.NUMBER,
+                    description="Number of chunks in the document",
+                    skip_vectorization=True
+                ),
+            ]
+        )
+
+    @staticmethod
+    def _create_chunks(client, collection_name: str = "Chunks"):
+        return client.collections.create(
+            name=collection_name,
+            description="The chunks collection contains all the chunks of the specified document.",
+            vectorizer_config=None,
+            # vectorizer_config=wvcc.Configure.Vectorizer.text2vec_openai(base_url=os.getenv("OPENAI_API_BASE"), api_key=os.getenv("OPENAI_API_KEY")),
+            # generative_config=wvcc.Configure.Generative.openai(model="gpt-4"),
+            vector_index_config=wvcc.Configure.VectorIndex.hnsw(distance_metric=wvc.config.VectorDistances.COSINE),
+            replication_config=wvcc.Configure.replication(factor=1),
+            multi_tenancy_config=wvcc.Configure.multi_tenancy(enabled=True, auto_tenant_creation=True,
+                                                              auto_tenant_activation=True),
+            properties=[
+                wvcc.Property(
+                    name="content",
+                    data_type=wvcc.DataType.TEXT,
+                    description="Content of the chunk",
+                    vectorize_property_name=False,
+                    skip_vectorization=True
+                ),
+                wvcc.Property(
+                    name="chunk_id",
+                    data_type=wvcc.DataType.NUMBER,
+                    description="ID of the chunk",
+                    skip_vectorization=True
+                ),
+                wvcc.Property(
+                    name="content_hash",
+                    data_type=wvcc.DataType.TEXT,
+                    description="SHA-256 of the chunk content, unchanged chunks keep their vector on re-upload",
+                    skip_vectorization=True,
+                    index_searchable=False
+                ),
+                wvcc.Property(
+                    name="doc_uuid",
+                    data_type=wvcc.DataType.TEXT,
+                    description="UUID of the document",
+                    skip_vectorization=True
+                ),
+                wvcc.Property(
+                    name="tokens",
+                    data_type=wvcc.DataType.NUMBER,
+                    description="Number of tokens in the chunk",
+                    skip_vectorization=True
+                ),
+                wvcc.Property(
+                    name="metadata",
+                    data_type=wvcc.DataType.TEXT,
+                    description="Metadata of the chunk",
+                    skip_vectorization=True
+                ),
+                wvcc.Property(
+                    name="timestamp",
+                    data_type=wvcc.DataType.TEXT,
+                    description="Timestamp of the chunk",
+                    skip_vectorization=True
+                ),
+                wvcc.Property(
+                    name="doc_name",
+                    data_type=wvcc.DataType.TEXT,
+                    description="Name of the document",
+                    skip_vectorization=True
+                )
+            ],
+            # If here needs inverted index?
+            # inverted_index_config=wvcc.Configure.inverted_index(
+            #     bm25_b=0.75,
+            #     bm25_k1=1.25,
+            #     index_null_state=True, # perform queries that filter on null
+            #     index_property_length=True, # perform queries that filter on the length of a property
+            #     index_timestamps=True, # timestamps include creationTimeUnix and lastUpdateTimeUnix, execute queries filtered by timestamps
+            #     stopwords_preset=StopwordsPreset.NONE,
+            #     stopwords_additions=[],
+            #     stopwords_removals=[]
+            # )
+        )
+
+    @staticmethod
+    def deactivate_tenants(tenants: list[str]):
+        """
+        Move the given tenants out of memory. They are offloaded to cold storage when the cluster has an offload
+        module, otherwise (or if offloading fails) they are only marked inactive and kept on the local disk.
+        """
+        client = WeaviateEngine().get_engine()
+        try:
+            status = TenantActivityStatus[settings.vector_tenant_idle_status.upper()]
+            for name in TENANT_COLLECTIONS:
+                collection = client.collections.get(name)
+                try:
+                    collection.tenants.update([Tenant(name=tenant, activity_status=status) for tenant in tenants])
+                except UnexpectedStatusCodeException as e:
+                    if status == TenantActivityStatus.INACTIVE:
+                        raise
+                    logger.warning(f"Failed to set tenants {tenants} of {name} to {status}, fallback to INACTIVE: {e}")
+                    collection.tenants.update([Tenant(name=tenant, activity_status=TenantActivityStatus.INACTIVE)
+                                               for tenant in tenants])
+                logger.info(f"Tenants {tenants} of {name} deactivated.")
+        except WeaviateConnectionError as e:
+            logger.error(f"Weaviate connection error: {e}")
+        finally:
+            client.close()
@@ -0,0 +1,293 @@
+"""
+Export and import snapshots of the vector store, including the vectors, without any embedding provider call.
+
+Every tenant of the Documents and Chunks collections is streamed with the collection cursor into one file per
+collection, written batch by batch, with the vectors in a nullable list<float32> column. The default Arrow IPC
+format can be memory mapped on import, Parquet is smaller on disk. Imports bulk-load the files with large
+concurrent batches.
+
+Documents only keep a content_uri pointer to their body in the content store, so the referenced bodies are exported
+as well, one gzip file per content hash under <tenant>/contents. On import they are written to the content store of
+the target environment and the pointers are rewritten; an import fails with a clear error if a document references
+content that is neither in the snapshot nor in the target store.
+
+Usage:
+    python -m vectors.snapshot export --output ./snapshots/20250101 [--tenant xxx] [--format arrow|parquet]
+    python -m vectors.snapshot import --input ./snapshots/20250101 [--tenant xxx]
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import weaviate.classes.config as wvcc
+
+from vectors.engines.tenants import TENANT_COLLECTIONS, resolve_tenant
+from vectors.engines.weaviate_engine import WeaviateEngine
+from vectors.stores import get_content_store
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+CONTENTS_DIR = "contents"
+
+
+class MissingContentError(RuntimeError):
+    """
+    A document of the snapshot references content that is available neither in the snapshot nor in the target store.
+    """
+
+_ARROW_TYPES = {
+    wvcc.DataType.TEXT: pa.string(),
+    wvcc.DataType.NUMBER: pa.float64(),
+    wvcc.DataType.INT: pa.int64(),
+    wvcc.DataType.BOOL: pa.bool_(),
+}
+
+
+class SnapshotWriter:
+    """
+    Write the record batches of one collection to an Arrow IPC or Parquet file. The schema is declared up front
+    from the collection properties plus a nullable vector column, so objects without a vector, even a whole first
+    batch of them, never drop the vectors of later objects.
+    """
+
+    def __init__(self, file_path: str, file_format: str, columns: dict[str, pa.DataType]):
+        self.file_path = file_path
+        self.file_format = file_format
+        self.schema = pa.schema([pa.field(name, data_type) for name, data_type in columns.items()] +
+                                [pa.field("vector", pa.list_(pa.float32()), nullable=True)])
+        if file_format == "parquet":
+            self.writer = pq.ParquetWriter(file_path, self.schema, compression="zstd")
+        else:
+            self.writer = pa.ipc.new_file(file_path, self.schema)
+        self.rows = 0
+
+    def write(self, rows: list[dict]):
+        if not rows:
+            return
+        self.writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=self.schema))
+        self.rows += len(rows)
+
+    def close(self):
+        self.writer.close()
+
+
+def _property_columns(collection) -> dict[str, pa.DataType]:
+    columns = {"uuid": pa.string()}
+    for prop in collection.config.get().properties:
+        columns[prop.name] = _ARROW_TYPES.get(prop.data_type, pa.string())
+    return columns
+
+
+def _row(obj, columns: dict[str, pa.DataType]) -> dict:
+    row = {"uuid": str(obj.uuid)}
+    for name, data_type in columns.items():
+        if name == "uuid":
+            continue
+        value = obj.properties.get(name)
+        row[name] = json.dumps(value, ensure_ascii=False) if data_type == pa.string() and isinstance(
+            value, (dict, list)) else value
+    vector = obj.vector.get("default") if isinstance(obj.vector, dict) else obj.vector
+    if vector:
+        row["vector"] = vector
+    return row
+
+
+def _list_tenants(client, tenant: str = None) -> list[str]:
+    if tenant:
+        return [resolve_tenant(tenant)]
+    tenants = set()
+    for name in TENANT_COLLECTIONS:
+        tenants.update(client.collections.get(name).tenants.get().keys())
+    return sorted(tenants)
+
+
+def _content_path(tenant_dir: str, content_hash: str) -> str:
+    return os.path.join(tenant_dir, CONTENTS_DIR, f"{content_hash}.txt.gz")
+
+
+def _export_content(store, tenant_dir: str, row: dict, exported: set[str]):
+    """
+    Copy the body referenced by a document row into the snapshot, once per content hash.
+    """
+    uri, content_hash = row.get("content_uri"), row.get("content_hash")
+    if not uri or not content_hash or content_hash in exported:
+        return
+    file_path = _content_path(tenant_dir, content_hash)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "wb") as file:
+        file.write(store.compress(store.get(uri)))
+    exported.add(content_hash)
+
+
+def _restore_content(store, tenant_dir: str, tenant: str, row: dict, restored: dict[str, str]):
+    """
+    Write the body of a document row to the target content store and point the row at it. Snapshots without the
+    body (or taken before bodies were exported) are only accepted if the original uri is reachable from here.
+    """
+    uri, content_hash = row.get("content_uri"), row.get("content_hash")
+    if not uri:
+        return
+    if content_hash and content_hash in restored:
+        row["content_uri"] = restored[content_hash]
+        return
+    file_path = _content_path(tenant_dir, content_hash) if content_hash else None
+    if file_path and os.path.exists(file_path):
+        with open(file_path, "rb") as file:
+            new_uri, _ = store.put(gzip.decompress(file.read()).decode("utf-8"), namespace=tenant)
+    elif store.exists(uri):
+        new_uri = uri
+    else:
+        raise MissingContentError(f"Document {row.get('uuid')} of tenant {tenant} references content {uri} which is "
+                                  f"neither in the snapshot nor in the content store, export the snapshot again.")
+    if content_hash:
+        restored[content_hash] = new_uri
+    row["content_uri"] = new_uri
+
+
+def export_snapshot(output_dir: str, tenant: str = None, file_format: str = "arrow", batch_rows: int = 10000) -> dict:
+    """
+    Stream all the documents and chunks, with their vectors, of one or all tenants into the output directory,
+    together with the document bodies referenced from the content store.
+
+    Returns:
+        dict: The manifest of the snapshot.
+    """
+    ext = "parquet" if file_format == "parquet" else "arrow"
+    manifest = {"format": ext, "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "tenants": {}}
+    client = WeaviateEngine().get_engine()
+    store = get_content_store()
+    try:
+        for name_of_tenant in _list_tenants(client, tenant):
+            tenant_dir = os.path.join(output_dir, name_of_tenant)
+            os.makedirs(tenant_dir, exist_ok=True)
+            manifest["tenants"][name_of_tenant] = {}
+            exported_contents = set()
+            for name in TENANT_COLLECTIONS:
+                start = time.time()
+                collection = client.collections.get(name).with_tenant(name_of_tenant)
+                columns = _property_columns(client.collections.get(name))
+                writer = SnapshotWriter(os.path.join(tenant_dir, f"{name.lower()}.{ext}"), ext, columns)
+                rows = []
+                try:
+                    for obj in collection.iterator(include_vector=True, cache_size=min(batch_rows, 10000)):
+                        row = _row(obj, columns)
+                        if name == "Documents":
+                            _export_content(store, tenant_dir, row, exported_contents)
+                        rows.append(row)
+                        if len(rows) >= batch_rows:
+                            writer.write(rows)
+                            rows = []
+                    writer.write(rows)
+                finally:
+                    writer.close()
+                manifest["tenants"][name_of_tenant][name] = writer.rows
+                logger.info(f"Exported {writer.rows} {name} of tenant {name_of_tenant} in {time.time() - start:.2f}s")
+            manifest["tenants"][name_of_tenant]["contents"] = len(exported_contents)
+        with open(os.path.join(output_dir, MANIFEST), "w", encoding="utf-8") as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=2)
+        return manifest
+    finally:
+        client.close()
+
+
+def _read_batches(file_path: str, file_format: str, batch_rows: int):
+    if file_format == "parquet":
+        yield from pq.ParquetFile(file_path, memory_map=True).iter_batches(batch_size=batch_rows)
+        return
+    with pa.memory_map(file_path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+
+
+def import_snapshot(input_dir: str, tenant: str = None, batch_size: int = 1000, concurrent_requests: int = 4) -> dict:
+    """
+    Bulk-load a snapshot written by export_snapshot, objects keep their uuid and vector so nothing is re-embedded.
+    Tenants are created on the fly by the auto tenant creation of the collections. Document bodies are restored to
+    the content store first, a missing body raises MissingContentError before the tenant is imported.
+
+    Returns:
+        dict: The number of imported objects per tenant and collection.
+    """
+    with open(os.path.join(input_dir, MANIFEST), "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    file_format = manifest["format"]
+    tenants = [resolve_tenant(tenant)] if tenant else list(manifest["tenants"].keys())
+    imported = {}
+    client = WeaviateEngine().get_engine()
+    store = get_content_store()
+    try:
+        for name_of_tenant in tenants:
+            imported[name_of_tenant] = {}
+            tenant_dir = os.path.join(input_dir, name_of_tenant)
+            # Restore and verify all the document bodies before any object is written.
+            restored_contents = {}
+            documents_path = os.path.join(tenant_dir, f"documents.{file_format}")
+            if os.path.exists(documents_path):
+                for record_batch in _read_batches(documents_path, file_format, batch_size):
+                    if "content_uri" not in record_batch.schema.names:
+                        break
+                    for row in record_batch.select(["uuid", "content_uri", "content_hash"]).to_pylist():
+                        _restore_content(store, tenant_dir, name_of_tenant, row, restored_contents)
+            for name in TENANT_COLLECTIONS:
+                file_path = os.path.join(tenant_dir, f"{name.lower()}.{file_format}")
+                if not os.path.exists(file_path):
+                    continue
+                start = time.time()
+                collection = client.collections.get(name).with_tenant(name_of_tenant)
+                count = 0
+                with collection.batch.fixed_size(batch_size=batch_size, concurrent_requests=concurrent_requests) as batch:
+                    for record_batch in _read_batches(file_path, file_format, batch_size):
+                        has_vector = "vector" in record_batch.schema.names
+                        for row in record_batch.to_pylist():
+                            uuid = row.pop("uuid")
+                            vector = row.pop("vector", None) if has_vector else None
+                            if name == "Documents" and row.get("content_hash") in restored_contents:
+                                row["content_uri"] = restored_contents[row["content_hash"]]
+                            batch.add_object(properties={k: v for k, v in row.items() if v is not None},
+                                             uuid=uuid, vector=vector)
+                            count += 1
+                failed = collection.batch.failed_objects
+                if failed:
+                    logger.error(f"Failed to import {len(failed)} {name} of tenant {name_of_tenant}: {failed[:5]}")
+                imported[name_of_tenant][name] = count - len(failed)
+                logger.info(f"Imported {count} {name} of tenant {name_of_tenant} in {time.time() - start:.2f}s")
+        return imported
+    finally:
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export or import vector store snapshots.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export")
+    export_parser.add_argument("--output", required=True)
+    export_parser.add_argument("--tenant")
+    export_parser.add_argument("--format", choices=["arrow", "parquet"], default="arrow")
+    export_parser.add_argument("--batch-rows", type=int, default=10000)
+    import_parser = subparsers.add_parser("import")
+    import_parser.add_argument("--input", required=True)
+    import_parser.add_argument("--tenant")
+    import_parser.add_argument("--batch-size", type=int, default=1000)
+    import_parser.add_argument("--concurrent-requests", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print("Exporting snapshot...")
+        manifest = export_snapshot(args.output, args.tenant, args.format, args.batch_rows)
+        print(f"Snapshot exported: {json.dumps(manifest['tenants'], ensure_ascii=False)}")
+    else:
+        print("Importing snapshot...")
+        imported = import_snapshot(args.input, args.tenant, args.batch_size, args.concurrent_requests)
+        print(f"Snapshot imported: {json.dumps(imported, ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+from settings import settings
+from .base_store import BaseContentStore
+
+
+def get_content_store() -> BaseContentStore:
+    """
+    Get the document content store configured by settings.vector_content_store, minio | local.
+    """
+    if settings.vector_content_store == "local":
+        from .local_store import LocalContentStore
+        return LocalContentStore()
+    from .minio_store import MinioContentStore
+    return MinioContentStore()
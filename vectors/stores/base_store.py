@@ -0,0 +1,56 @@
+import gzip
+import hashlib
+
+
+class BaseContentStore():
+    """
+    A store for full document bodies kept outside the vector engine.
+
+    The bodies are gzip compressed and addressed by the SHA-256 of their text, so the vector engine only keeps a
+    pointer (uri) and the hash, and identical documents of one tenant share one stored object.
+    """
+
+    def __init__(self):
+        self.name = "BaseContentStore"
+        self.description = "A base store for document contents."
+        self.scheme = ""
+
+    @staticmethod
+    def hash_content(content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def compress(content: str) -> bytes:
+        return gzip.compress(content.encode("utf-8"))
+
+    @staticmethod
+    def decompress(data: bytes) -> str:
+        return gzip.decompress(data).decode("utf-8")
+
+    def object_key(self, content_hash: str, namespace: str = "") -> str:
+        prefix = f"vectors/documents/{namespace}" if namespace else "vectors/documents"
+        return f"{prefix}/{content_hash[:2]}/{content_hash}.txt.gz"
+
+    def put(self, content: str, namespace: str = "") -> tuple[str, str]:
+        """
+        Store the content under the namespace (the tenant) and return its (uri, sha256) pair.
+        """
+        raise NotImplementedError("Must provide a implementation in derived classes.")
+
+    def get(self, uri: str) -> str:
+        """
+        Load the content by the uri returned from put.
+        """
+        raise NotImplementedError("Must provide a implementation in derived classes.")
+
+    def exists(self, uri: str) -> bool:
+        """
+        Check whether the content referenced by the uri is stored.
+        """
+        raise NotImplementedError("Must provide a implementation in derived classes.")
+
+    def delete(self, uri: str) -> bool:
+        """
+        Delete the content by the uri returned from put.
+        """
+        raise NotImplementedError("Must provide a implementation in derived classes.")
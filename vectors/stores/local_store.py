@@ -0,0 +1,52 @@
+import logging
+import os
+
+from settings import settings
+from vectors.stores.base_store import BaseContentStore
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class LocalContentStore(BaseContentStore):
+    """
+    A content store on the local filesystem, for tests and single node deployments.
+    """
+
+    def __init__(self, root_dir: str = None):
+        super().__init__()
+        self.name = "LocalContentStore"
+        self.description = "Store compressed document contents on the local filesystem."
+        self.scheme = "file"
+        self.root_dir = os.path.abspath(root_dir or settings.vector_content_dir)
+
+    def put(self, content: str, namespace: str = "") -> tuple[str, str]:
+        content_hash = self.hash_content(content)
+        file_path = os.path.join(self.root_dir, self.object_key(content_hash, namespace))
+        uri = f"{self.scheme}://{file_path}"
+        if os.path.exists(file_path):
+            logger.info(f"Content {content_hash} already stored as {uri}")
+            return uri, content_hash
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        # Write to a temporary file first, so a concurrent reader never sees a partial object.
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(self.compress(content))
+        os.replace(tmp_path, file_path)
+        logger.info(f"Stored content {content_hash} as {uri}")
+        return uri, content_hash
+
+    def get(self, uri: str) -> str:
+        with open(uri[len(f"{self.scheme}://"):], "rb") as file:
+            return self.decompress(file.read())
+
+    def exists(self, uri: str) -> bool:
+        return uri.startswith(f"{self.scheme}://") and os.path.exists(uri[len(f"{self.scheme}://"):])
+
+    def delete(self, uri: str) -> bool:
+        file_path = uri[len(f"{self.scheme}://"):]
+        if not os.path.exists(file_path):
+            return False
+        os.remove(file_path)
+        logger.info(f"Deleted content {uri}")
+        return True
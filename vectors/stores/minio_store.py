@@ -0,0 +1,70 @@
+import io
+import logging
+
+from minio.error import S3Error
+
+from capsules.utils.minio_utils import minio_client
+from vectors.stores.base_store import BaseContentStore
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class MinioContentStore(BaseContentStore):
+    """
+    A content store backed by the MinIO bucket of the platform.
+
+    The MinIO client is synchronous, async callers run these methods with asyncio.to_thread.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.name = "MinioContentStore"
+        self.description = "Store compressed document contents in MinIO."
+        self.scheme = "minio"
+        self.client = minio_client.client
+        self.bucket_name = minio_client.bucket_name
+
+    def put(self, content: str, namespace: str = "") -> tuple[str, str]:
+        content_hash = self.hash_content(content)
+        object_name = self.object_key(content_hash, namespace)
+        uri = f"{self.scheme}://{self.bucket_name}/{object_name}"
+        try:
+            self.client.stat_object(self.bucket_name, object_name)
+            logger.info(f"Content {content_hash} already stored as {uri}")
+            return uri, content_hash
+        except S3Error as e:
+            if e.code != "NoSuchKey":
+                raise
+
+        data = self.compress(content)
+        self.client.put_object(self.bucket_name, object_name, io.BytesIO(data), length=len(data),
+                               content_type="application/gzip")
+        logger.info(f"Stored content {content_hash} as {uri}, {len(content)} characters compressed to {len(data)} bytes")
+        return uri, content_hash
+
+    def get(self, uri: str) -> str:
+        bucket_name, object_name = uri[len(f"{self.scheme}://"):].split("/", 1)
+        response = self.client.get_object(bucket_name, object_name)
+        try:
+            return self.decompress(response.read())
+        finally:
+            response.close()
+            response.release_conn()
+
+    def exists(self, uri: str) -> bool:
+        if not uri.startswith(f"{self.scheme}://"):
+            return False
+        bucket_name, object_name = uri[len(f"{self.scheme}://"):].split("/", 1)
+        try:
+            self.client.stat_object(bucket_name, object_name)
+            return True
+        except S3Error as e:
+            if e.code != "NoSuchKey":
+                raise
+            return False
+
+    def delete(self, uri: str) -> bool:
+        bucket_name, object_name = uri[len(f"{self.scheme}://"):].split("/", 1)
+        self.client.remove_object(bucket_name, object_name)
+        logger.info(f"Deleted content {uri}")
+        return True
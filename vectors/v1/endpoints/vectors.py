@@ -12,8 +12,9 @@ from fastapi import APIRouter, UploadFile, Depends, HTTPException
 
 from common.background_task import background_task
 from common.constants import FILE_SIZE_200MB, ALLOWED_FILE_TYPES
-from security.token_deps import TokenDeps
+from security.token_deps import TokenDeps, TenantDeps
 from vectors.data_loader import DataLoader
+from vectors.models.delete_filter import DeleteFilter
 from vectors.retrievers.weaviate_retriever import WeaviateRetriever
 
 logger: logging.Logger = logging.getLogger(__name__)
@@ -21,18 +22,22 @@ router = APIRouter()
 
 
 @router.post("/upload", dependencies=[TokenDeps], summary="Upload a document to the vector store.")
-async def upload_doc(files: list[UploadFile]):
+async def upload_doc(files: list[UploadFile], ttl_days: int = None,
+                     tenant_uuid: str = TenantDeps):
     """
     Endpoint for uploading a document to the vector store.
 
     Parameters:
         files(UploadFile): the uploaded files
+        ttl_days(int): optional lifetime of the documents, they are purged automatically once expired
 
     Returns:
         dict: A response containing the file name and a success message.
     """
     if len(files) == 0:
         raise HTTPException(status_code=400, detail="No files uploaded.")
+    if ttl_days is not None and ttl_days <= 0:
+        raise HTTPException(status_code=400, detail="ttl_days must be positive.")
 
     for file in files:
         # Get the file extension to check if it's allowed
@@ -52,14 +57,16 @@ async def upload_doc(files: list[UploadFile]):
         background_thread = background_task(
             "Vectorize Doc Task",
             task_func=DataLoader().load,
-            file_name=file_path
+            file_name=file_path,
+            tenant=tenant_uuid,
+            ttl_days=ttl_days
         )
 
     return {"message": "File uploaded successfully, and it would be processed in the background."}
 
 
 @router.get("/list", dependencies=[TokenDeps], summary="List all documents in the vector store.")
-async def get_documents(offset: int = 0, limit: int = 10):
+async def get_documents(offset: int = 0, limit: int = 10, tenant_uuid: str = TenantDeps):
     """
     Endpoint for retrieving documents from the vector store.
 
@@ -70,13 +77,38 @@ async def get_documents(offset: int = 0, limit: int = 10):
     Returns:
         dict: A response containing the documents and a success message.
     """
-    docs = await WeaviateRetriever().list_all_docs(offset=offset, limit=limit)
+    docs = await WeaviateRetriever(tenant=tenant_uuid).list_all_docs(offset=offset, limit=limit)
 
     return docs
 
 
+@router.get("/document/{uuid}", dependencies=[TokenDeps], summary="Get a document in the vector store.")
+async def get_document(uuid: str, with_content: bool = False,
+                       tenant_uuid: str = TenantDeps):
+    """
+    Endpoint for retrieving a document from the vector store.
+
+    Parameters:
+        uuid(str): the uuid of the document
+        with_content(bool): load the full content from the content store
+
+    Returns:
+        dict: The document.
+    """
+    if not uuid:
+        raise HTTPException(status_code=400, detail="uuid is required.")
+
+    includes = ["content"] if with_content else []
+    doc = await WeaviateRetriever(tenant=tenant_uuid).get_document(uuid=uuid, includes=includes)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Document not found.")
+
+    return doc
+
+
 @router.get("/chunks/list", dependencies=[TokenDeps], summary="List all chunks in the vector store.")
-async def get_documents_chunks(uuid: str, offset: int = 0, limit: int = 10):
+async def get_documents_chunks(uuid: str, offset: int = 0, limit: int = 10,
+                               tenant_uuid: str = TenantDeps):
     """
     Endpoint for retrieving documents from the vector store.
 
@@ -90,13 +122,14 @@ async def get_documents_chunks(uuid: str, offset: int = 0, limit: int = 10):
     if not uuid:
         raise HTTPException(status_code=400, detail="uuid is required.")
 
-    chunks = await WeaviateRetriever().list_all_chunks_by_doc_uuid(uuid=uuid, offset=offset, limit=limit)
+    retriever = WeaviateRetriever(tenant=tenant_uuid)
+    chunks = await retriever.list_all_chunks_by_doc_uuid(uuid=uuid, offset=offset, limit=limit)
 
     return chunks
 
 
 @router.delete("/delete/{uuid}", dependencies=[TokenDeps], summary="Delete document from the vector store.")
-async def delete_documents(uuid: str):
+async def delete_documents(uuid: str, tenant_uuid: str = TenantDeps):
     """
     Endpoint for delete document from the vector store.
 
@@ -109,13 +142,36 @@ async def delete_documents(uuid: str):
     if not uuid:
         raise HTTPException(status_code=400, detail="uuid is required.")
 
-    is_ok = await WeaviateRetriever().del_document_by_uuid(uuid=uuid)
+    is_ok = await WeaviateRetriever(tenant=tenant_uuid).del_document_by_uuid(uuid=uuid)
 
     return is_ok
 
 
+@router.post("/delete/bulk", dependencies=[TokenDeps], summary="Bulk delete documents from the vector store.")
+async def bulk_delete_documents(delete_filter: DeleteFilter, tenant_uuid: str = TenantDeps):
+    """
+    Endpoint for deleting the documents selected by uuids and/or filters, with their chunks, in batches.
+
+    Parameters:
+        delete_filter(DeleteFilter): uuids, name prefix and ingestion time range, combined with AND
+
+    Returns:
+        dict: The number of deleted documents, chunks and contents.
+    """
+    if delete_filter.is_empty():
+        raise HTTPException(status_code=400, detail="At least one of uuids, name_prefix, start_time or end_time "
+                                                    "is required.")
+
+    deleted = await WeaviateRetriever(tenant=tenant_uuid).bulk_delete(uuids=delete_filter.uuids,
+                                                                      name_prefix=delete_filter.name_prefix,
+                                                                      start_time=delete_filter.start_time,
+                                                                      end_time=delete_filter.end_time)
+
+    return deleted
+
+
 @router.delete("/chunk/delete/{uuid}", dependencies=[TokenDeps], summary="Delete chunk from the vector store.")
-async def delete_chunk_by_uuid(uuid: str):
+async def delete_chunk_by_uuid(uuid: str, tenant_uuid: str = TenantDeps):
     """
     Endpoint for delete chunk from the vector store.
 
@@ -128,24 +184,34 @@ async def delete_chunk_by_uuid(uuid: str):
     if not uuid:
         raise HTTPException(status_code=400, detail="uuid is required.")
 
-    is_ok = await WeaviateRetriever().del_chunk_by_uuid(uuid=uuid)
+    is_ok = await WeaviateRetriever(tenant=tenant_uuid).del_chunk_by_uuid(uuid=uuid)
 
     return is_ok
 
 
 @router.get("/chunk/search", dependencies=[TokenDeps], summary="Similarity search in the vector store.")
-async def similarity_search(query: str, top_k: int = 5):
+async def similarity_search(query: str, top_k: int = 5, context_window: int = 0, mmr: bool = False,
+                            mmr_lambda: float = 0.5, tenant_uuid: str = TenantDeps):
     """
     Endpoint for similarity search in the vector store.
 
     Parameters:
         query(str): the query string
+        context_window(int): number of neighbour chunks on each side of a hit to stitch into the passage
+        mmr(bool): diversify the results with Maximal Marginal Relevance
+        mmr_lambda(float): relevance/diversity trade-off of MMR, between 0 and 1
     Returns:
-        list(dict): A list of chunks
+        list(dict): A list of chunks, or stitched passages when context_window is greater than 0
     """
     if not query:
         raise HTTPException(status_code=400, detail="Query is required.")
-
-    chunks = await WeaviateRetriever().similarity_search(query=query, top_k=top_k)
+    if context_window < 0:
+        raise HTTPException(status_code=400, detail="context_window must not be negative.")
+    if not 0 <= mmr_lambda <= 1:
+        raise HTTPException(status_code=400, detail="mmr_lambda must be between 0 and 1.")
+
+    retriever = WeaviateRetriever(tenant=tenant_uuid)
+    chunks = await retriever.similarity_search(query=query, top_k=top_k, context_window=context_window,
+                                               mmr=mmr, mmr_lambda=mmr_lambda)
 
     return chunks